@@ -0,0 +1,80 @@
+#! /usr/bin/env python
+"""
+Time copying a large 2000A loop tree
+
+Compares the old format and re-parse segment copy with the structural copy
+and the copy-on-write copy of X12LoopDataNode.
+
+Usage: python copy_tree.py [subscriber_count]
+"""
+
+import sys
+import time
+import copy
+import gc
+from StringIO import StringIO
+
+sys.path.insert(0, '..')
+import pyx12.error_handler
+import pyx12.params
+import pyx12.segment
+import pyx12.x12context
+from generate import make_837
+
+
+def reparse_copy(loop_node):
+    """
+    The copy used before: format and re-split each segment
+    """
+    ret = pyx12.x12context.X12LoopDataNode(loop_node.x12_map_node,
+                                           list(loop_node.end_loops), loop_node.parent)
+    for child in loop_node.children:
+        if child.type == 'seg':
+            seg = child.seg_data
+            seg_data = pyx12.segment.Segment(seg.format(), seg.seg_term,
+                                             seg.ele_term, seg.subele_term)
+            ret.children.append(pyx12.x12context.X12SegmentDataNode(
+                child.x12_map_node, seg_data, ret))
+        else:
+            ret.children.append(reparse_copy(child))
+    return ret
+
+
+def best_time(func, repeat=3):
+    """
+    Best of repeat runs.  Like timeit, the cyclic garbage collector is off
+    while timing
+    """
+    times = []
+    gc.disable()
+    try:
+        for i in range(repeat):
+            t0 = time.time()
+            func()
+            times.append(time.time() - t0)
+    finally:
+        gc.enable()
+    return min(times)
+
+
+def main():
+    subscriber_ct = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    param = pyx12.params.params()
+    errh = pyx12.error_handler.errh_null()
+    src = pyx12.x12context.X12ContextReader(param, errh, StringIO(make_837(subscriber_ct)))
+    for tree in src.iter_segments('2000A'):
+        if tree.id == '2000A':
+            break
+    seg_ct = len(list(tree.iterate_segments()))
+    print('2000A tree: %i segments' % (seg_ct))
+    results = [
+        ('re-parse', best_time(lambda: reparse_copy(tree))),
+        ('structural', best_time(lambda: copy.copy(tree))),
+        ('copy-on-write', best_time(lambda: tree.copy(cow=True))),
+    ]
+    for (name, secs) in results:
+        print('%-14s %8.3f s %10.0f seg/s' % (name, secs, seg_ct / secs))
+
+
+if __name__ == '__main__':
+    main()
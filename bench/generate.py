@@ -0,0 +1,276 @@
+#! /usr/bin/env python
+"""
+Synthetic X12 documents for benchmarks
+
+Each generator repeats a block of segments taken from the test data files,
+with unique ids and correct HL, LX and trailer counts, so the documents
+validate without errors against the bundled maps.
+
+Usage: python generate.py type count [target_file]
+    type: 837p, 837i, 835, 834 or 270
+"""
+
+import sys
+
+sys.path.insert(0, '..')
+from pyx12.tests.x12testdata import datafiles
+
+
+def make_837(subscriber_ct):
+    """
+    Build an 837P with subscriber_ct copies of the 2000B loops of the
+    simple_837p test file under one 2000A loop
+    """
+    lines = datafiles['simple_837p']['source'].split('~\n')
+    start = [i for i in range(len(lines)) if lines[i].startswith('HL*2*')][0]
+    end = [i for i in range(len(lines)) if lines[i].startswith('SE*')][0]
+    body = lines[start + 1:end]
+    out = lines[:start]
+    for i in range(subscriber_ct):
+        out.append('HL*%i*1*22*0' % (i + 2))
+        out.extend(body)
+    seg_ct = len(out) - 2 + 1
+    out.append('SE*%i*1179' % (seg_ct))
+    out.extend(lines[end + 1:])
+    return '~\n'.join(out)
+
+
+def make_837p(claim_ct, line_ct=2, hl_depth=2):
+    """
+    Build an 837P with one claim per subscriber
+
+    @param claim_ct: Number of 2300 claims
+    @param line_ct: Number of 2400 service lines per claim, at most 50
+    @param hl_depth: 2 for claims under the subscriber, 3 for claims under
+        a 2000C patient
+    @rtype: string
+    """
+    header = [
+        'BHT*0019*00*AAAA1179*20041105*1526*RP',
+        'REF*87*004010X098A1',
+        'NM1*41*2*Sender 1*****46*99999',
+        'PER*IC*SUPPORT*EM*Support@dev.null*TE*8005553333',
+        'NM1*40*2*Receiver 1*****46*8888888',
+        'HL*1**20*1',
+        'NM1*85*2*Sender 1*****24*999999999',
+        'N3*399 ELM ROAD',
+        'N4*Kalamazoo*MI*49001',
+        'REF*1D*333402169',
+    ]
+    body = list(header)
+    hl_id = 1
+    for i in range(claim_ct):
+        hl_id += 1
+        sub_hl = hl_id
+        if hl_depth >= 3:
+            body.append('HL*%i*1*22*1' % (sub_hl))
+            body.append('SBR*P********MC')
+        else:
+            body.append('HL*%i*1*22*0' % (sub_hl))
+            body.append('SBR*P*18*******MC')
+        body.extend([
+            'NM1*IL*1*THE FIFTH*RICHARD****MI*%09i' % (i + 1),
+            'N3*156 ELM',
+            'N4*KALAMAZOO*MI*49001',
+            'DMG*D8*19051104*M',
+            'NM1*PR*2*PAYER 1*****PI*8888888',
+        ])
+        if hl_depth >= 3:
+            hl_id += 1
+            body.extend([
+                'HL*%i*%i*23*0' % (hl_id, sub_hl),
+                'PAT*19',
+                'NM1*QC*1*THE FIFTH*JANE',
+                'N3*156 ELM',
+                'N4*KALAMAZOO*MI*49001',
+                'DMG*D8*19300101*F',
+            ])
+        body.append('CLM*C%09i*%i***12::1*Y*A*Y*A*B' % (i + 1, 21 * line_ct))
+        body.append('HI*BK:317')
+        for j in range(line_ct):
+            body.extend([
+                'LX*%i' % (j + 1),
+                'SV1*HC:H2015:TT*21*UN*12***1',
+                'DTP*472*D8*20040407',
+            ])
+    return _envelope('HC', '004010X098A1', '837', body)
+
+
+def make_837i(claim_ct, line_ct=3):
+    """
+    Build an 837I with one claim per subscriber
+
+    @param claim_ct: Number of 2300 claims
+    @param line_ct: Number of 2400 service lines per claim, at most 999
+    @rtype: string
+    """
+    body = [
+        'BHT*0019*00*300145997*20040709*1439*RP',
+        'REF*87*004010X096A1',
+        'NM1*41*2*PROVIDER 1*****46*0AAA',
+        'PER*IC*HELPDESK*EM*ADMIN@NULL.NULL*TE*8005557444',
+        'NM1*40*2*RECEIVER 1*****46*000111',
+        'HL*1**20*1',
+        'NM1*85*2*PROVIDER 1*****24*555112222',
+        'N3*PROVIDER 1',
+        'N4*THREE RIVERS*MI*49093',
+        'REF*1D*1705555',
+    ]
+    for i in range(claim_ct):
+        body.extend([
+            'HL*%i*1*22*0' % (i + 2),
+            'SBR*S*18*******11',
+            'NM1*IL*1*ARNOLD*TOM****MI*%09i' % (i + 1),
+            'N3*5324 ELM',
+            'N4*STURGIS*MI*49091',
+            'DMG*D8*19270312*M',
+            'NM1*PR*2*PAYER 2*****PI*000111',
+            'N3*PO BOX 0000',
+            'N4*KALAMAZOO*MI*48001',
+            'CLM*C%09i*0***11:A:7*Y*A*Y*A*********N' % (i + 1),
+            'DTP*434*RD8*20031213-20031218',
+            'DTP*435*DT*200312130800',
+            'CL1*9*9*09',
+            'HI*BK:29689*BJ:29689',
+        ])
+        for j in range(line_ct):
+            body.extend([
+                'LX*%i' % (j + 1),
+                'SV2*0100**0*UN*5*0*0',
+                'DTP*472*RD8*20031213-20031218',
+            ])
+    return _envelope('HC', '004010X096A1', '837', body)
+
+
+def make_835(claim_ct, line_ct=1):
+    """
+    Build an 835 with claim_ct claim payments
+
+    @param claim_ct: Number of 2100 claim payments
+    @param line_ct: Number of 2110 service payments per claim
+    @rtype: string
+    """
+    body = [
+        'BPR*I*5950.21*C*CHK************20090220',
+        'TRN*1*0004926*1382999999',
+        'DTM*405*20090209',
+        'N1*PR*Payer 1',
+        'N3*123 Elm',
+        'N4*Nowhere*MI*49000',
+        'N1*PE*Provider 1*FI*382999999',
+        'N3*456 Oak',
+        'N4*Nowhere*MI*49000',
+        'LX*1',
+    ]
+    for i in range(claim_ct):
+        body.extend([
+            'CLP*C%09i*1*%i*%i*0*HM*%09i' % (i + 1, 300 * line_ct, 200 * line_ct, i + 1),
+            'NM1*QC*1*Flintstone*Fred****34*373899999',
+        ])
+        for j in range(line_ct):
+            body.extend([
+                'SVC*HC:T1017*300*200**6',
+                'DTM*150*20080111',
+                'CAS*CR*45*100',
+            ])
+    return _envelope('HP', '004010X091A1', '835', body)
+
+
+def make_834(member_ct):
+    """
+    Build an 834 with member_ct members
+
+    @param member_ct: Number of 2000 member loops
+    @rtype: string
+    """
+    body = [
+        'BGN*00*88880070301  00*20070305*181245****4',
+        'DTP*007*D8*20070301',
+        'N1*P5*PAYER 1*FI*999999999',
+        'N1*IN*KCMHSAS*FI*999999999',
+    ]
+    for i in range(member_ct):
+        body.extend([
+            'INS*Y*18*030*XN*A*C**FT',
+            'REF*0F*%08i' % (i + 1),
+            'REF*1L*000003409999',
+            'DTP*356*D8*20070301',
+            'NM1*IL*1*DOE*JOHN*A***34*%09i' % (i + 1),
+            'N3*777 ELM ST',
+            'N4*ALLEGAN*MI*49010**CY*03',
+            'DMG*D8*19670330*M**O',
+            'HD*030**AK*064703*IND',
+            'DTP*348*D8*20070301',
+            'AMT*P3*45.34',
+        ])
+    return _envelope('BE', '004010X095A1', '834', body)
+
+
+def make_270(subscriber_ct):
+    """
+    Build a 270 with subscriber_ct eligibility inquiries from one provider
+
+    @param subscriber_ct: Number of 2000C subscriber loops
+    @rtype: string
+    """
+    body = [
+        'BHT*0022*13*10001234*20041105*1526',
+        'HL*1**20*1',
+        'NM1*PR*2*PAYER 1*****PI*12345',
+        'HL*2*1*21*1',
+        'NM1*1P*2*PROVIDER 1*****SV*987654321',
+    ]
+    for i in range(subscriber_ct):
+        body.extend([
+            'HL*%i*2*22*0' % (i + 3),
+            'TRN*1*T%09i*9877281234' % (i + 1),
+            'NM1*IL*1*DOE*JOHN****MI*%011i' % (i + 1),
+            'DMG*D8*19430519',
+            'DTP*307*D8*20041105',
+            'EQ*30',
+        ])
+    return _envelope('HS', '004010X092A1', '270', body)
+
+
+# type: (generator, loop id of the repeated unit)
+GENERATORS = {
+    '837p': (make_837p, '2300'),
+    '837i': (make_837i, '2300'),
+    '835': (make_835, '2100'),
+    '834': (make_834, '2000'),
+    '270': (make_270, '2000C'),
+}
+
+
+def _envelope(fic, vriic, ts_id, body):
+    """
+    Wrap transaction set segments in ISA, GS and ST envelopes
+    """
+    out = [
+        'ISA*00*          *00*          *ZZ*SUBMITTER      *ZZ*RECEIVER       '
+        '*041105*1526*U*00401*000000001*0*P*:',
+        'GS*%s*SUBMITTER*RECEIVER*20041105*1526*1*X*%s' % (fic, vriic),
+        'ST*%s*0001' % (ts_id),
+    ]
+    out.extend(body)
+    out.append('SE*%i*0001' % (len(body) + 2))
+    out.append('GE*1*1')
+    out.append('IEA*1*000000001')
+    return '~\n'.join(out) + '~\n'
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in GENERATORS:
+        sys.stderr.write(__doc__)
+        return False
+    src = GENERATORS[sys.argv[1]][0](int(sys.argv[2]))
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], 'w') as fd:
+            fd.write(src)
+    else:
+        sys.stdout.write(src)
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(not main())
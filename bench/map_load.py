@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+"""
+Time and peak memory of loading each bundled map file
+
+Each load runs in its own process.  Peak memory is the growth of the
+maximum resident size during the load.
+
+Measures:
+    dom: Parse the map into an ElementTree document, the first step of the
+        loader before the streaming reader
+    load: map_if.load_map_file from the XML map
+    bundle: map_if.load_map_file from a map bundle, see x12mapc
+
+Usage: python map_load.py [-m dom -m load -m bundle] [-r repeat] [map_file ...]
+"""
+
+import os
+import os.path
+import sys
+import glob
+import time
+import shutil
+import resource
+import tempfile
+import multiprocessing
+import xml.etree.cElementTree as et
+
+sys.path.insert(0, '..')
+import pyx12.map_bundle
+import pyx12.map_if
+import pyx12.params
+
+MAP_DIR = os.path.join(os.path.dirname(os.path.abspath(pyx12.map_if.__file__)), 'map')
+MEASURES = ('dom', 'load', 'bundle')
+
+
+def get_map_files():
+    """
+    @return: Filenames of the transaction maps in the map directory
+    """
+    map_files = []
+    for filename in sorted(glob.glob(os.path.join(MAP_DIR, '*.xml'))):
+        for (event, elem) in et.iterparse(filename, events=('start',)):
+            if elem.tag == 'transaction':
+                map_files.append(os.path.basename(filename))
+            break
+    return map_files
+
+
+def _measure(measure, map_file, repeat, bundle_file, queue):
+    """
+    Child process: report (best seconds, peak rss growth kB, error)
+    """
+    try:
+        param = pyx12.params.params()
+        # An empty bundle file is ignored, so the XML maps are read
+        pyx12.map_bundle.use_bundle(bundle_file if measure == 'bundle' else os.devnull)
+        rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        best = None
+        for i in range(repeat):
+            start = time.time()
+            if measure == 'dom':
+                res = et.parse(os.path.join(MAP_DIR, map_file))
+            else:
+                res = pyx12.map_if.load_map_file(map_file, param)
+            secs = time.time() - start
+            best = secs if best is None else min(best, secs)
+            del res
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_start
+        queue.put((best, peak_kb, None))
+    except Exception as e:
+        queue.put((None, None, '%s: %s' % (e.__class__.__name__, e)))
+
+
+def measure(measure, map_file, repeat, bundle_file):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_measure,
+                                   args=(measure, map_file, repeat, bundle_file, queue))
+    proc.start()
+    res = queue.get()
+    proc.join()
+    return res
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Map load benchmark')
+    parser.add_argument('--measure', '-m', action='append', dest='measures',
+                        default=[], choices=MEASURES)
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='Loads per process, the fastest is reported')
+    parser.add_argument('map_files', nargs='*')
+    args = parser.parse_args()
+
+    measures = args.measures or list(MEASURES)
+    map_files = args.map_files or get_map_files()
+    tmpdir = tempfile.mkdtemp()
+    bundle_file = os.path.join(tmpdir, pyx12.map_bundle.BUNDLE_FILE)
+    if 'bundle' in measures:
+        pyx12.map_bundle.compile_bundle(bundle_file)
+    totals = dict([(m, [0.0, 0]) for m in measures])
+    sys.stdout.write('%-34s' % ('Map'))
+    for m in measures:
+        sys.stdout.write('  %8s %8s' % (m + ' s', m + ' kB'))
+    sys.stdout.write('\n')
+    for map_file in map_files:
+        sys.stdout.write('%-34s' % (map_file))
+        for m in measures:
+            (secs, peak_kb, err) = measure(m, map_file, args.repeat, bundle_file)
+            if err is not None:
+                sys.stdout.write('  %s' % (err))
+                break
+            totals[m][0] += secs
+            totals[m][1] += peak_kb
+            sys.stdout.write('  %8.3f %8i' % (secs, peak_kb))
+        sys.stdout.write('\n')
+    sys.stdout.write('%-34s' % ('Total'))
+    for m in measures:
+        sys.stdout.write('  %8.3f %8i' % tuple(totals[m]))
+    sys.stdout.write('\n')
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
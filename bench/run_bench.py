@@ -0,0 +1,181 @@
+#! /usr/bin/env python
+"""
+Measure throughput and peak memory on synthetic X12 documents
+
+Each measure runs in its own process, so the peak resident memory is that
+of the measure alone.  Results are written as JSON for regression tracking.
+
+Measures:
+    tokenize: Read every segment with X12Reader
+    walk: Walk every segment with X12ContextReader
+    validate: x12n_document with a 997/999
+    xml: x12n_document with simple XML output
+    context: Iterate over the context trees of the repeated loop
+
+Usage: python run_bench.py [-t 837p -t 835 ...] [-n count] [-o results.json]
+"""
+
+import os
+import os.path
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, '..')
+import pyx12
+import pyx12.error_handler
+import pyx12.params
+import pyx12.x12context
+import pyx12.x12file
+import pyx12.x12n_document
+from generate import GENERATORS
+
+MEASURES = ('tokenize', 'walk', 'validate', 'xml', 'context')
+
+
+def run_tokenize(param, src_filename, loop_id):
+    ct = 0
+    for seg in pyx12.x12file.X12Reader(src_filename):
+        ct += 1
+    return ct
+
+
+def run_walk(param, src_filename, loop_id):
+    errh = pyx12.error_handler.errh_null()
+    ct = 0
+    for node in pyx12.x12context.X12ContextReader(param, errh, src_filename).iter_segments():
+        ct += 1
+    return ct
+
+
+def run_validate(param, src_filename, loop_id):
+    fd_997 = tempfile.TemporaryFile()
+    try:
+        if not pyx12.x12n_document.x12n_document(param, src_filename, fd_997, None):
+            raise Exception('%s is not valid' % (src_filename))
+    finally:
+        fd_997.close()
+    return None
+
+
+def run_xml(param, src_filename, loop_id):
+    with open(os.devnull, 'w') as fd_xml:
+        pyx12.x12n_document.x12n_document(param, src_filename, None, None, fd_xml)
+    return None
+
+
+def run_context(param, src_filename, loop_id):
+    errh = pyx12.error_handler.errh_null()
+    ct = 0
+    for node in pyx12.x12context.X12ContextReader(param, errh, src_filename).iter_segments(loop_id):
+        if node.id == loop_id:
+            ct += 1
+    return ct
+
+
+def _measure(measure, src_filename, loop_id, queue):
+    """
+    Child process: run one measure and report (seconds, peak rss kB)
+    """
+    try:
+        param = pyx12.params.params()
+        func = globals()['run_' + measure]
+        start = time.time()
+        func(param, src_filename, loop_id)
+        secs = time.time() - start
+        queue.put((secs, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+    except Exception as e:
+        queue.put((None, '%s: %s' % (e.__class__.__name__, e)))
+
+
+def measure(measure, src_filename, loop_id):
+    """
+    @return: (seconds, peak resident memory in kB)
+    """
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_measure,
+                                   args=(measure, src_filename, loop_id, queue))
+    proc.start()
+    (secs, peak_kb) = queue.get()
+    proc.join()
+    if secs is None:
+        raise RuntimeError('%s of %s failed: %s' % (measure, src_filename, peak_kb))
+    return (secs, peak_kb)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='pyx12 benchmarks')
+    parser.add_argument('--type', '-t', action='append', dest='types', default=[],
+                        choices=sorted(GENERATORS.keys()))
+    parser.add_argument('--measure', '-m', action='append', dest='measures', default=[],
+                        choices=MEASURES)
+    parser.add_argument('--count', '-n', type=int, default=2000,
+                        help='Number of claims, members or subscribers')
+    parser.add_argument('--lines', type=int, default=None,
+                        help='Service lines per claim, for 837p, 837i and 835')
+    parser.add_argument('--hl-depth', type=int, default=2, choices=(2, 3),
+                        help='837p HL depth: 3 adds a 2000C patient loop')
+    parser.add_argument('--output', '-o', default=None, help='JSON results filename')
+    args = parser.parse_args()
+
+    types = args.types or sorted(GENERATORS.keys())
+    measures = args.measures or list(MEASURES)
+    results = []
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for x12_type in types:
+            (generator, loop_id) = GENERATORS[x12_type]
+            kwargs = {}
+            if args.lines is not None and x12_type in ('837p', '837i', '835'):
+                kwargs['line_ct'] = args.lines
+            if x12_type == '837p':
+                kwargs['hl_depth'] = args.hl_depth
+            src = generator(args.count, **kwargs)
+            src_filename = os.path.join(tmpdir, '%s.txt' % (x12_type))
+            with open(src_filename, 'w') as fd:
+                fd.write(src)
+            seg_ct = src.count('~')
+            del src
+            for measure_name in measures:
+                (secs, peak_kb) = measure(measure_name, src_filename, loop_id)
+                res = {
+                    'type': x12_type,
+                    'measure': measure_name,
+                    'count': args.count,
+                    'options': kwargs,
+                    'bytes': os.path.getsize(src_filename),
+                    'segments': seg_ct,
+                    'seconds': round(secs, 4),
+                    'segments_per_sec': round(seg_ct / secs, 1),
+                    'peak_rss_kb': peak_kb,
+                }
+                results.append(res)
+                sys.stderr.write('%-5s %-9s %8i segs %8.2f s %10.0f seg/s %8i kB\n' % (
+                    x12_type, measure_name, seg_ct, secs, seg_ct / secs, peak_kb))
+            os.remove(src_filename)
+    finally:
+        os.rmdir(tmpdir)
+
+    doc = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'pyx12_version': pyx12.__version__,
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump(doc, fd, indent=2, sort_keys=True)
+    else:
+        json.dump(doc, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(not main())
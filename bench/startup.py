@@ -0,0 +1,96 @@
+#! /usr/bin/env python
+"""
+Time the start up of short lived pyx12 processes
+
+Each command is run in a new interpreter, and the fastest of the runs is
+reported.  With --modules, the slowest imports of one command are listed,
+like python -X importtime: the self and cumulative seconds of each module.
+
+Usage: python startup.py [-n runs] [--modules]
+"""
+
+import os
+import os.path
+import sys
+import time
+import subprocess
+
+PKG_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+COMMANDS = [
+    ('python', [sys.executable, '-c', 'pass']),
+    ('import pyx12.x12n_document', [sys.executable, '-c', 'import pyx12.x12n_document']),
+    ('x12valid --version', [sys.executable, os.path.join(PKG_DIR, 'pyx12', 'scripts', 'x12valid.py'), '--version']),
+]
+
+# Run in the child: wrap __import__ and report the time of each module
+IMPORT_TIMER = '''
+import sys, time, __builtin__
+_import = __builtin__.__import__
+_stack = []
+_times = []
+def _timed_import(name, *args, **kwargs):
+    before = set(sys.modules)
+    _stack.append(0.0)
+    start = time.time()
+    try:
+        return _import(name, *args, **kwargs)
+    finally:
+        cum = time.time() - start
+        child = _stack.pop()
+        if _stack:
+            _stack[-1] += cum
+        new = [m for m in sys.modules if m not in before and sys.modules[m] is not None]
+        if new:
+            full = [m for m in new if m == name or m.endswith('.' + name)]
+            _times.append((cum - child, cum, full[0] if full else name))
+__builtin__.__import__ = _timed_import
+%s
+__builtin__.__import__ = _import
+for (self_secs, cum, name) in sorted(_times, key=lambda x: -x[1])[:%i]:
+    sys.stderr.write('%%9.1f %%9.1f  %%s\\n' %% (self_secs * 1000, cum * 1000, name))
+sys.stderr.write('%%i modules\\n' %% (len(sys.modules)))
+'''
+
+
+def run(cmd, runs):
+    """
+    @return: Fastest wall seconds of the command
+    """
+    best = None
+    env = dict(os.environ)
+    env['PYTHONPATH'] = PKG_DIR
+    with open(os.devnull, 'w') as devnull:
+        for i in range(runs):
+            start = time.time()
+            subprocess.check_call(cmd, stdout=devnull, stderr=devnull, env=env)
+            secs = time.time() - start
+            best = secs if best is None else min(best, secs)
+    return best
+
+
+def list_imports(stmt, count):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = PKG_DIR
+    sys.stderr.write('%9s %9s  %s\n' % ('self ms', 'cum ms', stmt))
+    subprocess.check_call([sys.executable, '-c', IMPORT_TIMER % (stmt, count)], env=env)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='pyx12 start up time')
+    parser.add_argument('--runs', '-n', type=int, default=10)
+    parser.add_argument('--modules', action='store_true',
+                        help='List the slowest imports of pyx12.x12n_document')
+    parser.add_argument('--count', type=int, default=15,
+                        help='Number of imports listed')
+    args = parser.parse_args()
+    if args.modules:
+        list_imports('import pyx12.x12n_document', args.count)
+        return
+    for (name, cmd) in COMMANDS:
+        sys.stdout.write('%-28s %8.1f ms\n' % (name, run(cmd, args.runs) * 1000))
+
+
+if __name__ == '__main__':
+    main()
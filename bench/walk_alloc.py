@@ -0,0 +1,128 @@
+#! /usr/bin/env python
+"""
+Count the objects the map walker creates per walked segment
+
+Each document is walked with X12ContextReader.  Calls to walk_tree.walk
+are timed, and the segment objects created during them, the error segments
+of missing mandatory segments and loops, are counted.
+
+With --unknown, a segment that is in no map is added after every N
+segments of the transaction, so the walker searches up to the map root and
+passes over required segments and loops that are not reported.
+
+The hit rate is that of the compiled transitions and memoized searches of
+the maps walked, see map_walker.WalkMachine.
+
+Usage: python walk_alloc.py [-t 837p -t 835 ...] [-n count] [--unknown N]
+"""
+
+import os
+import os.path
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, '..')
+import pyx12.error_handler
+import pyx12.map_walker
+import pyx12.params
+import pyx12.segment
+import pyx12.x12context
+from generate import GENERATORS
+
+
+class WalkCounter(object):
+    """
+    Wrap walk_tree.walk and Segment.__init__ to count
+    """
+    def __init__(self):
+        self.walks = 0
+        self.segments = 0
+        self.seconds = 0.0
+        self._in_walk = False
+        # {id: WalkMachine} of the maps walked
+        self.machines = {}
+
+    def install(self):
+        orig_walk = pyx12.map_walker.walk_tree.walk
+        orig_init = pyx12.segment.Segment.__init__
+        counter = self
+
+        def walk(self, node, *args, **kwargs):
+            counter.walks += 1
+            machine = pyx12.map_walker.get_machine(node)
+            counter.machines[id(machine)] = machine
+            counter._in_walk = True
+            start = time.time()
+            try:
+                return orig_walk(self, node, *args, **kwargs)
+            finally:
+                counter.seconds += time.time() - start
+                counter._in_walk = False
+
+        def init(self, *args, **kwargs):
+            if counter._in_walk:
+                counter.segments += 1
+            orig_init(self, *args, **kwargs)
+
+        pyx12.map_walker.walk_tree.walk = walk
+        pyx12.segment.Segment.__init__ = init
+
+
+def add_unknown(src, every):
+    """
+    Add an unknown segment after every few segments of the transaction set
+    """
+    lines = src.split('~\n')
+    out = lines[:3]
+    for i in range(3, len(lines) - 4):
+        out.append(lines[i])
+        if (i - 2) % every == 0:
+            out.append('ZZZ*UNKNOWN')
+    out.extend(lines[len(lines) - 4:])
+    return '~\n'.join(out)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Map walker allocations')
+    parser.add_argument('--type', '-t', action='append', dest='types', default=[],
+                        choices=sorted(GENERATORS.keys()))
+    parser.add_argument('--count', '-n', type=int, default=200,
+                        help='Number of claims, members or subscribers')
+    parser.add_argument('--unknown', type=int, default=None,
+                        help='Add an unknown segment after every N segments')
+    args = parser.parse_args()
+
+    counter = WalkCounter()
+    counter.install()
+    sys.stdout.write('%-5s %8s %12s %10s %9s %9s\n' % (
+        'Type', 'Walks', 'Segs / walk', 'Walk s', 'Hit rate', 'Misses'))
+    for x12_type in args.types or sorted(GENERATORS.keys()):
+        (generator, loop_id) = GENERATORS[x12_type]
+        (fd, src_filename) = tempfile.mkstemp()
+        src = generator(args.count)
+        if args.unknown:
+            src = add_unknown(src, args.unknown)
+        os.write(fd, src)
+        os.close(fd)
+        try:
+            (counter.walks, counter.segments, counter.seconds) = (0, 0, 0.0)
+            counter.machines = {}
+            param = pyx12.params.params()
+            errh = pyx12.error_handler.errh_null()
+            for node in pyx12.x12context.X12ContextReader(param, errh, src_filename).iter_segments():
+                pass
+            walks = max(counter.walks, 1)
+            stats = [m.get_stats() for m in counter.machines.values()]
+            hits = sum([x['compiled_hits'] + x['memo_hits'] for x in stats])
+            misses = sum([x['misses'] for x in stats])
+            sys.stdout.write('%-5s %8i %12.3f %10.3f %9.4f %9i\n' % (
+                x12_type, counter.walks, float(counter.segments) / walks,
+                counter.seconds, float(hits) / max(hits + misses, 1), misses))
+        finally:
+            os.remove(src_filename)
+
+
+if __name__ == '__main__':
+    main()
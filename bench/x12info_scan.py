@@ -0,0 +1,50 @@
+#! /usr/bin/env python
+"""
+Time summarizing the envelopes of a large 837P
+
+Compares reading every segment with X12Reader, as x12info did, with the
+envelope-only scan of pyx12.x12scan.
+
+Usage: python x12info_scan.py [subscriber_count]
+"""
+
+import sys
+import time
+from StringIO import StringIO
+
+sys.path.insert(0, '..')
+import pyx12.x12file
+import pyx12.x12scan
+from generate import make_837
+
+
+def reader_summary(src):
+    """
+    The x12info loop before the scan mode
+    """
+    st_ct = 0
+    for seg in pyx12.x12file.X12Reader(StringIO(src)):
+        if seg.get_seg_id() == 'ST':
+            st_ct += 1
+    return st_ct
+
+
+def main():
+    subscriber_ct = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    src = make_837(subscriber_ct)
+    print('%i bytes' % (len(src)))
+
+    start = time.time()
+    reader_summary(src)
+    reader_secs = time.time() - start
+    print('X12Reader: %.3fs' % (reader_secs))
+
+    start = time.time()
+    summary = pyx12.x12scan.scan_file(StringIO(src))
+    scan_secs = time.time() - start
+    print('scan:      %.3fs (%i segments, %.1fx)' % (scan_secs,
+          summary['segment_count'], reader_secs / scan_secs))
+
+
+if __name__ == '__main__':
+    main()
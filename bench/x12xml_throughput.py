@@ -0,0 +1,41 @@
+#! /usr/bin/env python
+"""
+Time x12xml output on a large 837
+
+The X12 document is validated and written as simple XML, as the x12xml
+script does.  Reports input and XML output MB/s.
+
+Usage: python x12xml_throughput.py [subscriber_count]
+"""
+
+import sys
+import time
+import tempfile
+from StringIO import StringIO
+
+sys.path.insert(0, '..')
+import pyx12.params
+import pyx12.x12n_document
+from generate import make_837
+
+
+def main():
+    subscriber_ct = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    src_str = make_837(subscriber_ct)
+    param = pyx12.params.params()
+    fd_xml = tempfile.TemporaryFile()
+    t0 = time.time()
+    pyx12.x12n_document.x12n_document(param=param, src_file=StringIO(src_str),
+                                      fd_997=None, fd_html=None, fd_xmldoc=fd_xml)
+    secs = time.time() - t0
+    xml_len = fd_xml.tell()
+    fd_xml.close()
+    mb_in = len(src_str) / 1048576.0
+    mb_out = xml_len / 1048576.0
+    print('X12 input  %8.2f MB %8.2f MB/s' % (mb_in, mb_in / secs))
+    print('XML output %8.2f MB %8.2f MB/s' % (mb_out, mb_out / secs))
+    print('Elapsed    %8.2f s' % (secs))
+
+
+if __name__ == '__main__':
+    main()
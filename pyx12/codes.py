@@ -12,12 +12,12 @@
 External Codes interface
 """
 
-import os.path
-from pkg_resources import resource_stream
 import xml.etree.cElementTree as et
 
 # Intrapackage imports
 from pyx12.errors import EngineError
+import pyx12.map_bundle
+import pyx12.resources
 
 
 class CodesError(Exception):
@@ -41,22 +41,12 @@ class ExternalCodes(object):
         {codeset_id: (eff_dte, exp_dte, [code_values])}
         """
 
-        self.codes = {}
-        code_fd = resource_stream(__name__, os.path.join('map', 'codes.xml'))
-        codeset_id = None
-        #base_name = None
-
         self.exclude_list = exclude.split(',') if exclude is not None else []
 
-        for cElem in et.parse(code_fd).iter('codeset'):
-            codeset_id = cElem.findtext('id')
-            name = cElem.findtext('name')
-            data_ele = cElem.findtext('data_ele')
-            codes = []
-            for code in cElem.iterfind('version/code'):
-                codes.append(code.text)
-            self.codes[codeset_id] = {'name': name, 'dataele':
-                                      data_ele, 'codes': codes}
+        self.codes = pyx12.map_bundle.get_entry('codes.xml')
+        if self.codes is None:
+            code_fd = pyx12.resources.open_map_file('codes.xml')
+            self.codes = read_codes(code_fd)
 
     def isValid(self, key, code, check_dte=None):
         """
@@ -89,3 +79,22 @@ class ExternalCodes(object):
         """
         for key in list(self.codes.keys()):
             print((self.codes[key][:10]))
+
+
+def read_codes(code_fd):
+    """
+    Read the code sets of codes.xml
+    @param code_fd: codes.xml file object
+    @return: {codeset_id: {'name': name, 'dataele': data_ele, 'codes': [code]}}
+    @rtype: dict
+    """
+    codes = {}
+    for cElem in et.parse(code_fd).iter('codeset'):
+        codeset_id = cElem.findtext('id')
+        name = cElem.findtext('name')
+        data_ele = cElem.findtext('data_ele')
+        code_list = []
+        for code in cElem.iterfind('version/code'):
+            code_list.append(code.text)
+        codes[codeset_id] = {'name': name, 'dataele': data_ele, 'codes': code_list}
+    return codes
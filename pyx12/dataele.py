@@ -12,12 +12,12 @@
 Interface to normalized Data Elements
 """
 
-import os.path
 import xml.etree.cElementTree as et
-from pkg_resources import resource_stream
 
 # Intrapackage imports
 from pyx12.errors import EngineError
+import pyx12.map_bundle
+import pyx12.resources
 
 
 class DataElementsError(Exception):
@@ -39,16 +39,10 @@ class DataElements(object):
         {ele_num: {data_type, min_len, max_len, name}}
         """
 
-        self.dataele = {}
-        fd = resource_stream(__name__, os.path.join('map', 'dataele.xml'))
-        for eElem in et.parse(fd).iter('data_ele'):
-            ele_num = eElem.get('ele_num')
-            data_type = eElem.get('data_type')
-            min_len = int(eElem.get('min_len'))
-            max_len = int(eElem.get('max_len'))
-            name = eElem.get('name')
-            self.dataele[ele_num] = {'data_type': data_type, 'min_len':
-                                     min_len, 'max_len': max_len, 'name': name}
+        self.dataele = pyx12.map_bundle.get_entry('dataele.xml')
+        if self.dataele is None:
+            fd = pyx12.resources.open_map_file('dataele.xml')
+            self.dataele = read_data_elements(fd)
 
     def get_by_elem_num(self, ele_num):
         """
@@ -73,3 +67,22 @@ class DataElements(object):
         Debug print data elements
         """
         self.__repr__()
+
+
+def read_data_elements(fd):
+    """
+    Read the data elements of dataele.xml
+    @param fd: dataele.xml file object
+    @return: {ele_num: {data_type, min_len, max_len, name}}
+    @rtype: dict
+    """
+    dataele = {}
+    for eElem in et.parse(fd).iter('data_ele'):
+        ele_num = eElem.get('ele_num')
+        data_type = eElem.get('data_type')
+        min_len = int(eElem.get('min_len'))
+        max_len = int(eElem.get('max_len'))
+        name = eElem.get('name')
+        dataele[ele_num] = {'data_type': data_type, 'min_len':
+                            min_len, 'max_len': max_len, 'name': name}
+    return dataele
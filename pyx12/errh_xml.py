@@ -70,6 +70,7 @@ class err_handler(object):
     def __del__(self):
         while len(self.writer) > 0:
             self.writer.pop()
+        self.writer.flush()
 
     def getFilename(self):
         return self.filename
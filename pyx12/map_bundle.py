@@ -0,0 +1,229 @@
+######################################################################
+# Copyright (c) Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Precompiled bundle of the map, code and data element files
+
+The bundle holds the parsed contents of the maps listed in maps.xml, and of
+maps.xml, codes.xml and dataele.xml, so they are loaded without parsing
+XML.  It is created by x12mapc, or when the package is built.
+
+File layout:
+    - A text line: PYX12MAPC, the bundle version and the Python version
+    - The length and marshal data of the header: pyx12 version and
+      {source filename: (offset, length, (source size, source mtime,
+      source CRC-32))}
+    - For each source file, the zlib compressed marshal data of its contents
+
+marshal data can only be read by the Python version that wrote it, so a
+bundle for another Python version, bundle version or pyx12 version is
+ignored.  An entry is ignored if the size of its source file has changed,
+or if the modification time and the CRC-32 of the contents have changed.
+The source is only read for the CRC-32 if its modification time has
+changed.  In all of these cases the XML source is read.
+"""
+
+import logging
+import marshal
+import os
+import os.path
+import struct
+import sys
+import zlib
+
+# Intrapackage imports
+import pyx12.resources
+from pyx12.version import __version__
+
+BUNDLE_VERSION = 3
+BUNDLE_FILE = 'maps.bundle'
+MAGIC = 'PYX12MAPC'
+
+logger = logging.getLogger('pyx12.map_bundle')
+
+# Bundle filename, None for the package bundle
+_bundle_filename = None
+# (header, offset of the first entry), False if there is no usable bundle
+_header = None
+
+
+def get_magic():
+    """
+    @return: First line of a bundle for this Python
+    @rtype: string
+    """
+    return '%s %i %i.%i\n' % (MAGIC, BUNDLE_VERSION, sys.version_info[0],
+                              sys.version_info[1])
+
+
+def use_bundle(filename=None):
+    """
+    Set the bundle file to read
+    @param filename: Bundle filename.  If None, the bundle in the map
+        directory of the package
+    @type filename: string
+    """
+    global _bundle_filename
+    global _header
+    _bundle_filename = filename
+    _header = None
+
+
+def get_entry(name):
+    """
+    Get the compiled contents of a map directory file
+
+    @param name: Source filename - codes.xml, 837.4010.X098.A1.xml
+    @type name: string
+    @return: The contents, or None if there is no current entry in the bundle
+    """
+    bundle = _get_header()
+    if not bundle:
+        return None
+    (header, data_start) = bundle
+    try:
+        (offset, length, src_stamp) = header['entries'][name]
+    except KeyError:
+        return None
+    if not _is_current(name, src_stamp):
+        logger.debug('Bundle entry %s is out of date' % (name))
+        return None
+    fd = _open_bundle()
+    try:
+        fd.seek(data_start + offset)
+        return marshal.loads(zlib.decompress(fd.read(length)))
+    finally:
+        fd.close()
+
+
+def compile_bundle(filename=None):
+    """
+    Write a bundle of the maps listed in maps.xml and of the maps.xml,
+    codes.xml and dataele.xml files
+
+    @param filename: Target filename.  If None, the bundle in the map
+        directory of the package
+    @type filename: string
+    @return: Source filenames in the bundle
+    @rtype: list[string]
+    """
+    import pyx12.codes
+    import pyx12.dataele
+    import pyx12.map_if
+    import pyx12.map_index
+    if filename is None:
+        filename = pyx12.resources.get_map_filename(BUNDLE_FILE)
+    index_rows = pyx12.map_index.read_map_index(_source_stream('maps.xml'))
+    sources = [
+        ('maps.xml', lambda fd: index_rows),
+        ('codes.xml', pyx12.codes.read_codes),
+        ('dataele.xml', pyx12.dataele.read_data_elements),
+    ]
+    for map_file in sorted(set([row[4] for row in index_rows])):
+        if _source_stamp(map_file) is None:
+            logger.info('Map file %s is listed in maps.xml but does not exist' % (map_file))
+            continue
+        sources.append((map_file, pyx12.map_if.read_map_def))
+    entries = {}
+    blocks = []
+    offset = 0
+    for (name, reader) in sources:
+        block = zlib.compress(marshal.dumps(reader(_source_stream(name))))
+        entries[name] = (offset, len(block), _source_stamp(name))
+        blocks.append(block)
+        offset += len(block)
+    header = marshal.dumps({'pyx12_version': __version__, 'entries': entries})
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'wb') as fd:
+        fd.write(get_magic())
+        fd.write(struct.pack('<I', len(header)))
+        fd.write(header)
+        for block in blocks:
+            fd.write(block)
+    os.rename(tmp_filename, filename)
+    # Read the new header on next use
+    use_bundle(_bundle_filename)
+    return [name for (name, reader) in sources]
+
+
+def _get_header():
+    """
+    Read and check the bundle header once
+    """
+    global _header
+    if _header is None:
+        _header = False
+        try:
+            fd = _open_bundle()
+        except IOError:
+            return _header
+        try:
+            if fd.readline() != get_magic():
+                logger.debug('Bundle is for another version')
+                return _header
+            (header_len, ) = struct.unpack('<I', fd.read(4))
+            header = marshal.loads(fd.read(header_len))
+            if header.get('pyx12_version') != __version__:
+                logger.debug('Bundle is for pyx12 %s' % (header.get('pyx12_version')))
+                return _header
+            _header = (header, fd.tell())
+        finally:
+            fd.close()
+    return _header
+
+
+def _open_bundle():
+    if _bundle_filename is not None:
+        return open(_bundle_filename, 'rb')
+    return pyx12.resources.open_map_file(BUNDLE_FILE)
+
+
+def _source_stream(name):
+    return pyx12.resources.open_map_file(name)
+
+
+def _source_stamp(name):
+    """
+    @return: (size, modification time, CRC-32 of the contents) of a map
+        directory file, or None if it does not exist
+    @rtype: (int, float, int)
+    """
+    filename = pyx12.resources.get_map_filename(name)
+    try:
+        st = os.stat(filename)
+        return (st.st_size, st.st_mtime, _crc32(filename))
+    except (OSError, IOError):
+        return None
+
+
+def _is_current(name, src_stamp):
+    """
+    Is the bundle entry of a map directory file current.  A missing source
+    file does not make the entry out of date.
+
+    @param src_stamp: The stamp of the source when the bundle was written
+    @type src_stamp: (int, float, int)
+    @rtype: boolean
+    """
+    filename = pyx12.resources.get_map_filename(name)
+    try:
+        st = os.stat(filename)
+        if st.st_size != src_stamp[0]:
+            return False
+        if st.st_mtime == src_stamp[1]:
+            return True
+        return _crc32(filename) == src_stamp[2]
+    except (OSError, IOError):
+        return True
+
+
+def _crc32(filename):
+    with open(filename, 'rb') as fd:
+        return zlib.crc32(fd.read()) & 0xffffffff
@@ -16,13 +16,14 @@ import string
 import sys
 import re
 import xml.etree.cElementTree as et
-from pkg_resources import resource_stream
 
 # Intrapackage imports
 from errors import EngineError
 import codes
 import dataele
+import map_bundle
 import path
+import resources
 import validation
 from syntax import is_syntax_valid
 
@@ -41,6 +42,11 @@ class x12_node(object):
         self.path = ''
         self._x12path = None
         self._fullpath = None
+        self._path_tuple = None
+        # Dense integer id of a loop or segment node, set by the parent.  The
+        # nodes of a loop have the ids node_id to node_id + node_count - 1
+        self.node_id = None
+        self.node_count = 1
 
     def __eq__(self, other):
         if isinstance(other, x12_node):
@@ -117,6 +123,15 @@ class x12_node(object):
             self._fullpath = parent_path + '/' + self.path
             return self._fullpath
 
+    def get_path_tuple(self):
+        """
+        @return: Node ids of the path, cached - ('ISA_LOOP', 'GS_LOOP', ...)
+        @rtype: tuple
+        """
+        if self._path_tuple is None:
+            self._path_tuple = tuple([x for x in self.get_path().split('/') if x != ''])
+        return self._path_tuple
+
     def _get_x12_path(self):
         """
         @return: X12 node path
@@ -174,9 +189,10 @@ class map_if(x12_node):
     """
     Map file interface
     """
-    def __init__(self, eroot, param):
+    def __init__(self, map_def, param):
         """
-        @param eroot: ElementTree root
+        @param map_def: Map definition, from L{read_map_def}
+        @type map_def: dict
         @param param: map of parameters
         """
         #codes = codes.ExternalCodes()
@@ -186,26 +202,33 @@ class map_if(x12_node):
         self.pos_map = {}
         self.cur_path = '/transaction'
         self.path = '/'
+        self.map_file = None
         #self.cur_iter_node = self
         self.param = param
         #global codes
         self.ext_codes = codes.ExternalCodes(None,
                                              param.get('exclude_external_codes'))
         self.data_elements = dataele.DataElements()
+        # Compiled walk transitions, see L{map_walker.WalkMachine}
+        self.walk_machine = None
 
-        self.id = eroot.get('xid')
+        self.id = map_def.get('xid')
 
-        self.name = eroot.get(
-            'name') if eroot.get('name') else eroot.findtext('name')
+        self.name = map_def.get('name')
         self.base_name = 'transaction'
-        for e in eroot.findall('loop'):
-            loop_node = loop_if(self, self, e)
+        self.node_id = 0
+        self.node_count = _count_nodes(map_def)
+        next_id = self.node_id + 1
+        for d in _child_defs(map_def, 'loop'):
+            loop_node = loop_if(self, self, d)
+            next_id = _set_node_id(loop_node, next_id, d)
             try:
                 self.pos_map[loop_node.pos].append(loop_node)
             except KeyError:
                 self.pos_map[loop_node.pos] = [loop_node]
-        for e in eroot.findall('segment'):
-            seg_node = segment_if(self, self, e)
+        for d in _child_defs(map_def, 'segment'):
+            seg_node = segment_if(self, self, d)
+            next_id = _set_node_id(seg_node, next_id)
             try:
                 self.pos_map[seg_node.pos].append(seg_node)
             except KeyError:
@@ -360,42 +383,63 @@ class map_if(x12_node):
 class loop_if(x12_node):
     """
     Loop Interface
+
+    The child nodes are created from the loop definition on the first use of
+    pos_map, so the loops and segments a document does not reach are never
+    built.
     """
-    def __init__(self, root, parent, elem):
+    def __init__(self, root, parent, loop_def):
         """
+        @param loop_def: Loop definition
+        @type loop_def: dict
         """
         x12_node.__init__(self)
         self.root = root
         self.parent = parent
-        self.pos_map = {}
         #self.path = ''
         self.base_name = 'loop'
         #self.type = 'implicit'
         self.cur_count = 0
 
-        self.id = elem.get('xid')
+        self.id = loop_def.get('xid')
         self.path = self.id
-        self.type = elem.get('type')
-
-        self.name = elem.get(
-            'name') if elem.get('name') else elem.findtext('name')
-        self.usage = elem.get(
-            'usage') if elem.get('usage') else elem.findtext('usage')
-        self.pos = int(elem.get(
-            'pos')) if elem.get('pos') else int(elem.findtext('pos'))
-        self.repeat = elem.get('repeat') if elem.get(
-            'repeat') else elem.findtext('repeat')
-
-        for e in elem.findall('loop'):
-            loop_node = loop_if(self.root, self, e)
+        self.type = loop_def.get('type')
+
+        self.name = loop_def.get('name')
+        self.usage = loop_def.get('usage')
+        self.pos = int(loop_def.get('pos'))
+        self.repeat = loop_def.get('repeat')
+        self._loop_def = loop_def
+
+    def __getattr__(self, name):
+        """
+        Only called for attributes not yet set.  Build the child nodes on
+        the first use of pos_map.
+        """
+        if name == 'pos_map':
+            self._build_children()
+            return self.pos_map
+        raise AttributeError(name)
+
+    def _build_children(self):
+        """
+        Create the child loop and segment nodes
+        """
+        loop_def = self._loop_def
+        self.pos_map = {}
+        next_id = self.node_id + 1
+        for d in _child_defs(loop_def, 'loop'):
+            loop_node = loop_if(self.root, self, d)
+            next_id = _set_node_id(loop_node, next_id, d)
             #if self.pos_map:
             #    assert loop_node.pos >= max(self.pos_map.keys()), 'Bad ordinal %s' % (loop_node)
             try:
                 self.pos_map[loop_node.pos].append(loop_node)
             except KeyError:
                 self.pos_map[loop_node.pos] = [loop_node]
-        for e in elem.findall('segment'):
-            seg_node = segment_if(self.root, self, e)
+        for d in _child_defs(loop_def, 'segment'):
+            seg_node = segment_if(self.root, self, d)
+            next_id = _set_node_id(seg_node, next_id)
             #if self.pos_map:
             #    assert seg_node.pos >= max(self.pos_map.keys()), 'Bad ordinal %s' % (seg_node)
             try:
@@ -410,6 +454,14 @@ class loop_if(x12_node):
                     id_elem = seg_node.guess_unique_key_id_element()
                     if id_elem is not None:
                         seg_node.path = seg_node.path + '[' + id_elem.valid_codes[0] + ']'
+        del self._loop_def
+
+    def is_built(self):
+        """
+        @return: Have the child nodes been created?
+        @rtype: boolean
+        """
+        return 'pos_map' in self.__dict__
 
     def debug_print(self):
         sys.stdout.write(self.__repr__())
@@ -611,6 +663,9 @@ class loop_if(x12_node):
         """
         Set cur_count of child nodes to zero
         """
+        if not self.is_built():
+            # No child has been counted
+            return
         for ord1 in sorted(self.pos_map):
             for child in self.pos_map[ord1]:
                 child.reset_cur_count()
@@ -651,9 +706,11 @@ class segment_if(x12_node):
     """
     Segment Interface
     """
-    def __init__(self, root, parent, elem):
+    def __init__(self, root, parent, seg_def):
         """
         @param parent: parent node
+        @param seg_def: Segment definition
+        @type seg_def: dict
         """
 
         x12_node.__init__(self)
@@ -665,47 +722,91 @@ class segment_if(x12_node):
         self.cur_count = 0
         self.syntax = []
 
-        self.id = elem.get('xid')
+        self.id = seg_def.get('xid')
         self.path = self.id
-        self.type = elem.get('type')
-
-        self.name = elem.get(
-            'name') if elem.get('name') else elem.findtext('name')
-        self.usage = elem.get(
-            'usage') if elem.get('usage') else elem.findtext('usage')
-        self.pos = int(elem.get(
-            'pos')) if elem.get('pos') else int(elem.findtext('pos'))
-        self.max_use = elem.get('max_use') if elem.get(
-            'max_use') else elem.findtext('max_use')
-        self.repeat = elem.get('repeat') if elem.get(
-            'repeat') else elem.findtext('repeat')
-
-        self.end_tag = elem.get('end_tag') if elem.get(
-            'end_tag') else elem.findtext('end_tag')
-
-        for s in elem.findall('syntax'):
-            syn_list = self._split_syntax(s.text)
+        self.type = seg_def.get('type')
+
+        self.name = seg_def.get('name')
+        self.usage = seg_def.get('usage')
+        self.pos = int(seg_def.get('pos'))
+        self.max_use = seg_def.get('max_use')
+        self.repeat = seg_def.get('repeat')
+
+        self.end_tag = seg_def.get('end_tag')
+
+        for syntax in seg_def.get('syntax', []):
+            syn_list = self._split_syntax(syntax)
             if syn_list is not None:
                 self.syntax.append(syn_list)
 
         children_map = {}
-        for e in elem.findall('element'):
-            seq = int(e.get('seq')) if e.get('seq') else int(e.findtext('seq'))
-            children_map[seq] = e
-            #self.children.append(element_if(self.root, self, e))
+        for d in _child_defs(seg_def, 'element'):
+            children_map[int(d.get('seq'))] = d
 
-        for e in elem.findall('composite'):
-            seq = int(e.get('seq')) if e.get('seq') else int(e.findtext('seq'))
-            children_map[seq] = e
-            #self.children.append(composite_if(self.root, self, e))
+        for d in _child_defs(seg_def, 'composite'):
+            children_map[int(d.get('seq'))] = d
 
         for seq in sorted(children_map.keys()):
-            if children_map[seq].tag == 'element':
+            if children_map[seq]['tag'] == 'element':
                 self.children.append(element_if(
                     self.root, self, children_map[seq]))
-            elif children_map[seq].tag == 'composite':
+            elif children_map[seq]['tag'] == 'composite':
                 self.children.append(composite_if(
                     self.root, self, children_map[seq]))
+        (self._match_quals, self._qual) = self._get_qualifiers()
+
+    def _get_qualifiers(self):
+        """
+        Find the ID elements that distinguish this segment from others of
+        the same segment ID, for L{is_match} and L{is_match_qual}
+
+        @return: (qualifiers a segment must match, qualifier of
+            is_match_qual or None).  A qualifier is (element index,
+            sub-element index or None, valid codes)
+        @rtype: tuple(list[tuple], tuple)
+        """
+        match_quals = []
+        qual = None
+        ele1 = self.children[0] if len(self.children) > 0 else None
+        ele2 = self.children[1] if len(self.children) > 1 else None
+        ele3 = self.children[2] if len(self.children) > 2 else None
+        subele1 = None
+        if ele1 is not None and ele1.is_composite() and len(ele1.children) > 0:
+            subele1 = ele1.children[0]
+        if ele1 is not None and ele1.is_element() and ele1.usage == 'R' \
+                and len(ele1.valid_codes) > 0 and ele1.get_data_type() == 'ID':
+            qual = (0, None, frozenset(ele1.valid_codes))
+            match_quals.append(qual)
+        # Special Case for 820
+        if self.id == 'ENT' and ele2 is not None and ele2.is_element() \
+                and len(ele2.valid_codes) > 0 and ele2.get_data_type() == 'ID':
+            ent_qual = (1, None, frozenset(ele2.valid_codes))
+            match_quals.append(ent_qual)
+            if qual is None:
+                qual = ent_qual
+        if subele1 is not None and len(subele1.valid_codes) > 0:
+            data_type = subele1.get_data_type()
+            # Special Case for 999 CTX
+            # IG defines the dataelement 2100/CT01-1 as an AN, but acts like an ID
+            if data_type == 'ID' or (self.id == 'CTX' and data_type == 'AN'):
+                comp_qual = (0, 0, frozenset(subele1.valid_codes))
+                match_quals.append(comp_qual)
+                if qual is None and data_type == 'ID':
+                    qual = comp_qual
+        if self.id == 'HL' and ele3 is not None and ele3.is_element() \
+                and len(ele3.valid_codes) > 0:
+            hl_qual = (2, None, frozenset(ele3.valid_codes))
+            match_quals.append(hl_qual)
+            if qual is None:
+                qual = hl_qual
+        return (match_quals, qual)
+
+    def get_match_qualifiers(self):
+        """
+        @return: The qualifiers a segment must match, see L{is_match}
+        @rtype: list[(element index, sub-element index or None, valid codes)]
+        """
+        return self._match_quals
 
     def debug_print(self):
         sys.stdout.write(self.__repr__())
@@ -775,43 +876,12 @@ class segment_if(x12_node):
         @return: boolean
         @rtype: boolean
         """
-        if seg.get_seg_id() == self.id:
-            if self.children[0].is_element() \
-                and self.children[0].get_data_type() == 'ID' \
-                and self.children[0].usage == 'R' \
-                and len(self.children[0].valid_codes) > 0 \
-                and seg.get_value('01') not in self.children[0].valid_codes:
-                #logger.debug('is_match: %s %s' % (seg.get_seg_id(), seg[1]), self.children[0].valid_codes)
-                return False
-            # Special Case for 820
-            elif seg.get_seg_id() == 'ENT' \
-                and self.children[1].is_element() \
-                and self.children[1].get_data_type() == 'ID' \
-                and len(self.children[1].valid_codes) > 0 \
-                and seg.get_value('02') not in self.children[1].valid_codes:
-                #logger.debug('is_match: %s %s' % (seg.get_seg_id(), seg[1]), self.children[0].valid_codes)
-                return False
-            # Special Case for 999 CTX
-            # IG defines the dataelement 2100/CT01-1 as an AN, but acts like an ID
-            elif seg.get_seg_id() == 'CTX' \
-                and self.children[0].is_composite() \
-                and self.children[0].children[0].get_data_type() == 'AN' \
-                and len(self.children[0].children[0].valid_codes) > 0 \
-                and seg.get_value('01-1') not in self.children[0].children[0].valid_codes:
-                return False
-            elif self.children[0].is_composite() \
-                and self.children[0].children[0].get_data_type() == 'ID' \
-                and len(self.children[0].children[0].valid_codes) > 0 \
-                and seg.get_value('01-1') not in self.children[0].children[0].valid_codes:
-                return False
-            elif seg.get_seg_id() == 'HL' and self.children[2].is_element() \
-                and len(self.children[2].valid_codes) > 0 \
-                and seg.get_value('03') not in self.children[2].valid_codes:
-                return False
-            else:
-                return True
-        else:
+        if seg.get_seg_id() != self.id:
             return False
+        for (ele_idx, subele_idx, codes) in self._match_quals:
+            if seg.get_value_by_idx(ele_idx, subele_idx) not in codes:
+                return False
+        return True
 
     def is_match_qual(self, seg_data, seg_id, qual_code):
         """
@@ -823,43 +893,13 @@ class segment_if(x12_node):
         @return: True if a match
         @rtype: boolean
         """
-        if seg_id == self.id:
-            if qual_code is None:
-                return True
-            elif self.children[0].is_element() \
-                    and self.children[0].get_data_type() == 'ID' \
-                    and self.children[0].usage == 'R' \
-                    and len(self.children[0].valid_codes) > 0:
-                if qual_code in self.children[0].valid_codes and seg_data.get_value('01') == qual_code:
-                    return True
-                else:
-                    return False
-            # Special Case for 820
-            elif seg_id == 'ENT' \
-                    and self.children[1].is_element() \
-                    and self.children[1].get_data_type() == 'ID' \
-                    and len(self.children[1].valid_codes) > 0:
-                if qual_code in self.children[1].valid_codes and seg_data.get_value('02') == qual_code:
-                    return True
-                else:
-                    return False
-            elif self.children[0].is_composite() \
-                    and self.children[0].children[0].get_data_type() == 'ID' \
-                    and len(self.children[0].children[0].valid_codes) > 0:
-                if qual_code in self.children[0].children[0].valid_codes and seg_data.get_value('01-1') == qual_code:
-                    return True
-                else:
-                    return False
-            elif seg_id == 'HL' and self.children[2].is_element() \
-                    and len(self.children[2].valid_codes) > 0:
-                if qual_code in self.children[2].valid_codes and seg_data.get_value('03') == qual_code:
-                    return True
-                else:
-                    return False
-            else:
-                return True
-        else:
+        if seg_id != self.id:
             return False
+        if qual_code is None or self._qual is None:
+            return True
+        (ele_idx, subele_idx, codes) = self._qual
+        return qual_code in codes \
+            and seg_data.get_value_by_idx(ele_idx, subele_idx) == qual_code
 
     def guess_unique_key_id_element(self):
         """
@@ -934,10 +974,8 @@ class segment_if(x12_node):
                 comp_data = seg_data.get(ref_des)
                 subele_count = child_node.get_child_count()
                 if seg_data.ele_len(ref_des) > subele_count and child_node.usage != 'N':
-                    subele_node = child_node.get_child_node_by_idx(
-                        subele_count + 1)
                     err_str = 'Too many sub-elements in composite "%s" (%s)' % \
-                        (subele_node.name, subele_node.refdes)
+                        (child_node.name, child_node.refdes)
                     err_value = seg_data.get_value(ref_des)
                     errh.ele_error('3', err_str, err_value, ref_des)
                 valid &= child_node.is_valid(comp_data, errh)
@@ -1029,9 +1067,11 @@ class element_if(x12_node):
     Element Interface
     """
 
-    def __init__(self, root, parent, elem):
+    def __init__(self, root, parent, ele_def):
         """
         @param parent: parent node
+        @param ele_def: Element definition
+        @type ele_def: dict
         """
         x12_node.__init__(self)
         self.children = []
@@ -1042,21 +1082,15 @@ class element_if(x12_node):
         self.external_codes = None
         self.rec = None
 
-        self.id = elem.get('xid')
+        self.id = ele_def.get('xid')
         self.refdes = self.id
-        self.data_ele = elem.get('data_ele') if elem.get(
-            'data_ele') else elem.findtext('data_ele')
-        self.usage = elem.get(
-            'usage') if elem.get('usage') else elem.findtext('usage')
-        self.name = elem.get(
-            'name') if elem.get('name') else elem.findtext('name')
-        self.seq = int(elem.get(
-            'seq')) if elem.get('seq') else int(elem.findtext('seq'))
-        self.path = elem.get(
-            'seq') if elem.get('seq') else elem.findtext('seq')
-        self.max_use = elem.get('max_use') if elem.get(
-            'max_use') else elem.findtext('max_use')
-        self.res = elem.findtext('regex')
+        self.data_ele = ele_def.get('data_ele')
+        self.usage = ele_def.get('usage')
+        self.name = ele_def.get('name')
+        self.path = ele_def.get('seq')
+        self.seq = int(self.path)
+        self.max_use = ele_def.get('max_use')
+        self.res = ele_def.get('regex')
         try:
             if self.res is not None and self.res != '':
                 self.rec = re.compile(self.res, re.S)
@@ -1064,11 +1098,9 @@ class element_if(x12_node):
             raise EngineError('Element regex "%s" failed to compile' %
                 (self.res))
 
-        v = elem.find('valid_codes')
-        if v is not None:
-            self.external_codes = v.get('external')
-            for c in v.findall('code'):
-                self.valid_codes.append(c.text)
+        if 'valid_codes' in ele_def:
+            self.external_codes = ele_def.get('external')
+            self.valid_codes.extend(ele_def['valid_codes'])
 
     def debug_print(self):
         sys.stdout.write(self.__repr__())
@@ -1297,10 +1329,12 @@ class composite_if(x12_node):
     """
     Composite Node Interface
     """
-    def __init__(self, root, parent, elem):
+    def __init__(self, root, parent, comp_def):
         """
         Get the values for this composite
         @param parent: parent node
+        @param comp_def: Composite definition
+        @type comp_def: dict
         """
         x12_node.__init__(self)
 
@@ -1310,22 +1344,16 @@ class composite_if(x12_node):
         self.path = ''
         self.base_name = 'composite'
 
-        self.id = elem.get('xid')
-        self.refdes = elem.findtext(
-            'refdes') if elem.findtext('refdes') else self.id
-        self.data_ele = elem.get('data_ele') if elem.get(
-            'data_ele') else elem.findtext('data_ele')
-        self.usage = elem.get(
-            'usage') if elem.get('usage') else elem.findtext('usage')
-        self.seq = int(elem.get(
-            'seq')) if elem.get('seq') else int(elem.findtext('seq'))
-        self.repeat = int(elem.get('repeat')) if elem.get('repeat') else int(
-            elem.findtext('repeat')) if elem.findtext('repeat') else 1
-        self.name = elem.get(
-            'name') if elem.get('name') else elem.findtext('name')
-
-        for e in elem.findall('element'):
-            self.children.append(element_if(self.root, self, e))
+        self.id = comp_def.get('xid')
+        self.refdes = comp_def.get('refdes') or self.id
+        self.data_ele = comp_def.get('data_ele')
+        self.usage = comp_def.get('usage')
+        self.seq = int(comp_def.get('seq'))
+        self.repeat = int(comp_def.get('repeat') or 1)
+        self.name = comp_def.get('name')
+
+        for d in _child_defs(comp_def, 'element'):
+            self.children.append(element_if(self.root, self, d))
 
     def _error(self, errh, err_str, err_cde, elem_val):
         """
@@ -1420,12 +1448,14 @@ def load_map_file(map_file, param):
     @rtype: pyx12.map_if
     """
     logger = logging.getLogger('pyx12')
-    map_fd = resource_stream(__name__, os.path.join('map', map_file))
     imap = None
     try:
-        logger.debug('Create map from %s' % (map_file))
-        etree = et.parse(map_fd)
-        imap = map_if(etree.getroot(), param)
+        map_def = map_bundle.get_entry(map_file)
+        if map_def is None:
+            logger.debug('Create map from %s' % (map_file))
+            map_def = read_map_def(resources.open_map_file(map_file))
+        imap = map_if(map_def, param)
+        imap.map_file = map_file
     except AssertionError:
         logger.error('Load of map file failed: %s' % (map_file))
         raise
@@ -1433,3 +1463,116 @@ def load_map_file(map_file, param):
         raise
         #raise EngineError('Load of map file failed: %s' % (map_file))
     return imap
+
+
+# Child elements holding a single value of the enclosing node
+MAP_FIELDS = frozenset(['name', 'usage', 'pos', 'repeat', 'max_use', 'seq',
+                        'data_ele', 'refdes', 'regex', 'end_tag'])
+MAP_NODES = frozenset(['transaction', 'loop', 'segment', 'composite', 'element'])
+
+
+def read_map_def(map_fd):
+    """
+    Read a map file into nested definitions.  The file is parsed
+    incrementally and the content of each node element is dropped when it
+    closes, so the full document tree is never built.
+
+    Both map formats are read: fields as child elements, and the .v2
+    format with fields as attributes.  A definition is a dict of the
+    attributes and fields of a node, with the keys:
+        - tag: transaction, loop, segment, composite or element
+        - children: list of child definitions, in document order
+        - syntax: list of segment syntax strings
+        - valid_codes, external: element codes and external code set
+
+    @param map_fd: Map filename or file object
+    @return: Definition of the transaction node
+    @rtype: dict
+    """
+    node_tags = MAP_NODES
+    field_tags = MAP_FIELDS
+    # Definitions of closed nodes, until their parent closes
+    built = {}
+    for (event, elem) in et.iterparse(map_fd):
+        if elem.tag not in node_tags:
+            continue
+        node_def = dict(elem.items())
+        node_def['tag'] = elem.tag
+        children = []
+        for child in elem:
+            tag = child.tag
+            if tag in field_tags:
+                # An attribute value takes precedence
+                if not node_def.get(tag):
+                    node_def[tag] = child.text or ''
+            elif tag in node_tags:
+                children.append(built.pop(child))
+            elif tag == 'valid_codes':
+                node_def['valid_codes'] = [c.text for c in child]
+                node_def['external'] = child.get('external')
+            elif tag == 'syntax':
+                node_def.setdefault('syntax', []).append(child.text)
+        node_def['children'] = children
+        # Only the empty element remains in the parent
+        elem.clear()
+        built[elem] = node_def
+    return node_def
+
+
+def _child_defs(node_def, tag):
+    """
+    Iterate over the child definitions of one type
+    """
+    for child_def in node_def['children']:
+        if child_def['tag'] == tag:
+            yield child_def
+
+
+def _count_nodes(node_def):
+    """
+    @return: Number of loop and segment nodes of a definition, including
+        the node itself
+    @rtype: int
+    """
+    ct = 1
+    for child_def in node_def['children']:
+        if child_def['tag'] == 'loop':
+            ct += _count_nodes(child_def)
+        elif child_def['tag'] == 'segment':
+            ct += 1
+    return ct
+
+
+def _set_node_id(node, node_id, loop_def=None):
+    """
+    Number a new child node
+    @param node_id: First free id of the parent loop
+    @param loop_def: Definition of a loop node
+    @return: Next free id
+    @rtype: int
+    """
+    node.node_id = node_id
+    if loop_def is not None:
+        node.node_count = _count_nodes(loop_def)
+    return node_id + node.node_count
+
+
+def get_cached_map(map_file, param, map_cache=None):
+    """
+    Get a map from a cache, loading it on first use.  A cached map has its
+    counts reset, so it is in the same state as a newly loaded map.
+    @param map_file: Map filename
+    @type map_file: string
+    @param map_cache: {map_file: map}.  If None, the map is loaded
+    @type map_cache: dict
+    @rtype: pyx12.map_if
+    """
+    if map_cache is None:
+        return load_map_file(map_file, param)
+    imap = map_cache.get(map_file)
+    if imap is None:
+        imap = load_map_file(map_file, param)
+        map_cache[map_file] = imap
+    else:
+        imap.reset_cur_count()
+    return imap
@@ -16,33 +16,52 @@ Locate the correct xml map file given:
     - Transaction Set Purpose Code (BHT02) (For 278 only)
 """
 
-import os.path
-from pkg_resources import resource_stream
 import xml.etree.cElementTree as et
 
+# Intrapackage imports
+import pyx12.map_bundle
+import pyx12.resources
+
+
+# Process wide index, read from maps.xml on first use
+# {(icvn, vriic, fic, tspc): map}.  tspc is None for a map of any tspc
+_index = None
+# {(icvn, vriic, fic): map}, for lookups without a tspc
+_first = None
+# All maps, in order
+_maps = None
+
 
 class map_index(object):
     """
     Interface to the maps.xml file
+
+    All instances share one index per process, so maps.xml is read once
+    and maps added with L{register_map} are seen by every instance.  Maps
+    added with L{add_map} are only seen by the instance.
     """
     def __init__(self, map_index_file=None):
         """
         @param map_index_file: deprecated
         @type map_index_file: string
         """
-        self.maps = []
-
-        fd = resource_stream(__name__, os.path.join('map', 'maps.xml'))
-        t = et.parse(fd)
-        for v in t.iter('version'):
-            icvn = v.get('icvn')
-            for m in v.iterfind('map'):
-                self.add_map(icvn, m.get('vriic'), m.get('fic'),
-                             m.get('tspc'), m.text, m.get('abbr'))
+        _load_index()
+        self.maps = list(_maps)
+        # Maps added to this instance, keyed as _index and _first
+        self._index = {}
+        self._first = {}
 
     def add_map(self, icvn, vriic, fic, tspc, map_file, abbr):
-        self.maps.append({'icvn': icvn, 'vriic': vriic, 'fic': fic,
-                          'tspc': tspc, 'map_file': map_file, 'abbr': abbr})
+        """
+        Add a map to this instance.  It is used only if no map of the
+        process wide index, or map added before, has the same icvn, vriic,
+        fic and tspc.
+        """
+        a = {'icvn': icvn, 'vriic': vriic, 'fic': fic, 'tspc': tspc,
+             'map_file': map_file, 'abbr': abbr}
+        self.maps.append(a)
+        self._index.setdefault((icvn, vriic, fic, tspc), a)
+        self._first.setdefault((icvn, vriic, fic), a)
 
     def get_filename(self, icvn, vriic, fic, tspc=None):
         """
@@ -50,11 +69,8 @@ class map_index(object):
         and tspc values
         @rtype: string
         """
-        for a in self.maps:
-            if a['icvn'] == icvn and a['vriic'] == vriic and a['fic'] == fic \
-                    and (tspc is None or a['tspc'] == tspc):
-                return a['map_file']
-        return None
+        a = self._get_map(icvn, vriic, fic, tspc)
+        return a['map_file'] if a is not None else None
 
     def get_abbr(self, icvn, vriic, fic, tspc=None):
         """
@@ -62,12 +78,114 @@ class map_index(object):
         fic, and tspc values
         @rtype: string
         """
-        for a in self.maps:
-            if a['icvn'] == icvn and a['vriic'] == vriic and a['fic'] == fic \
-                    and (tspc is None or a['tspc'] == tspc):
-                return a['abbr']
-        return None
+        a = self._get_map(icvn, vriic, fic, tspc)
+        return a['abbr'] if a is not None else None
 
     def print_all(self):
         for a in self.maps:
             print(a)
+
+    def _get_map(self, icvn, vriic, fic, tspc):
+        """
+        Find a map in the process wide index, then in the maps added to this
+        instance
+        """
+        if not self._first:
+            return get_map(icvn, vriic, fic, tspc)
+        if tspc is None:
+            return _first.get((icvn, vriic, fic)) or self._first.get((icvn, vriic, fic))
+        for index in (_index, self._index):
+            a = index.get((icvn, vriic, fic, tspc))
+            if a is not None:
+                return a
+        return _index.get((icvn, vriic, fic, None)) \
+            or self._index.get((icvn, vriic, fic, None))
+
+
+def get_map(icvn, vriic, fic, tspc=None):
+    """
+    Find a map.  Without a tspc, the first map of the icvn, vriic and fic
+    is used.  With a tspc, a map of that tspc, or else a map for any tspc.
+
+    @param icvn: Interchange Control Version Number (ISA12)
+    @param vriic: Version / Release / Industry Identifier Code (GS08)
+    @param fic: Functional Identifier Code (GS01)
+    @param tspc: Transaction Set Purpose Code (BHT02)
+    @return: {'icvn', 'vriic', 'fic', 'tspc', 'map_file', 'abbr'} or None
+    @rtype: dict
+    """
+    _load_index()
+    if tspc is None:
+        return _first.get((icvn, vriic, fic))
+    a = _index.get((icvn, vriic, fic, tspc))
+    if a is None:
+        a = _index.get((icvn, vriic, fic, None))
+    return a
+
+
+def register_map(icvn, vriic, fic, tspc, map_file, abbr):
+    """
+    Add a map to the process wide index.  It replaces a map of the same
+    icvn, vriic, fic and tspc, and is used for lookups without a tspc.
+
+    @param tspc: Transaction Set Purpose Code, or None for any
+    @param map_file: Filename in the package map directory, or an absolute
+        filename
+    @type map_file: string
+    @param abbr: Informal abbreviation - 837P
+    @type abbr: string
+    """
+    _load_index()
+    _add_map((icvn, vriic, fic, tspc, map_file, abbr), True)
+
+
+def _load_index():
+    global _index
+    global _first
+    global _maps
+    if _index is not None:
+        return
+    rows = pyx12.map_bundle.get_entry('maps.xml')
+    if rows is None:
+        fd = pyx12.resources.open_map_file('maps.xml')
+        rows = read_map_index(fd)
+    _index = {}
+    _first = {}
+    _maps = []
+    for row in rows:
+        _add_map(row, False)
+
+
+def _add_map(row, replace):
+    """
+    @param row: (icvn, vriic, fic, tspc, map_file, abbr)
+    @param replace: If False, the first map of a key is kept
+    """
+    (icvn, vriic, fic, tspc, map_file, abbr) = row
+    a = {'icvn': icvn, 'vriic': vriic, 'fic': fic, 'tspc': tspc,
+         'map_file': map_file, 'abbr': abbr}
+    old = _index.get((icvn, vriic, fic, tspc)) if replace else None
+    if old is not None:
+        _maps[[id(x) for x in _maps].index(id(old))] = a
+    else:
+        _maps.append(a)
+    if replace or (icvn, vriic, fic, tspc) not in _index:
+        _index[(icvn, vriic, fic, tspc)] = a
+    if replace or (icvn, vriic, fic) not in _first:
+        _first[(icvn, vriic, fic)] = a
+
+
+def read_map_index(fd):
+    """
+    Read the maps of maps.xml
+    @param fd: maps.xml file object
+    @return: [(icvn, vriic, fic, tspc, map_file, abbr)]
+    @rtype: list[tuple]
+    """
+    rows = []
+    for v in et.parse(fd).iter('version'):
+        icvn = v.get('icvn')
+        for m in v.iterfind('map'):
+            rows.append((icvn, m.get('vriic'), m.get('fic'), m.get('tspc'),
+                         m.text, m.get('abbr')))
+    return rows
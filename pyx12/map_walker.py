@@ -15,8 +15,14 @@ Walk a tree of x12_map nodes.  Find the correct node.
 
 If seg indicates a loop has been entered, returns the first child segment node.
 If seg indicates a segment has been entered, returns the segment node.
+
+A walk is a search of the map, which does not depend on the node counts,
+followed by the counting and error checks of its result.  The search results
+of each map are compiled into a L{WalkMachine}, so a well-formed file is
+walked with a lookup per segment.  Other search results are memoized.
 """
 
+import collections
 import logging
 
 # Intrapackage imports
@@ -91,14 +97,373 @@ def traverse_path(start_node, pop_loops, push_loops):
     return '/' + '/'.join(p1)
 
 
+# Kinds of search result
+# The segment matched a segment node of a loop searched
+FOUND_SEGMENT = 0
+# The segment matched the first segment node of a loop
+FOUND_LOOP = 1
+# A loop matched, but none of its first segment nodes
+FOUND_NONE = 2
+NOT_FOUND = 3
+
+# Default maximum number of memoized search results of a map
+MEMO_SIZE = 2000
+
+
+def search(node, is_match):
+    """
+    Search the map from the starting node for the node of a segment
+
+    The result does not depend on the node counts.  The required segments
+    and loops passed over are returned, and are missing if their count is
+    zero.
+
+    @param node: Starting node
+    @type node: L{node<map_if.x12_node>}
+    @param is_match: Does a segment node match the segment?
+    @type is_match: function(L{node<map_if.segment_if>})
+    @return: (kind, segment node, pop loops, push loops, loop entered,
+        [(required segment node, its loop node or None)])
+    @rtype: tuple
+    """
+    pop_node_list = []
+    guards = []
+    orig_node = node
+    node_pos = node.pos  # Get original position ordinal of starting node
+    if not (node.is_loop() or node.is_map_root()):
+        node = pop_to_parent_loop(node)  # Get enclosing loop
+    while True:
+        # Iterate through nodes with position >= current position
+        for ord1 in [a for a in sorted(node.pos_map) if a >= node_pos]:
+            for child in node.pos_map[ord1]:
+                if child.is_segment():
+                    if is_match(child):
+                        # Is the matched segment the beginning of a loop?
+                        if node.is_loop() and _is_loop_match(node, is_match, guards):
+                            (kind, node1, push_node_list, loop_node) = _goto_seg_match(node, is_match)
+                            if orig_node.is_loop() or orig_node.is_map_root():
+                                orig_loop = orig_node
+                            else:
+                                orig_loop = pop_to_parent_loop(orig_node)  # Get enclosing loop
+                            if node == orig_loop:
+                                pop_node_list = [node]
+                                push_node_list = [node]
+                            return (kind, node1, pop_node_list, push_node_list, loop_node, guards)
+                        return (FOUND_SEGMENT, child, pop_node_list, [], None, guards)
+                    elif child.usage == 'R':
+                        guards.append((child, None))
+                elif child.is_loop():
+                    if _is_loop_match(child, is_match, guards):
+                        (kind, node_seg, push_node_list, loop_node) = _goto_seg_match(child, is_match)
+                        return (kind, node_seg, pop_node_list, push_node_list, loop_node, guards)
+        # End for ord1 in pos_keys
+        if node.is_map_root():  # If at root and we haven't found the segment yet.
+            return (NOT_FOUND, None, [], [], None, guards)
+        node_pos = node.pos  # Get position ordinal of current node in tree
+        pop_node_list.append(node)
+        node = pop_to_parent_loop(node)  # Get enclosing parent loop
+
+
+def _is_loop_match(loop_node, is_match, guards):
+    """
+    Try to match the current loop to the segment
+
+    @param loop_node: Loop Node
+    @type loop_node: L{node<map_if.loop_if>}
+    @param guards: Required loops passed over are appended
+    @return: Does the segment match the first segment node in the loop?
+    @rtype: boolean
+    """
+    assert loop_node.is_loop(), "Call to first_seg_match failed, node %s is not a loop" \
+        % (loop_node.id)
+    if len(loop_node) <= 0:  # Has no children
+        return False
+    first_child_node = loop_node.get_first_node()
+    assert first_child_node is not None, 'get_first_node failed from loop %s' % (loop_node.id)
+    if first_child_node.is_loop():
+        #If any loop node matches
+        for child_node in loop_node.childIterator():
+            if child_node.is_loop() and _is_loop_match(child_node, is_match, guards):
+                return True
+    elif first_child_node.is_segment() and is_match(first_child_node):
+        return True
+    elif loop_node.usage == 'R':
+        guards.append((first_child_node, loop_node))
+    return False
+
+
+def _goto_seg_match(loop_node, is_match):
+    """
+    A child loop has matched the segment.  Find that segment node.
+
+    @param loop_node: The starting loop node.
+    @type loop_node: L{node<map_if.loop_if>}
+    @return: The kind of result, the matching segment node, a list of the
+        push loop nodes and the loop whose first segment matched
+    @rtype: (int, L{node<map_if.segment_if>}, [L{node<map_if.loop_if>}],
+        L{node<map_if.loop_if>})
+    """
+    assert loop_node.is_loop(), "_goto_seg_match failed, node %s is not a loop" \
+        % (loop_node.id)
+    first_child_node = loop_node.get_first_seg()
+    if first_child_node is not None and is_match(first_child_node):
+        return (FOUND_LOOP, first_child_node, [loop_node], loop_node)
+    else:
+        for child in loop_node.childIterator():
+            if child.is_loop():
+                (kind, node1, push1, match_loop) = _goto_seg_match(child, is_match)
+                if node1:
+                    push_node_list = [loop_node]
+                    push_node_list.extend(push1)
+                    return (kind, node1, push_node_list, match_loop)
+    return (FOUND_NONE, None, [], None)
+
+
+def get_machine(node):
+    """
+    @param node: A node of a map
+    @return: The compiled transitions of the map of the node
+    @rtype: L{WalkMachine}
+    """
+    root = node if node.is_map_root() else node.root
+    if root.walk_machine is None:
+        root.walk_machine = WalkMachine()
+    return root.walk_machine
+
+
+class WalkMachine(object):
+    """
+    The search results of a map, compiled as transitions between nodes
+
+    A state is a node a walk starts from.  Its transitions are keyed by
+    segment id, and by the value of the qualifier element if the segment
+    nodes of that id the search reaches are told apart by one.  The
+    transitions of a state and segment id are compiled on first use.  A
+    transition is kept only if the search tests segment nodes of the id,
+    so the states are bounded by the map.
+
+    There is no transition if the segment is not found, or if the segment
+    nodes reached have different qualifier elements.  The results of the
+    searches for those segments are memoized, keyed by the starting node,
+    segment id and the values at the qualifier positions of the segment
+    nodes tested.  The memo holds at most max_memo results, the least
+    recently used are dropped.  The qualifier positions are kept only for
+    the segment ids of nodes tested, with the codes of those nodes.
+    """
+    def __init__(self, max_memo=MEMO_SIZE):
+        """
+        @param max_memo: Maximum number of memoized search results
+        @type max_memo: int
+        """
+        # {start node_id: {seg_id: (ele_idx, subele_idx, {value: plan}, plan)}}
+        self.states = {}
+        # {(start node_id, seg_id, qualifier values): plan}, least recently used first
+        self.memo = collections.OrderedDict()
+        # {(start node_id, seg_id): {(ele_idx, subele_idx): codes}} of the nodes tested
+        self.memo_quals = {}
+        self.max_memo = max_memo
+        self.compiled_hits = 0
+        self.memo_hits = 0
+        self.misses = 0
+
+    def get_plan(self, node, seg_data):
+        """
+        @param node: Starting node
+        @type node: L{node<map_if.x12_node>}
+        @param seg_data: Segment object
+        @type seg_data: L{segment<segment.Segment>}
+        @return: The search result, see L{search}, or None if there is no
+            transition
+        """
+        seg_id = seg_data.get_seg_id()
+        try:
+            trans = self.states[node.node_id][seg_id]
+        except KeyError:
+            trans = compile_transition(node, seg_id)
+            if trans is None:
+                return None
+            self.states.setdefault(node.node_id, {})[seg_id] = trans
+        return self._apply(trans, seg_data)
+
+    @staticmethod
+    def _apply(trans, seg_data):
+        (ele_idx, subele_idx, plans, default) = trans
+        if plans is None:
+            return default
+        return plans.get(seg_data.get_value_by_idx(ele_idx, subele_idx), default)
+
+    def find(self, node, seg_data):
+        """
+        Get the compiled transition or the memoized search result, else
+        search the map
+
+        @param node: Starting node
+        @type node: L{node<map_if.x12_node>}
+        @param seg_data: Segment object
+        @type seg_data: L{segment<segment.Segment>}
+        @return: The search result, see L{search}
+        """
+        seg_id = seg_data.get_seg_id()
+        state = self.states.get(node.node_id, {})
+        if seg_id in state:
+            plan = self._apply(state[seg_id], seg_data)
+            if plan is not None:
+                self.compiled_hits += 1
+                return plan
+        quals = self.memo_quals.get((node.node_id, seg_id), {})
+        key = self._memo_key(node, seg_data, quals)
+        try:
+            plan = self.memo.pop(key)
+            self.memo[key] = plan
+            self.memo_hits += 1
+            return plan
+        except KeyError:
+            pass
+        if seg_id not in state:
+            plan = self.get_plan(node, seg_data)
+            if plan is not None:
+                self.compiled_hits += 1
+                return plan
+        self.misses += 1
+
+        def is_match(seg_node):
+            if seg_node.id != seg_id:
+                return False
+            for (ele_idx, subele_idx, codes) in seg_node.get_match_qualifiers():
+                quals.setdefault((ele_idx, subele_idx), set()).update(codes)
+            return seg_node.is_match(seg_data)
+        plan = search(node, is_match)
+        if quals:
+            self.memo_quals[(node.node_id, seg_id)] = quals
+        self.memo[self._memo_key(node, seg_data, quals)] = plan
+        if len(self.memo) > self.max_memo:
+            self.memo.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def _memo_key(node, seg_data, quals):
+        """
+        A value outside the codes of a position matches no node tested, so
+        those values share a key
+        """
+        values = []
+        for (position, codes) in sorted(quals.items()):
+            value = seg_data.get_value_by_idx(position[0], position[1])
+            values.append(value if value in codes else None)
+        return (node.node_id, seg_data.get_seg_id(), tuple(values))
+
+    def get_stats(self):
+        """
+        @return: Counts of walks by compiled transition, by memoized search
+            result and by search, the number of memoized results, and the
+            hit rate of the transitions and memo
+        @rtype: dict
+        """
+        total = self.compiled_hits + self.memo_hits + self.misses
+        return {
+            'compiled_hits': self.compiled_hits,
+            'memo_hits': self.memo_hits,
+            'misses': self.misses,
+            'memo_size': len(self.memo),
+            'hit_rate': float(total - self.misses) / total if total else 0.0,
+        }
+
+
+class _Probe(object):
+    """
+    Match segment nodes as a segment of one id with one qualifier value
+    would, and record the qualifier codes of the nodes tested
+    """
+    def __init__(self, seg_id):
+        self.seg_id = seg_id
+        self.value = None
+        # Qualifier (ele_idx, subele_idx), and is more than one used
+        self.position = None
+        self.mixed = False
+        # {node_id: valid codes} of the segment nodes tested
+        self.codes = {}
+        self.tested = False
+
+    def is_match(self, seg_node):
+        if seg_node.id != self.seg_id:
+            return False
+        self.tested = True
+        quals = seg_node.get_match_qualifiers()
+        if len(quals) == 0:
+            return True
+        (ele_idx, subele_idx, codes) = quals[0]
+        if len(quals) > 1 or self.position not in (None, (ele_idx, subele_idx)):
+            self.mixed = True
+        self.position = (ele_idx, subele_idx)
+        self.codes[seg_node.node_id] = codes
+        return self.value in codes
+
+
+def compile_transition(node, seg_id):
+    """
+    Compile the transition of a starting node for a segment id
+
+    The map is searched once for each group of qualifier values matching
+    the same segment nodes, and once for the other values.  Groups are
+    formed again until the searches test no new segment nodes.
+
+    @param node: Starting node
+    @type node: L{node<map_if.x12_node>}
+    @param seg_id: Segment ID
+    @type seg_id: string
+    @return: (ele_idx, subele_idx, {qualifier value: search result} or
+        None, search result of other values).  If there is no transition,
+        (None, None, None, None), or None if no segment node of the id is
+        tested.
+    """
+    probe = _Probe(seg_id)
+    tested_ct = -1
+    while tested_ct != len(probe.codes):
+        tested_ct = len(probe.codes)
+        probe.value = None
+        default = search(node, probe.is_match)
+        node_ids = {}
+        for (node_id, codes) in probe.codes.items():
+            for value in codes:
+                node_ids.setdefault(value, []).append(node_id)
+        groups = {}
+        for (value, ids) in node_ids.items():
+            groups.setdefault(frozenset(ids), []).append(value)
+        plans = {}
+        for values in groups.values():
+            probe.value = values[0]
+            plan = search(node, probe.is_match)
+            if plan[0] in (NOT_FOUND, FOUND_NONE):
+                plan = None
+            for value in values:
+                plans[value] = plan
+        if probe.mixed:
+            return (None, None, None, None)
+    if not probe.tested:
+        return None
+    if default[0] in (NOT_FOUND, FOUND_NONE):
+        default = None
+    if probe.position is None:
+        return (None, None, None, default)
+    return (probe.position[0], probe.position[1], plans, default)
+
+
 class walk_tree(object):
     """
     Walks a map_if tree.  Tracks loop/segment counting, missing loop/segment.
     """
-    def __init__(self, initialCounts={}):
+    def __init__(self, initialCounts={}, compiled=True):
+        """
+        @param compiled: Use the compiled transitions and memoized searches
+            of the maps.  If False, every segment is found by searching the
+            map.
+        @type compiled: boolean
+        """
         # Store errors until we know we have an error
+        # [(segment node, loop node or None, seg_count, cur_line, ls_id)]
         self.mandatory_segs_missing = []
         self.counter = NodeCounter(initialCounts)
+        self.compiled = compiled
 
     def walk(self, node, seg_data, errh, seg_count, cur_line, ls_id):
         """
@@ -124,68 +489,36 @@ class walk_tree(object):
 
         @todo: check single segment loop repeat
         """
-        pop_node_list = []
-        push_node_list = []
-        orig_node = node
-        #logger.info('%s seg_count=%i / cur_line=%i' % (node.id, seg_count, cur_line))
-        self.mandatory_segs_missing = []
-        node_pos = node.pos  # Get original position ordinal of starting node
-        if not (node.is_loop() or node.is_map_root()):
-            node = pop_to_parent_loop(node)  # Get enclosing loop
-            #node_list.append(node)
-        while True:
-            # Iterate through nodes with position >= current position
-            for ord1 in [a for a in sorted(node.pos_map) if a >= node_pos]:
-                for child in node.pos_map[ord1]:
-                    if child.is_segment():
-                        #logger.debug('id=%s cur_count=%i max_repeat=%i' % (child.id, child.cur_count, child.get_max_repeat()))
-                        if child.is_match(seg_data):
-                            # Is the matched segment the beginning of a loop?
-                            if node.is_loop() \
-                                    and self._is_loop_match(node, seg_data, errh, seg_count, cur_line, ls_id):
-                                (
-                                    node1, push_node_list) = self._goto_seg_match(node, seg_data,
-                                                                                  errh, seg_count, cur_line, ls_id)
-                                if orig_node.is_loop() or orig_node.is_map_root():
-                                    orig_loop = orig_node
-                                else:
-                                    orig_loop = pop_to_parent_loop(orig_node)  # Get enclosing loop
-                                if node == orig_loop:
-                                    pop_node_list = [node]
-                                    push_node_list = [node]
-                                return (node1, pop_node_list, push_node_list)  # segment node
-                            child.incr_cur_count()
-                            self.counter.increment(child.x12path)
-                            #assert child.get_cur_count()==self.counter.get_count(child.x12path), 'Child counts not equal'
-                            self._check_seg_usage(child, seg_data, seg_count, cur_line, ls_id, errh)
-                            # Remove any previously missing errors for this segment
-                            self.mandatory_segs_missing = [x for x in self.mandatory_segs_missing if x[0] != child]
-                            self._flush_mandatory_segs(errh, child.pos)
-                            return (child, pop_node_list, push_node_list)  # segment node
-                        elif child.usage == 'R' and child.get_cur_count() < 1:
-                            fake_seg = pyx12.segment.Segment('%s' % (child.id),
-                                                             '~', '*', ':')
-                            err_str = 'Mandatory segment "%s" (%s) missing' % (child.name, child.id)
-                            self.mandatory_segs_missing.append((child, fake_seg, '3', err_str, seg_count, cur_line, ls_id))
-                        #else:
-                            #logger.debug('Segment %s is not a match for (%s*%s)' % \
-                            #   (child.id, seg_data.get_seg_id(), seg_data[0].get_value()))
-                    elif child.is_loop():
-                        if self._is_loop_match(child, seg_data, errh, seg_count, cur_line, ls_id):
-                            (node_seg, push_node_list) = self._goto_seg_match(child, seg_data, errh, seg_count, cur_line, ls_id)
-                            return (node_seg, pop_node_list, push_node_list)  # segment node
-            # End for ord1 in pos_keys
-            if node.is_map_root():  # If at root and we haven't found the segment yet.
-                walk_tree._seg_not_found_error(orig_node, seg_data,
-                                               errh, seg_count, cur_line, ls_id)
-                return (None, [], [])
-            node_pos = node.pos  # Get position ordinal of current node in tree
-            pop_node_list.append(node)
-            node = pop_to_parent_loop(node)  # Get enclosing parent loop
-
-        walk_tree._seg_not_found_error(
-            orig_node, seg_data, errh, seg_count, cur_line, ls_id)
-        return (None, [], [])
+        del self.mandatory_segs_missing[:]
+        if self.compiled:
+            plan = get_machine(node).find(node, seg_data)
+        else:
+            plan = search(node, lambda seg_node: seg_node.is_match(seg_data))
+        (kind, seg_node, pop_node_list, push_node_list, loop_node, guards) = plan
+        for (guard_seg, guard_loop) in guards:
+            if (guard_seg if guard_loop is None else guard_loop).get_cur_count() < 1:
+                self.mandatory_segs_missing.append((guard_seg, guard_loop, seg_count, cur_line, ls_id))
+        if kind == FOUND_SEGMENT:
+            seg_node.incr_cur_count()
+            self.counter.increment(seg_node)
+            #assert seg_node.get_cur_count()==self.counter.get_count(seg_node), 'Child counts not equal'
+            self._check_seg_usage(seg_node, seg_data, seg_count, cur_line, ls_id, errh)
+            if self.mandatory_segs_missing:
+                # Remove any previously missing errors for this segment
+                self.mandatory_segs_missing = [x for x in self.mandatory_segs_missing if x[0] != seg_node]
+                self._flush_mandatory_segs(errh, seg_node.pos)
+        elif kind == FOUND_LOOP:
+            self._check_loop_usage(loop_node, seg_data,
+                                   seg_count, cur_line, ls_id, errh)
+            seg_node.incr_cur_count()
+            self.counter.increment(seg_node)
+            #assert seg_node.get_cur_count()==self.counter.get_count(seg_node), 'first_child_node counts not equal'
+            self._flush_mandatory_segs(errh)
+        elif kind == NOT_FOUND:
+            walk_tree._seg_not_found_error(node, seg_data,
+                                           errh, seg_count, cur_line, ls_id)
+            return (None, [], [])
+        return (seg_node, list(pop_node_list), list(push_node_list))
 
     def setCountState(self, initialCounts={}):
         self.counter = NodeCounter(initialCounts)
@@ -214,7 +547,7 @@ class walk_tree(object):
             err_str = "Segment %s found but marked as not used" % (seg_node.id)
             errh.seg_error('2', err_str, None)
         elif seg_node.usage == 'R' or seg_node.usage == 'S':
-            #assert seg_node.get_cur_count()==self.counter.get_count(seg_node.x12path), 'seg_node counts not equal'
+            #assert seg_node.get_cur_count()==self.counter.get_count(seg_node), 'seg_node counts not equal'
             if seg_node.get_cur_count() > seg_node.get_max_repeat():  # handle seg repeat count
                 err_str = "Segment %s exceeded max count.  Found %i, should have %i" \
                     % (seg_data.get_seg_id(), seg_node.get_cur_count(), seg_node.get_max_repeat())
@@ -247,101 +580,27 @@ class walk_tree(object):
         """
         Handle error reporting for any outstanding missing mandatory segments
 
+        The segment and message of an error are only created here, when it
+        is reported.
+
         @param errh: Error handler
         @type errh: L{error_handler.err_handler}
         """
-        for (seg_node, seg_data, err_cde, err_str, seg_count, cur_line, ls_id) in self.mandatory_segs_missing:
+        if not self.mandatory_segs_missing:
+            return
+        for (seg_node, loop_node, seg_count, cur_line, ls_id) in self.mandatory_segs_missing:
             # Create errors if not also at current position
             if seg_node.pos != cur_pos:
+                seg_data = pyx12.segment.Segment(seg_node.id, '~', '*', ':')
+                if loop_node is None:
+                    err_str = 'Mandatory segment "%s" (%s) missing' % (seg_node.name, seg_node.id)
+                else:
+                    err_str = 'Mandatory loop "%s" (%s) missing' % \
+                        (loop_node.name, loop_node.id)
                 errh.add_seg(seg_node, seg_data, seg_count, cur_line, ls_id)
-                errh.seg_error(err_cde, err_str, None)
+                errh.seg_error('3', err_str, None)
         self.mandatory_segs_missing = [x for x in self.mandatory_segs_missing if x[0].pos == cur_pos]
 
-    def _is_loop_match(self, loop_node, seg_data, errh, seg_count, cur_line, ls_id):
-        """
-        Try to match the current loop to the segment
-        Handle loop and segment counting.
-        Check for used/missing
-
-        @param loop_node: Loop Node
-        @type loop_node: L{node<map_if.loop_if>}
-        @param seg_data: Segment object
-        @type seg_data: L{segment<segment.Segment>}
-        @param errh: Error handler
-        @type errh: L{error_handler.err_handler}
-
-        @return: Does the segment match the first segment node in the loop?
-        @rtype: boolean
-        """
-        assert loop_node.is_loop(), "Call to first_seg_match failed, node %s is not a loop. seg %s" \
-            % (loop_node.id, seg_data.get_seg_id())
-        #assert loop_node.get_cur_count()==self.counter.get_count(loop_node.x12path), \
-        #    'loop_node counts not equal: %s=%i / %s=%i' % (loop_node.get_path(), loop_node.get_cur_count(),
-        #            loop_node.x12path.format(), self.counter.get_count(loop_node.x12path) )
-        if len(loop_node) <= 0:  # Has no children
-            return False
-        first_child_node = loop_node.get_first_node()
-        assert first_child_node is not None, 'get_first_node failed from loop %s' % (loop_node.id)
-        if first_child_node.is_loop():
-            #If any loop node matches
-            for child_node in loop_node.childIterator():
-                if child_node.is_loop() and self._is_loop_match(child_node,
-                                                                seg_data, errh, seg_count, cur_line, ls_id):
-                    return True
-        elif is_first_seg_match2(first_child_node, seg_data):
-            return True
-        elif loop_node.usage == 'R' and loop_node.get_cur_count() < 1:
-            fake_seg = pyx12.segment.Segment('%s' %
-                                             (first_child_node.id), '~', '*', ':')
-            err_str = 'Mandatory loop "%s" (%s) missing' % \
-                (loop_node.name, loop_node.id)
-            self.mandatory_segs_missing.append((first_child_node, fake_seg,
-                                                '3', err_str, seg_count, cur_line, ls_id))
-        return False
-
-    def _goto_seg_match(self, loop_node, seg_data, errh, seg_count, cur_line, ls_id):
-        """
-        A child loop has matched the segment.  Return that segment node.
-        Handle loop counting and requirement errors.
-
-        @param loop_node: The starting loop node.
-        @type loop_node: L{node<map_if.loop_if>}
-        @param seg_data: Segment object
-        @type seg_data: L{segment<segment.Segment>}
-        @param errh: Error handler
-        @type errh: L{error_handler.err_handler}
-        @param seg_count: Current segment count for ST loop
-        @type seg_count: int
-        @param cur_line: File line counter
-        @type cur_line: int
-        @type ls_id: string
-
-        @return: The matching segment node and a list of the push loop nodes
-        @rtype: (L{node<map_if.segment_if>}, [L{node<map_if.loop_if>}])
-        """
-        assert loop_node.is_loop(), "_goto_seg_match failed, node %s is not a loop. seg %s" \
-            % (loop_node.id, seg_data.get_seg_id())
-        first_child_node = loop_node.get_first_seg()
-        if first_child_node is not None and is_first_seg_match2(first_child_node, seg_data):
-            self._check_loop_usage(loop_node, seg_data,
-                                   seg_count, cur_line, ls_id, errh)
-            first_child_node.incr_cur_count()
-            self.counter.increment(first_child_node.x12path)
-            #assert first_child_node.get_cur_count()==self.counter.get_count(first_child_node.x12path), 'first_child_node counts not equal'
-            self._flush_mandatory_segs(errh)
-            return (first_child_node, [loop_node])
-        else:
-            for child in loop_node.childIterator():
-                if child.is_loop():
-                    (
-                        node1, push1) = self._goto_seg_match(child, seg_data, errh,
-                                                             seg_count, cur_line, ls_id)
-                    if node1:
-                        push_node_list = [loop_node]
-                        push_node_list.extend(push1)
-                        return (node1, push_node_list)
-        return (None, [])
-
     def _check_loop_usage(self, loop_node, seg_data, seg_count, cur_line, ls_id, errh):
         """
         Check loop usage requirement and count
@@ -369,12 +628,12 @@ class walk_tree(object):
             errh.seg_error('2', err_str, None)
         elif loop_node.usage in ('R', 'S'):
             loop_node.reset_child_count()
-            self.counter.reset_to_node(loop_node.x12path)
+            self.counter.reset_to_node(loop_node)
             loop_node.incr_cur_count()
-            self.counter.increment(loop_node.x12path)
-            #assert loop_node.get_cur_count()==self.counter.get_count(loop_node.x12path), \
+            self.counter.increment(loop_node)
+            #assert loop_node.get_cur_count()==self.counter.get_count(loop_node), \
             #    'loop_node counts not equal: %s=%i / %s=%i' % (loop_node.get_path(), loop_node.get_cur_count(),
-            #            loop_node.x12path.format(), self.counter.get_count(loop_node.x12path) )
+            #            loop_node.x12path.format(), self.counter.get_count(loop_node) )
             #logger.debug('incr loop_node %s %i' % (loop_node.id, loop_node.cur_count))
             #logger.debug('incr first_child_node %s %i' % (first_child_node.id, first_child_node.cur_count))
             if loop_node.get_cur_count() > loop_node.get_max_repeat():
@@ -13,52 +13,81 @@
 """
 Loop and segment counter
 """
-#import collections
-import pyx12.path
 
 
 class NodeCounter(object):
     """
     X12 Loop and Segment Node Counter
+
+    Counts are kept in a list per map, indexed by the node_id of the map
+    nodes.  Node ids are only unique within a map, so the control map and
+    the transaction map have separate lists.  The nodes of a loop have
+    consecutive ids, so the counts of the child nodes of a loop are reset
+    as one range.
     """
     def __init__(self, initialCounts={}):
-        self._dict = {}
-# copy constructor
+        """
+        @param initialCounts: Starting counts
+        @type initialCounts: {L{node<map_if.x12_node>}: count}
+        """
+        # {id(map root): (map root, [count by node_id])}
+        self._maps = {}
         for k, v in initialCounts.items():
-            if isinstance(k, pyx12.path.X12Path):
-                self._dict[k] = v
-            else:
-                self._dict[pyx12.path.X12Path(k)] = v
-# deque, Counter, OrderedDict
-        #self.nodes = OrderedDict()
+            self.setCount(k, v)
 
-    def reset_to_node(self, xpath):
+    def reset_to_node(self, node):
         """
         Pop to node, deleting all child counts
+        @param node: Loop node
+        @type node: L{node<map_if.loop_if>}
         """
-        if xpath in self._dict:
-            del self._dict[xpath]
+        counts = self._get_counts(node)
+        for i in xrange(node.node_id + 1, min(node.node_id + node.node_count, len(counts))):
+            counts[i] = 0
 
-    def increment(self, xpath):
+    def increment(self, node):
         """
-        Increment path count
+        Increment node count
+        @type node: L{node<map_if.x12_node>}
         """
-        if xpath in self._dict:
-            self._dict[xpath] += 1
-        else:
-            self._dict[xpath] = 1
+        counts = self._get_counts(node)
+        try:
+            counts[node.node_id] += 1
+        except IndexError:
+            self.setCount(node, 1)
 
-    def setCount(self, xpath, ct):
+    def setCount(self, node, ct):
         """
-        Set path count
+        Set node count
+        @type node: L{node<map_if.x12_node>}
+        @type ct: int
         """
-        self._dict[xpath] = ct
+        counts = self._get_counts(node)
+        if node.node_id >= len(counts):
+            counts.extend([0] * (node.node_id + 1 - len(counts)))
+        counts[node.node_id] = ct
 
-    def get_count(self, xpath):
+    def get_count(self, node):
         """
-        Get path count
+        Get node count
+        @type node: L{node<map_if.x12_node>}
+        @rtype: int
         """
-        if xpath not in self._dict:
+        counts = self._get_counts(node)
+        if node.node_id >= len(counts):
             return 0
-            #raise Exception, 'Unknown xpath in counter: %s' % (xpath)
-        return self._dict[xpath]
+        return counts[node.node_id]
+
+    def _get_counts(self, node):
+        """
+        @return: The counts of the map of the node
+        @rtype: list[int]
+        """
+        root = node if node.is_map_root() else node.root
+        try:
+            return self._maps[id(root)][1]
+        except KeyError:
+            counts = []
+            # The map is kept so its id is not reused
+            self._maps[id(root)] = (root, counts)
+            return counts
@@ -0,0 +1,40 @@
+######################################################################
+# Copyright (c) Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Location of the package map directory
+
+The map files are found relative to this module, which avoids the import
+cost of pkg_resources.  The package is not zip safe.
+"""
+
+import os.path
+
+MAP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'map')
+
+
+def get_map_filename(name):
+    """
+    @param name: Filename in the map directory - codes.xml
+    @type name: string
+    @return: Absolute filename
+    @rtype: string
+    """
+    return os.path.join(MAP_DIR, name)
+
+
+def open_map_file(name):
+    """
+    @param name: Filename in the map directory - codes.xml
+    @type name: string
+    @return: Binary file object
+    @raise IOError: If the file does not exist
+    """
+    return open(get_map_filename(name), 'rb')
@@ -1,61 +1,75 @@
 #!/usr/bin/env python
+
+"""
+Summarize the ISA, GS and ST envelopes of X12 data files
+"""
+
 import sys
 import os
 import os.path
+import json
 
 libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 if os.path.isdir(libpath):
     sys.path.insert(0, libpath)
 
-import pyx12.x12file
-import pyx12.error_handler
-import sys
+import pyx12
+import pyx12.x12scan
+
+__version__ = pyx12.__version__
+
+
+def write_summary(fd_out, summary):
+    """
+    Write a text summary of one file
+    """
+    fd_out.write('Source filename: %s\n' % (summary['filename']))
+    if 'error' in summary:
+        fd_out.write('  Error: %s\n' % (summary['error']))
+        return
+    for isa in summary['interchanges']:
+        fd_out.write('  ISA Sender: "%s"\t' % (isa['sender']))
+        fd_out.write('ISA Receiver: "%s"\t' % (isa['receiver']))
+        if isa['usage'] == 'P':
+            fd_out.write(' PRODUCTION\t')
+        else:
+            fd_out.write(' TEST\t')
+        fd_out.write('\n')
+        for gs in isa['groups']:
+            fd_out.write('  GS Sender: "%s"\t' % (gs['sender']))
+            fd_out.write('GS Receiver: "%s"\t' % (gs['receiver']))
+            fd_out.write('GS Type: "%s"\t' % (gs['version']))
+            fd_out.write('\n')
+            for st in gs['transactions']:
+                fd_out.write('  ST ID: "%s"\t' % (st['control_number']))
+                fd_out.write('  ST Type: "%s"\t' % (st['type']))
+                fd_out.write('\n')
 
 
 def main():
-    for src_file in sys.argv[1:]:
-        try:
-            sys.stdout.write('Source filename: %s\n' % (src_file))
-            src = pyx12.x12file.X12Reader(src_file)
-            state = ''
-            for c in src:
-                if c.get_seg_id() == 'ISA':
-                    sys.stdout.write('  ISA Sender: "%s"\t' %
-                                     (c.get_value('ISA06')))
-                    sys.stdout.write('ISA Receiver: "%s"\t' %
-                                     (c.get_value('ISA08')))
-                    if src.isa_usage == 'P':
-                        sys.stdout.write(' PRODUCTION\t')
-                    else:
-                        sys.stdout.write(' TEST\t')
-                    state = ''
-                    sys.stdout.write('\n')
-                elif c.get_seg_id() == 'GS':
-                    sys.stdout.write('  GS Sender: "%s"\t' %
-                                     (c.get_value('GS02')))
-                    sys.stdout.write('GS Receiver: "%s"\t' %
-                                     (c.get_value('GS03')))
-                    sys.stdout.write('GS Type: "%s"\t' % (c.get_value('GS08')))
-                    state = ''
-                    sys.stdout.write('\n')
-                elif c.get_seg_id() == 'ST':
-                    sys.stdout.write('  ST ID: "%s"\t' % (c.get_value('ST02')))
-                    sys.stdout.write('  ST Type: "%s"\t' %
-                                     (c.get_value('ST01')))
-                    state = ''
-                    sys.stdout.write('\n')
-                else:
-                    state = ''
-        except Exception:
-            sys.stderr.write('File %s failed.' % (src_file))
-            raise
-
-        #self.gs_count = 0
-        #self.st_count = 0
-        #self.hl_count = 0
-        #self.seg_count = 0
-        #self.cur_line = 0
-        #self.buffer = None
+    """Script main program."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Summarize X12 envelopes')
+    parser.add_argument('--json', action='store_true',
+                        help='Write one JSON summary per line for each file, with ISA ids unpadded')
+    parser.add_argument('--jobs', '-j', action='store', type=int, default=1,
+                        help='Number of files to scan in parallel')
+    parser.add_argument('--version', action='version', version='{prog} {version}'.format(prog=parser.prog, version=__version__))
+    parser.add_argument('input_files', nargs='*')
+    args = parser.parse_args()
+
+    ok = True
+    for summary in pyx12.x12scan.scan_files(args.input_files, args.jobs):
+        if 'error' in summary:
+            sys.stderr.write('File %s failed: %s\n' % (summary['filename'], summary['error']))
+            ok = False
+        if args.json:
+            summary = pyx12.x12scan.strip_padding(summary)
+            sys.stdout.write(json.dumps(summary, separators=(',', ':')))
+            sys.stdout.write('\n')
+        else:
+            write_summary(sys.stdout, summary)
+    return ok
 
 
 if __name__ == '__main__':
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+######################################################################
+# Copyright Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Parse a ANSI X12N data file.
+Write one JSON object per line for each transaction set or selected loop.
+"""
+
+import os
+import os.path
+import sys
+import logging
+
+# Intrapackage imports
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if os.path.isdir(libpath):
+    sys.path.insert(0, libpath)
+import pyx12
+import pyx12.x12json
+import pyx12.params
+
+#Global Variables
+__author__ = pyx12.__author__
+__status__ = pyx12.__status__
+__version__ = pyx12.__version__
+__date__ = pyx12.__date__
+
+
+def main():
+    """Script main program."""
+    import argparse
+    parser = argparse.ArgumentParser(description='X12 to newline delimited JSON conversion')
+    parser.add_argument('--config-file', '-c', action='store',
+                        dest="configfile", default=None)
+    parser.add_argument('--log-file', '-l', action='store', dest="logfile", default=None)
+    parser.add_argument('--verbose', '-v', action='count')
+    parser.add_argument('--debug', '-d', action='store_true')
+    parser.add_argument('--quiet', '-q', action='store_true')
+    parser.add_argument('--outputfile', '-o', action='store', help="JSON target filename")
+    parser.add_argument('--loop', '-L', action='store', dest="loop_id", default='ST_LOOP',
+                        help='Write one object per instance of this loop, e.g. 2300')
+    parser.add_argument('--exclude-external-codes', '-x', action='append', dest="exclude_external",
+                        default=[], help='External Code Names to ignore')
+    parser.add_argument('--charset', '-s', choices=(
+        'b', 'e'), help='Specify X12 character set: b=basic, e=extended')
+    parser.add_argument('--version', action='version', version='{prog} {version}'.format(prog=parser.prog, version=__version__))
+    parser.add_argument('input_file')
+    args = parser.parse_args()
+
+    logger = logging.getLogger('pyx12')
+    formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+
+    stdout_hdlr = logging.StreamHandler()
+    stdout_hdlr.setFormatter(formatter)
+    logger.addHandler(stdout_hdlr)
+    logger.setLevel(logging.INFO)
+
+    param = pyx12.params.params(args.configfile)
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
+        param.set('debug', True)
+    if args.verbose > 0:
+        logger.setLevel(logging.DEBUG)
+    if args.quiet:
+        logger.setLevel(logging.ERROR)
+
+    param.set('exclude_external_codes', ','.join(args.exclude_external))
+
+    if args.logfile:
+        try:
+            hdlr = logging.FileHandler(args.logfile)
+            hdlr.setFormatter(formatter)
+            logger.addHandler(hdlr)
+        except IOError:
+            logger.exception('Could not open log file: %s' % (args.logfile))
+
+    if args.outputfile:
+        try:
+            fd_json = open(args.outputfile, 'w')
+        except:
+            logger.error('Could not open file %s' % (args.outputfile))
+            return False
+    else:
+        fd_json = sys.stdout
+    try:
+        ct = pyx12.x12json.x12json(param=param, src_file=args.input_file,
+            fd_out=fd_json, loop_id=args.loop_id)
+        logger.info('Wrote %i objects' % (ct))
+    except KeyboardInterrupt:
+        print("\n[interrupt]")
+    finally:
+        if fd_json is not sys.stdout:
+            fd_json.close()
+
+    return True
+
+if __name__ == '__main__':
+    sys.exit(not main())
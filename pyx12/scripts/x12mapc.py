@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+"""
+Compile the map, code and data element files into a bundle, so they are
+loaded without parsing XML.  By default the bundle is written to the map
+directory of the package.
+"""
+
+import sys
+import os.path
+import logging
+
+# Intrapackage imports
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+if os.path.isdir(libpath):
+    sys.path.insert(0, libpath)
+import pyx12
+import pyx12.map_bundle
+
+__author__ = pyx12.__author__
+__status__ = pyx12.__status__
+__version__ = pyx12.__version__
+__date__ = pyx12.__date__
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Compile the X12 maps')
+    parser.add_argument('--verbose', '-v', action='count')
+    parser.add_argument('--output', '-o', action='store', dest="outputfile", default=None, help="Bundle filename.  Defaults to the package map directory")
+    parser.add_argument('--version', action='version', version='{prog} {version}'.format(prog=parser.prog, version=__version__))
+    args = parser.parse_args()
+
+    logger = logging.getLogger()
+    formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    stdout_hdlr = logging.StreamHandler()
+    stdout_hdlr.setFormatter(formatter)
+    logger.addHandler(stdout_hdlr)
+    logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    try:
+        names = pyx12.map_bundle.compile_bundle(args.outputfile)
+    except (IOError, OSError) as e:
+        logger.error('Could not write the bundle: %s' % (e))
+        return False
+    for name in names:
+        logger.info('Compiled %s' % (name))
+    return True
+
+if __name__ == '__main__':
+    sys.exit(not main())
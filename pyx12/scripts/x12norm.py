@@ -8,8 +8,6 @@ If no ouput filename is given with -o,  write to stdout.
 
 import sys
 import os.path
-import codecs
-import tempfile
 import logging
 
 # Intrapackage imports
@@ -17,7 +15,7 @@ libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 if os.path.isdir(libpath):
     sys.path.insert(0, libpath)
 import pyx12
-import pyx12.x12file
+import pyx12.x12norm
 
 __author__ = pyx12.__author__
 __status__ = pyx12.__status__
@@ -34,6 +32,7 @@ def main():
     parser.add_argument('--eol', '-e', action='store_true', help="Add eol to each segment line")
     parser.add_argument('--inplace', '-i', action='store_true', help="Make changes to files in place")
     parser.add_argument('--fixcounting', '-f', action='store_true', help="Try to fix counting errors")
+    parser.add_argument('--jobs', '-j', action='store', type=int, default=1, help="Number of files to normalize in parallel, with --inplace")
     parser.add_argument('--output', '-o', action='store', dest="outputfile", default=None, help="Output filename.  Defaults to stdout")
     parser.add_argument('--version', action='version', version='{prog} {version}'.format(prog=parser.prog, version=__version__))
     parser.add_argument('input_files', nargs='*')
@@ -47,37 +46,30 @@ def main():
     logger.setLevel(logging.INFO)
 
     eol = '\n' if args.eol else ''
+    if args.outputfile and args.inplace:
+        parser.error('--output and --inplace can not be used together')
+    if args.jobs > 1 and not args.inplace:
+        parser.error('--jobs requires --inplace')
+    if args.outputfile and len(args.input_files) > 1:
+        parser.error('--output takes only one input file')
+    ok = True
+    if args.inplace:
+        for (file_in, err_str) in pyx12.x12norm.normalize_files(
+                args.input_files, eol, args.fixcounting, args.jobs):
+            if err_str is not None:
+                logger.error('Could not normalize "%s": %s' % (file_in, err_str))
+                ok = False
+        return ok
     for file_in in args.input_files:
         if not os.path.isfile(file_in):
             logger.error('Could not open file "%s"' % (file_in))
-
-        fd_out = tempfile.TemporaryFile()
-        src = pyx12.x12file.X12Reader(file_in)
-        for seg_data in src:
-            if args.fixcounting:
-                err_codes = [(x[1]) for x in src.pop_errors()]
-                if seg_data.get_seg_id() == 'IEA' and '021' in err_codes:
-                    seg_data.set('IEA01', '%i' % (src.gs_count))
-                elif seg_data.get_seg_id() == 'GE' and '5' in err_codes:
-                    seg_data.set('GE01', '%i' % (src.st_count))
-                elif seg_data.get_seg_id() == 'SE' and '4' in err_codes:
-                    seg_data.set('SE01', '%i' % (src.seg_count + 1))
-                elif seg_data.get_seg_id() == 'HL' and 'HL1' in err_codes:
-                    seg_data.set('HL01', '%i' % (src.hl_count))
-            fd_out.write(seg_data.format() + eol)
-        if eol == '':
-            fd_out.write('\n')
-
-        fd_out.seek(0)
+            ok = False
+            continue
         if args.outputfile:
-            fd_out = codecs.open(args.outputfile, mode='w', encoding='ascii')
+            pyx12.x12norm.normalize_file(file_in, args.outputfile, eol, args.fixcounting)
         else:
-            if args.inplace:
-                with codecs.open(file_in, mode='w', encoding='ascii') as fd_orig:
-                    fd_orig.write(fd_out.read())
-            else:
-                sys.stdout.write(fd_out.read())
-    return True
+            pyx12.x12norm.normalize(file_in, sys.stdout, eol, args.fixcounting)
+    return ok
 
 if __name__ == '__main__':
     sys.exit(not main())
@@ -22,14 +22,17 @@ import sys
 import logging
 import tempfile
 import codecs
+import time
 
 # Intrapackage imports
 libpath = abspath(join(dirname(__file__), '../..'))
 if isdir(libpath):
     sys.path.insert(0, libpath)
 import pyx12
+import pyx12.map_if
 import pyx12.x12n_document
 import pyx12.params
+import pyx12.stats
 
 __author__ = pyx12.__author__
 __status__ = pyx12.__status__
@@ -37,6 +40,101 @@ __version__ = pyx12.__version__
 __date__ = pyx12.__date__
 
 
+def get_target(src_filename, ext):
+    """
+    Name an output file next to the source file
+    @param ext: Output file extension - .997, .html
+    @type ext: string
+    @rtype: string
+    """
+    if os.path.splitext(src_filename)[1] == '.txt':
+        return os.path.splitext(src_filename)[0] + ext
+    return src_filename + ext
+
+
+def validate_file(param, src_filename, html=False, map_cache=None, stats=None):
+    """
+    Validate a file.  The 997/999 and HTML outputs are written next to the
+    source file.
+    @param param: pyx12.param instance
+    @param src_filename: Source filename
+    @type src_filename: string
+    @param html: Write an HTML error report
+    @type html: boolean
+    @param map_cache: Optional cache of {map_file: map}, kept between files
+    @type map_cache: dict
+    @param stats: Optional stage timings
+    @type stats: L{pyx12.stats.StageStats}
+    @return: (src_filename, is valid, seconds, stats)
+    @rtype: tuple(string, boolean, float, L{pyx12.stats.StageStats})
+    """
+    start = time.time()
+    fd_997 = tempfile.TemporaryFile()
+    fd_html = None
+    if html:
+        fd_html = open(get_target(src_filename, '.html'), 'w')
+    try:
+        ok = pyx12.x12n_document.x12n_document(
+            param=param, src_file=src_filename,
+            fd_997=fd_997, fd_html=fd_html, fd_xmldoc=None, map_cache=map_cache,
+            stats=stats)
+        if fd_997.tell() != 0:
+            fd_997.seek(0)
+            codecs.open(get_target(src_filename, '.997'), mode='w',
+                        encoding='ascii').write(fd_997.read())
+    finally:
+        fd_997.close()
+        if fd_html:
+            fd_html.close()
+    return (src_filename, ok, time.time() - start, stats)
+
+
+def write_summary(fd, results, wall_secs):
+    """
+    Write a table of the result and throughput of each file
+    @param results: [(src_filename, is valid, seconds, stats)]
+    @type results: list
+    @param wall_secs: Elapsed time of all files
+    @type wall_secs: float
+    """
+    name_len = max([len(x[0]) for x in results] + [4])
+    fd.write('%-*s  %-7s  %8s  %10s\n' % (name_len, 'File', 'Result', 'Seconds', 'KB/s'))
+    total_size = 0
+    for (src_filename, ok, secs, stats) in results:
+        size = os.path.getsize(src_filename)
+        total_size += size
+        fd.write('%-*s  %-7s  %8.2f  %10.1f\n' % (name_len, src_filename,
+                 'OK' if ok else 'Failure', secs, size / 1024.0 / max(secs, 0.001)))
+    fd.write('%-*s  %-7s  %8.2f  %10.1f\n' % (name_len, 'Total', '', wall_secs,
+             total_size / 1024.0 / max(wall_secs, 0.001)))
+
+
+_worker_param = None
+_worker_maps = None
+
+
+def _worker_init(param_dict):
+    """
+    Worker process initializer.  Loads the control maps.  Transaction maps
+    are kept for the life of the worker once loaded.
+    """
+    global _worker_param, _worker_maps
+    _worker_param = pyx12.params.ParamsBase()
+    _worker_param.params = param_dict
+    _worker_maps = {}
+    for map_file in ('x12.control.00401.xml', 'x12.control.00501.xml'):
+        pyx12.map_if.get_cached_map(map_file, _worker_param, _worker_maps)
+
+
+def _worker_validate(args):
+    """
+    Validate a file in a worker process
+    """
+    (src_filename, html, use_stats) = args
+    stats = pyx12.stats.StageStats() if use_stats else None
+    return validate_file(_worker_param, src_filename, html, _worker_maps, stats)
+
+
 def main():
     """
     Set up environment for processing
@@ -59,11 +157,17 @@ def main():
         'b', 'e'), help='Specify X12 character set: b=basic, e=extended')
     #parser.add_argument('--background', '-b', action='store_true')
     #parser.add_argument('--test', '-t', action='store_true')
+    parser.add_argument('--jobs', '-j', action='store', type=int, default=1,
+                        help='Number of files to validate in parallel')
+    parser.add_argument('--stats', action='store_true',
+                        help='Write the time spent in each processing stage')
     parser.add_argument('--profile', action='store_true',
-                        help='Profile the code with plop')
+                        help='Write cProfile data for each file to a .prof file')
     parser.add_argument('--version', action='version', version='{prog} {version}'.format(prog=parser.prog, version=__version__))
     parser.add_argument('input_files', nargs='*')
     args = parser.parse_args()
+    if args.profile and args.jobs > 1:
+        parser.error('--profile cannot be used with --jobs')
 
     logger = logging.getLogger('pyx12')
     formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
@@ -81,9 +185,6 @@ def main():
         logger.setLevel(logging.DEBUG)
     if args.quiet:
         logger.setLevel(logging.ERROR)
-    fd_997 = None
-    fd_html = None
-    flag_997 = True
     param.set('exclude_external_codes', ','.join(args.exclude_external))
     #if args.map_path:
     #    param.set('map_path', args.map_path)
@@ -96,75 +197,60 @@ def main():
         except IOError:
             logger.exception('Could not open log file: %s' % (args.logfile))
 
+    src_filenames = []
     for src_filename in args.input_files:
-        try:
-            if not os.path.isfile(src_filename):
-                logger.error('Could not open file "%s"' % (src_filename))
-                continue
-            #fd_src = open(src_filename, 'U')
-            if flag_997:
-                fd_997 = tempfile.TemporaryFile()
-            if args.html:
-                if os.path.splitext(src_filename)[1] == '.txt':
-                    target_html = os.path.splitext(src_filename)[0] + '.html'
-                else:
-                    target_html = src_filename + '.html'
-                fd_html = open(target_html, 'w')
-
-            if args.profile:
-                from plop.collector import Collector
-                p = Collector()
-                p.start()
-                if pyx12.x12n_document.x12n_document(
-                    param=param, src_file=src_filename,
-                        fd_997=fd_997, fd_html=fd_html, fd_xmldoc=None):
-                    sys.stderr.write('%s: OK\n' % (src_filename))
-                else:
-                    sys.stderr.write('%s: Failure\n' % (src_filename))
-                #import profile
-                #prof_str = 'pyx12.x12n_document.x12n_document(param, src_filename, ' \
-                #        + 'fd_997, fd_html, None, xslt_files)'
-                #print prof_str
-                #print param
-                #profile.run(prof_str, 'pyx12.prof')
-                p.stop()
-                try:
-                    pfile = os.path.splitext(os.path.basename(
-                        src_filename))[0] + '.plop.out'
-                    pfull = os.path.join(os.path.expanduser(
-                        '~/.plop.profiles'), pfile)
-                    print(pfull)
-                    with open(pfull, 'w') as fdp:
-                        fdp.write(repr(dict(p.stack_counts)))
-                except Exception:
-                    logger.exception('Failed to write profile data')
-                    sys.stderr.write('%s: bad profile save\n' % (src_filename))
-            else:
-                if pyx12.x12n_document.x12n_document(
-                    param=param, src_file=src_filename,
-                        fd_997=fd_997, fd_html=fd_html, fd_xmldoc=None):
-                    sys.stderr.write('%s: OK\n' % (src_filename))
-                else:
-                    sys.stderr.write('%s: Failure\n' % (src_filename))
-            if flag_997 and fd_997.tell() != 0:
-                fd_997.seek(0)
-                if os.path.splitext(src_filename)[1] == '.txt':
-                    target_997 = os.path.splitext(src_filename)[0] + '.997'
-                else:
-                    target_997 = src_filename + '.997'
-                codecs.open(target_997, mode='w',
-                            encoding='ascii').write(fd_997.read())
-
-            if fd_997:
-                fd_997.close()
-            if fd_html:
-                fd_html.close()
-        except IOError:
-            logger.exception('Could not open files')
-            return False
-        except KeyboardInterrupt:
-            print("\n[interrupt]")
+        if not os.path.isfile(src_filename):
+            logger.error('Could not open file "%s"' % (src_filename))
+            continue
+        src_filenames.append(src_filename)
+
+    results = []
+    start = time.time()
+    try:
+        if args.jobs > 1 and len(src_filenames) > 1:
+            import multiprocessing
+            pool = multiprocessing.Pool(min(args.jobs, len(src_filenames)),
+                                        _worker_init, (param.params,))
+            try:
+                for res in pool.imap(_worker_validate,
+                                     [(x, args.html, args.stats) for x in src_filenames]):
+                    sys.stderr.write('%s: %s\n' % (res[0], 'OK' if res[1] else 'Failure'))
+                    results.append(res)
+            except:
+                pool.terminate()
+                pool.join()
+                raise
+            pool.close()
+            pool.join()
+        else:
+            map_cache = {}
+            for src_filename in src_filenames:
+                stats = pyx12.stats.StageStats() if args.stats else None
+                if args.profile:
+                    import cProfile
+                    prof = cProfile.Profile()
+                    prof.enable()
+                res = validate_file(param, src_filename, args.html, map_cache, stats)
+                if args.profile:
+                    prof.disable()
+                    target_prof = get_target(src_filename, '.prof')
+                    prof.dump_stats(target_prof)
+                    sys.stderr.write('%s: profile written to %s\n' % (src_filename, target_prof))
+                sys.stderr.write('%s: %s\n' % (res[0], 'OK' if res[1] else 'Failure'))
+                results.append(res)
+    except IOError:
+        logger.exception('Could not open files')
+        return False
+    except KeyboardInterrupt:
+        print("\n[interrupt]")
 
+    if len(results) > 1:
+        write_summary(sys.stderr, results, time.time() - start)
+    if args.stats:
+        total_stats = pyx12.stats.StageStats()
+        for res in results:
+            total_stats.merge(res[3])
+        total_stats.write(sys.stderr)
     return True
 
 if __name__ == '__main__':
@@ -107,6 +107,12 @@ class Element(object):
         else:
             return True
 
+    def copy(self):
+        return self.__copy__()
+
+    def __copy__(self):
+        return Element(self.value)
+
 
 class Composite(object):
     """
@@ -234,6 +240,16 @@ class Composite(object):
                 return False
         return True
 
+    def copy(self):
+        return self.__copy__()
+
+    def __copy__(self):
+        ret = Composite.__new__(Composite)
+        ret.subele_term = self.subele_term
+        ret.subele_term_orig = self.subele_term_orig
+        ret.elements = [Element(x.value) for x in self.elements]
+        return ret
+
 
 class Segment(object):
     """
@@ -373,6 +389,27 @@ class Segment(object):
         else:
             return comp1.format()
 
+    def get_value_by_idx(self, ele_idx, comp_idx=None):
+        """
+        Get the value of an element or subelement by zero based indexes,
+        without parsing a Reference Designator
+
+        @param ele_idx: Zero based element index
+        @type ele_idx: int
+        @param comp_idx: Zero based sub-element index, or None for the element
+        @type comp_idx: int
+        @return: The value, or None if the segment is too short
+        @rtype: string
+        """
+        if ele_idx >= len(self.elements):
+            return None
+        if comp_idx is None:
+            return self.elements[ele_idx].format()
+        comp = self.elements[ele_idx]
+        if comp_idx >= len(comp):
+            return None
+        return comp[comp_idx].format()
+
     def get_value_by_ref_des(self, ref_des):
         """
         @param ref_des: X12 Reference Designator
@@ -392,6 +429,20 @@ class Segment(object):
         @type val: string
         """
         (ele_idx, comp_idx) = self._parse_refdes(ref_des)
+        self.set_by_idx(ele_idx, comp_idx, val)
+
+    def set_by_idx(self, ele_idx, comp_idx, val):
+        """
+        Set the value of an element or subelement by zero based indexes,
+        without parsing a Reference Designator
+
+        @param ele_idx: Zero based element index
+        @type ele_idx: int
+        @param comp_idx: Zero based sub-element index, or None for the element
+        @type comp_idx: int
+        @param val: New value
+        @type val: string
+        """
         while len(self.elements) <= ele_idx:
             # insert blank values before our value if needed
             self.elements.append(Composite('', self.subele_term))
@@ -522,4 +573,10 @@ class Segment(object):
         return self.__copy__()
 
     def __copy__(self):
-        return Segment(self.format(), self.seg_term, self.ele_term, self.subele_term)
+        """
+        Copy the composites directly, rather than formatting and re-parsing
+        """
+        ret = Segment.__new__(Segment)
+        ret.__dict__.update(self.__dict__)
+        ret.elements = [x.__copy__() for x in self.elements]
+        return ret
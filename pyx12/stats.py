@@ -0,0 +1,83 @@
+######################################################################
+# Copyright (c) Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Time spent in each stage of document processing
+
+Stages:
+    - tokenize: Splitting the input into segment strings (RawX12File)
+    - parse: Creating Segments and the X12Reader envelope checks
+    - walk: Finding the map node of each segment (walk_tree.walk)
+    - maps: Loading maps
+    - validate: Segment and element validation
+    - errors: The error handler
+    - output: HTML, XML and 997/999 writers
+"""
+
+STAGES = ('tokenize', 'parse', 'walk', 'maps', 'validate', 'errors', 'output')
+
+
+class StageStats(object):
+    """
+    Accumulated seconds per stage
+    """
+
+    def __init__(self):
+        self.seconds = dict([(stage, 0.0) for stage in STAGES])
+        self.seg_count = 0
+
+    #{ Public Methods
+    def add(self, stage, secs):
+        """
+        @param stage: Stage name
+        @type stage: string
+        @param secs: Seconds to add
+        @type secs: float
+        """
+        self.seconds[stage] += secs
+
+    def merge(self, other):
+        """
+        Add the times of another instance
+        @type other: L{StageStats}
+        """
+        for (stage, secs) in other.seconds.items():
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + secs
+        self.seg_count += other.seg_count
+
+    def get_total(self):
+        """
+        @return: Seconds in all stages
+        @rtype: float
+        """
+        return sum(self.seconds.values())
+
+    def write(self, fd):
+        """
+        Write a table of seconds and percent of total per stage
+        @param fd: Output file
+        @type fd: file descriptor
+        """
+        total = self.get_total()
+        fd.write('%-10s  %9s  %6s\n' % ('Stage', 'Seconds', '%'))
+        for stage in STAGES:
+            secs = self.seconds[stage]
+            fd.write('%-10s  %9.3f  %6.1f\n' % (stage, secs,
+                     100.0 * secs / total if total else 0.0))
+        fd.write('%-10s  %9.3f\n' % ('Total', total))
+        if total:
+            fd.write('%i segments, %.0f segments/s\n' % (self.seg_count,
+                     self.seg_count / total))
+
+    def __repr__(self):
+        """
+        @rtype: string
+        """
+        return ', '.join(['%s=%.3f' % (stage, self.seconds[stage]) for stage in STAGES])
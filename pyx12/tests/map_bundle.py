@@ -0,0 +1,111 @@
+import unittest
+import os
+import os.path
+import shutil
+import tempfile
+
+import pyx12.codes
+import pyx12.dataele
+import pyx12.map_bundle
+import pyx12.map_if
+import pyx12.map_index
+import pyx12.params
+import pyx12.resources
+
+
+class MapBundle(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.bundle_file = os.path.join(self.tmpdir, 'maps.bundle')
+        pyx12.map_bundle.use_bundle(self.bundle_file)
+        self.param = pyx12.params.params('pyx12.conf.xml')
+
+    def tearDown(self):
+        pyx12.map_bundle.use_bundle(None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_no_bundle(self):
+        self.assertEqual(pyx12.map_bundle.get_entry('codes.xml'), None)
+
+    def test_compile(self):
+        names = pyx12.map_bundle.compile_bundle(self.bundle_file)
+        self.assertTrue('codes.xml' in names)
+        self.assertTrue('837.4010.X098.A1.xml' in names)
+        self.assertTrue('x12.control.00501.xml' in names)
+        self.assertEqual(os.listdir(self.tmpdir), ['maps.bundle'])
+        self.assertNotEqual(pyx12.map_bundle.get_entry('dataele.xml'), None)
+        self.assertEqual(pyx12.map_bundle.get_entry('not_a_map.xml'), None)
+
+    def test_same_as_xml(self):
+        codes1 = pyx12.codes.ExternalCodes().codes
+        dataele1 = pyx12.dataele.DataElements().dataele
+        index1 = pyx12.map_index.map_index().maps
+        map1 = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', self.param)
+        pyx12.map_bundle.compile_bundle(self.bundle_file)
+        self.assertNotEqual(pyx12.map_bundle.get_entry('837.4010.X098.A1.xml'), None)
+        self.assertEqual(pyx12.codes.ExternalCodes().codes, codes1)
+        self.assertEqual(pyx12.dataele.DataElements().dataele, dataele1)
+        self.assertEqual(pyx12.map_index.map_index().maps, index1)
+        map2 = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', self.param)
+        nodes1 = list(map1.loop_segment_iterator())
+        nodes2 = list(map2.loop_segment_iterator())
+        self.assertEqual([n.get_path() for n in nodes1], [n.get_path() for n in nodes2])
+        path = '/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2300/CLM'
+        seg1 = map1.getnodebypath(path)
+        seg2 = map2.getnodebypath(path)
+        self.assertEqual(seg1.syntax, seg2.syntax)
+        for (ele1, ele2) in zip(seg1.children, seg2.children):
+            self.assertEqual((ele1.id, ele1.usage, ele1.seq, ele1.data_ele),
+                             (ele2.id, ele2.usage, ele2.seq, ele2.data_ele))
+
+    def test_other_version_ignored(self):
+        pyx12.map_bundle.compile_bundle(self.bundle_file)
+        with open(self.bundle_file, 'rb') as fd:
+            data = fd.read()
+        with open(self.bundle_file, 'wb') as fd:
+            fd.write(data.replace(pyx12.map_bundle.get_magic(), 'PYX12MAPC 1 0.0\n', 1))
+        pyx12.map_bundle.use_bundle(self.bundle_file)
+        self.assertEqual(pyx12.map_bundle.get_entry('codes.xml'), None)
+        self.assertNotEqual(pyx12.codes.ExternalCodes().codes, {})
+
+    def test_source_changed(self):
+        map_dir = pyx12.resources.MAP_DIR
+        src_dir = os.path.join(self.tmpdir, 'map')
+        os.mkdir(src_dir)
+        for name in ('maps.xml', 'codes.xml', 'dataele.xml'):
+            shutil.copy(os.path.join(map_dir, name), src_dir)
+        pyx12.resources.MAP_DIR = src_dir
+        try:
+            pyx12.map_bundle.compile_bundle(self.bundle_file)
+            self.assertNotEqual(pyx12.map_bundle.get_entry('codes.xml'), None)
+            codes_file = os.path.join(src_dir, 'codes.xml')
+            mtime = os.path.getmtime(codes_file)
+            with open(codes_file, 'rb') as fd:
+                data = fd.read()
+            with open(codes_file, 'wb') as fd:
+                # Change one code, keeping the size
+                fd.write(data.replace('<code>AA</code>', '<code>ZZ</code>', 1))
+            os.utime(codes_file, (mtime + 10, mtime + 10))
+            self.assertEqual(os.path.getsize(codes_file), len(data))
+            self.assertEqual(pyx12.map_bundle.get_entry('codes.xml'), None)
+            self.assertNotEqual(pyx12.map_bundle.get_entry('dataele.xml'), None)
+        finally:
+            pyx12.resources.MAP_DIR = map_dir
+
+    def test_source_touched(self):
+        map_dir = pyx12.resources.MAP_DIR
+        src_dir = os.path.join(self.tmpdir, 'map')
+        os.mkdir(src_dir)
+        for name in ('maps.xml', 'codes.xml', 'dataele.xml'):
+            shutil.copy(os.path.join(map_dir, name), src_dir)
+        pyx12.resources.MAP_DIR = src_dir
+        try:
+            pyx12.map_bundle.compile_bundle(self.bundle_file)
+            codes_file = os.path.join(src_dir, 'codes.xml')
+            mtime = os.path.getmtime(codes_file)
+            # Same contents, another modification time
+            os.utime(codes_file, (mtime + 10, mtime + 10))
+            self.assertNotEqual(pyx12.map_bundle.get_entry('codes.xml'), None)
+        finally:
+            pyx12.resources.MAP_DIR = map_dir
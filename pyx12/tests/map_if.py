@@ -1,4 +1,5 @@
 import unittest
+from StringIO import StringIO
 
 import pyx12.error_handler
 import pyx12.map_if
@@ -389,6 +390,8 @@ class GetNodeByPath(unittest.TestCase):
         self.assertEqual(node.id, '2300')
         self.assertEqual(node.get_path(), path)
         self.assertEqual(node.base_name, 'loop')
+        self.assertEqual(node.get_path_tuple(), ('ISA_LOOP', 'GS_LOOP', 'ST_LOOP',
+                                                 'DETAIL', '2000A', '2000B', '2300'))
 
     def test_get_2300_CLM(self):
         path = '/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2300/CLM'
@@ -405,6 +408,8 @@ class GetNodeByPath(unittest.TestCase):
         self.assertNotEqual(node, None)
         self.assertEqual(node.id, 'TST')
         self.assertEqual(node.get_path(), path)
+        self.assertEqual(node.get_path_tuple(), ('TST',))
+        self.assertEqual(map.get_path_tuple(), ())
 
     def tearDown(self):
         del self.map
@@ -688,6 +693,28 @@ class MatchSegmentQual(unittest.TestCase):
         seg_data = pyx12.segment.Segment('REF*EI*5555~', '~', '*', ':')
         self.assertTrue(node.is_match_qual(seg_data, 'REF', 'EI'))
 
+    def test_match_qual_fail(self):
+        node = self.node.getnodebypath('DTP[435]')
+        seg_data = pyx12.segment.Segment('DTP*434*D8*20090101~', '~', '*', ':')
+        self.assertFalse(node.is_match_qual(seg_data, 'DTP', '434'))
+        self.assertFalse(node.is_match_qual(seg_data, 'DTP', '435'))
+        self.assertFalse(node.is_match(seg_data))
+
+    def test_match_composite_qual(self):
+        node = self.node.getnodebypath('HI')
+        self.assertEqual(node._qual[:2], (0, 0))
+        seg_data = pyx12.segment.Segment('HI*BK:317~', '~', '*', ':')
+        self.assertTrue(node.is_match(seg_data))
+        self.assertTrue(node.is_match_qual(seg_data, 'HI', 'BK'))
+        seg_data = pyx12.segment.Segment('HI*XX:317~', '~', '*', ':')
+        self.assertFalse(node.is_match(seg_data))
+
+    def test_match_hl(self):
+        node = self.map.getnodebypath(
+            '/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/HL')
+        self.assertTrue(node.is_match(pyx12.segment.Segment('HL*2*1*22*0~', '~', '*', ':')))
+        self.assertFalse(node.is_match(pyx12.segment.Segment('HL*2*1*20*0~', '~', '*', ':')))
+
 
 class X12Path(unittest.TestCase):
     def setUp(self):
@@ -741,3 +768,106 @@ class SegmentChildrenOrdinal(unittest.TestCase):
         for c in self.node.children:
             self.assertEqual(i, c.seq)
             i += 1
+
+
+class CachedMap(unittest.TestCase):
+    def setUp(self):
+        self.param = pyx12.params.params('pyx12.conf.xml')
+
+    def test_no_cache(self):
+        map1 = pyx12.map_if.get_cached_map('x12.control.00401.xml', self.param)
+        map2 = pyx12.map_if.get_cached_map('x12.control.00401.xml', self.param)
+        self.assertFalse(map1 is map2)
+
+    def test_reuse_resets_counts(self):
+        map_cache = {}
+        map1 = pyx12.map_if.get_cached_map('x12.control.00401.xml', self.param, map_cache)
+        node = map1.getnodebypath('/ISA_LOOP/GS_LOOP')
+        node.incr_cur_count()
+        map2 = pyx12.map_if.get_cached_map('x12.control.00401.xml', self.param, map_cache)
+        self.assertTrue(map1 is map2)
+        self.assertEqual(node.get_cur_count(), 0)
+        self.assertEqual(list(map_cache.keys()), ['x12.control.00401.xml'])
+
+
+class ReadMapDef(unittest.TestCase):
+    def test_element_fields(self):
+        fd = StringIO('<transaction xid="T"><name>Test</name>'
+                      '<loop xid="L1" pos="0100" usage="R"><name>Loop</name>'
+                      '<repeat>1</repeat><segment xid="AA">'
+                      '<name>Seg</name><usage>R</usage><pos>010</pos>'
+                      '<syntax>P0102</syntax><element xid="AA01">'
+                      '<data_ele>98</data_ele><usage>R</usage><seq>01</seq>'
+                      '<valid_codes external="5"><code>X</code><code>Y</code>'
+                      '</valid_codes></element></segment></loop></transaction>')
+        map_def = pyx12.map_if.read_map_def(fd)
+        self.assertEqual(map_def['name'], 'Test')
+        loop_def = map_def['children'][0]
+        self.assertEqual((loop_def['tag'], loop_def['xid'], loop_def['pos'],
+                          loop_def['name'], loop_def['repeat']),
+                         ('loop', 'L1', '0100', 'Loop', '1'))
+        seg_def = loop_def['children'][0]
+        self.assertEqual(seg_def['syntax'], ['P0102'])
+        ele_def = seg_def['children'][0]
+        self.assertEqual((ele_def['seq'], ele_def['valid_codes'], ele_def['external']),
+                         ('01', ['X', 'Y'], '5'))
+
+    def test_formats_equal(self):
+        param = pyx12.params.params('pyx12.conf.xml')
+        map1 = pyx12.map_if.load_map_file('835.5010.X221.A1.xml', param)
+        map2 = pyx12.map_if.load_map_file('835.5010.X221.A1.v2.xml', param)
+        mypath = '/ISA_LOOP/GS_LOOP/ST_LOOP/HEADER/BPR'
+        node1 = map1.getnodebypath(mypath)
+        node2 = map2.getnodebypath('/ST_LOOP/HEADER/BPR')
+        for attr in ('name', 'usage', 'pos', 'max_use', 'syntax'):
+            self.assertEqual(getattr(node1, attr), getattr(node2, attr))
+        for (ele1, ele2) in zip(node1.children, node2.children):
+            for attr in ('id', 'data_ele', 'usage', 'seq', 'valid_codes'):
+                self.assertEqual(getattr(ele1, attr), getattr(ele2, attr))
+
+
+class LazyLoops(unittest.TestCase):
+    def setUp(self):
+        param = pyx12.params.params('pyx12.conf.xml')
+        self.map = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', param)
+
+    def test_not_built(self):
+        node = self.map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL')
+        self.assertFalse(node.is_built())
+        self.map.reset_cur_count()
+        self.assertFalse(node.is_built())
+
+    def test_build_on_path(self):
+        node = self.map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B')
+        self.assertTrue(node.parent.is_built())
+        self.assertFalse(node.is_built())
+        self.assertEqual(node.get_first_seg().id, 'HL')
+        self.assertTrue(node.is_built())
+        self.assertEqual(node.get_path(), '/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B')
+
+    def test_is_match_builds(self):
+        node = self.map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2300')
+        self.assertFalse(node.is_built())
+        seg_data = pyx12.segment.Segment('CLM*1234*15***11::1', '~', '*', ':')
+        self.assertTrue(node.is_match(seg_data))
+        self.assertTrue(node.is_built())
+
+
+class NodeIds(unittest.TestCase):
+    def setUp(self):
+        param = pyx12.params.params('pyx12.conf.xml')
+        self.map = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', param)
+
+    def test_ids_dense(self):
+        ids = [node.node_id for node in self.map.loop_segment_iterator()]
+        self.assertEqual(sorted(ids), list(range(self.map.node_count)))
+
+    def test_loop_range(self):
+        for node in self.map.loop_segment_iterator():
+            if node.is_loop():
+                ids = [n.node_id for n in node.loop_segment_iterator()]
+                self.assertEqual(len(ids), node.node_count)
+                self.assertEqual(min(ids), node.node_id)
+                self.assertEqual(max(ids), node.node_id + node.node_count - 1)
+            elif node.is_segment():
+                self.assertEqual(node.node_count, 1)
@@ -32,3 +32,51 @@ class GetFilename(unittest.TestCase):
                                                '004010X094A1', 'HI', '13'), '278.4010.X094.A1.xml')
         self.assertEqual(self.idx.get_abbr(
             '00401', '004010X094A1', 'HI', '13'), '278b')
+
+
+class RegisterMap(unittest.TestCase):
+
+    def test_add_map_per_instance(self):
+        idx1 = pyx12.map_index.map_index()
+        idx2 = pyx12.map_index.map_index()
+        idx1.add_map('00401', '004010X997', 'ZX', None, 'local.xml', 'local')
+        self.assertEqual(idx1.get_filename('00401', '004010X997', 'ZX'), 'local.xml')
+        self.assertEqual(idx2.get_filename('00401', '004010X997', 'ZX'), None)
+        self.assertEqual(pyx12.map_index.get_map('00401', '004010X997', 'ZX'), None)
+        self.assertEqual(len(idx1.maps), len(idx2.maps) + 1)
+
+    def test_add_map_first_wins(self):
+        idx = pyx12.map_index.map_index()
+        idx.add_map('00401', '004010X098A1', 'HC', None, 'other.xml', 'other')
+        self.assertEqual(idx.get_filename('00401', '004010X098A1', 'HC'),
+                         '837.4010.X098.A1.xml')
+
+    def test_register(self):
+        # Seen by an instance created before the map was registered
+        idx = pyx12.map_index.map_index()
+        pyx12.map_index.register_map('00401', '004010X999', 'ZZ', None,
+                                     '/tmp/custom.xml', 'custom')
+        self.assertEqual(idx.get_filename('00401', '004010X999', 'ZZ'), '/tmp/custom.xml')
+        self.assertEqual(pyx12.map_index.map_index().get_abbr(
+            '00401', '004010X999', 'ZZ'), 'custom')
+
+    def test_tspc_wildcard(self):
+        pyx12.map_index.register_map('00401', '004010X998', 'ZY', None,
+                                     'any.xml', 'any')
+        pyx12.map_index.register_map('00401', '004010X998', 'ZY', '13',
+                                     'thirteen.xml', 'thirteen')
+        idx = pyx12.map_index.map_index()
+        self.assertEqual(idx.get_filename('00401', '004010X998', 'ZY', '13'), 'thirteen.xml')
+        self.assertEqual(idx.get_filename('00401', '004010X998', 'ZY', '11'), 'any.xml')
+
+    def test_replace_no_duplicate(self):
+        pyx12.map_index.register_map('00401', '004010X996', 'ZW', None, 'a.xml', 'a')
+        ct = len(pyx12.map_index.map_index().maps)
+        pyx12.map_index.register_map('00401', '004010X996', 'ZW', None, 'b.xml', 'b')
+        idx = pyx12.map_index.map_index()
+        self.assertEqual(len(idx.maps), ct)
+        self.assertEqual(idx.get_filename('00401', '004010X996', 'ZW'), 'b.xml')
+
+    def test_no_tspc_match(self):
+        idx = pyx12.map_index.map_index()
+        self.assertEqual(idx.get_filename('00401', '004010X094A1', 'HI', '15'), None)
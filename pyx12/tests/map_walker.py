@@ -5,6 +5,7 @@ import pyx12.error_handler
 #from pyx12.errors import *
 from pyx12.map_walker import walk_tree, get_id_list, traverse_path, pop_to_parent_loop
 import pyx12.map_if
+import pyx12.map_walker
 import pyx12.params
 import pyx12.path
 import pyx12.segment
@@ -216,6 +217,8 @@ class Implicit_Loops(unittest.TestCase):
         #result = node.is_valid(seg_data, self.errh)
         #self.assertFalse(result)
         self.assertEqual(self.errh.err_cde, '3', self.errh.err_str)
+        self.assertTrue(self.errh.err_str.startswith('Mandatory loop '), self.errh.err_str)
+        self.assertTrue(self.errh.err_str.endswith('(2010AA) missing'), self.errh.err_str)
         self.assertEqual(get_id_list(pop), [])
         self.assertEqual(get_id_list(push), ['2000B'])
 
@@ -398,9 +401,26 @@ class SegmentWalk(unittest.TestCase):
         (node, pop, push) = self.walker.walk(
             node, seg_data, self.errh, 5, 4, None)
         self.assertEqual(self.errh.err_cde, '3', self.errh.err_str)
+        self.assertTrue(self.errh.err_str.startswith('Mandatory '), self.errh.err_str)
+        self.assertTrue(self.errh.err_str.endswith(') missing'), self.errh.err_str)
         self.assertEqual(get_id_list(pop), [])
         self.assertEqual(get_id_list(push), [])
 
+    def test_segment_not_found_no_missing(self):
+        """
+        Required segments passed over while looking for an unknown segment
+        are not reported
+        """
+        self.errh.reset()
+        node = self.map.getnodebypath(
+            '/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2010AA/NM1')
+        seg_data = pyx12.segment.Segment('ZZZ*1~', '~', '*', ':')
+        (node, pop, push) = self.walker.walk(
+            node, seg_data, self.errh, 5, 4, None)
+        self.assertEqual(node, None)
+        self.assertEqual(self.errh.err_cde, '1', self.errh.err_str)
+        self.assertTrue(len(self.walker.mandatory_segs_missing) > 0)
+
     def test_found_unused_segment1(self):
         self.errh.reset()
         cmap = pyx12.map_if.load_map_file('comp_test.xml', self.param)
@@ -497,14 +517,14 @@ class Counting(unittest.TestCase):
             '/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2100B/NM1')
         self.node.parent.cur_count = 1  # Loop 2100B
         self.countState = {
-            self.node.parent.x12path: 1,
-            self.node.x12path: 1,
+            self.node.parent: 1,
+            self.node: 1,
         }
         self.node.cur_count = 1
         self.node = self.map.getnodebypath(
             '/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2100B/PER')
         self.assertNotEqual(self.node, None)
-        self.countState[self.node.x12path] = 1
+        self.countState[self.node] = 1
 
     def test_count_ok1(self):
         self.errh.reset()
@@ -523,7 +543,7 @@ class Counting(unittest.TestCase):
         node = self.node
         node.cur_count = 2
         self.walker.setCountState(self.countState)
-        self.walker.counter.increment(node.x12path)
+        self.walker.counter.increment(node)
         seg_data = pyx12.segment.Segment(
             'PER*IC*Name1*EM*dev@null.com~', '~', '*', ':')
         (node, pop, push) = self.walker.walk(
@@ -536,9 +556,9 @@ class Counting(unittest.TestCase):
         node = self.node
         node.cur_count = 3
         self.walker.setCountState(self.countState)
-        #self.walker.counter.increment(node.x12path)
-        #self.walker.counter.increment(node.x12path)
-        self.walker.counter.setCount(node.x12path, 3)
+        #self.walker.counter.increment(node)
+        #self.walker.counter.increment(node)
+        self.walker.counter.setCount(node, 3)
         seg_data = pyx12.segment.Segment(
             'PER*IC*Name1*EM*dev@null.com~', '~', '*', ':')
         self.assertNotEqual(node, None, 'Node not found')
@@ -549,6 +569,41 @@ class Counting(unittest.TestCase):
         self.assertEqual(get_id_list(push), [])
 
 
+class CountReset(unittest.TestCase):
+
+    def setUp(self):
+        self.walker = walk_tree()
+        param = pyx12.params.params('pyx12.conf.xml')
+        self.map = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', param)
+        self.errh = pyx12.error_handler.errh_null()
+
+    def test_loop_repeat_resets_children(self):
+        node = self.map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2300/CLM')
+        for seg_str in ('LX*1', 'SV1*HC:H2015:TT*21*UN*12***1', 'LX*2'):
+            seg_data = pyx12.segment.Segment(seg_str, '~', '*', ':')
+            (node, pop, push) = self.walker.walk(node, seg_data, self.errh, 5, 4, None)
+            self.assertNotEqual(node, None, seg_str)
+        loop_node = node.parent
+        sv1 = loop_node.getnodebypath('SV1')
+        self.assertEqual(self.walker.counter.get_count(loop_node), 2)
+        self.assertEqual(self.walker.counter.get_count(node), 1)
+        self.assertEqual(self.walker.counter.get_count(sv1), 0)
+        self.assertEqual(sv1.get_cur_count(), 0)
+
+    def test_maps_counted_apart(self):
+        param = pyx12.params.params('pyx12.conf.xml')
+        control_map = pyx12.map_if.load_map_file('x12.control.00501.xml', param)
+        gs = control_map.getnodebypath('/ISA_LOOP/GS_LOOP/GS')
+        # The 837 node with the same id
+        node = [x for x in self.map.loop_segment_iterator() if x.node_id == gs.node_id][0]
+        self.assertNotEqual(node.get_path(), gs.get_path())
+        self.walker.counter.increment(gs)
+        self.walker.counter.increment(gs)
+        self.walker.counter.increment(node)
+        self.assertEqual(self.walker.counter.get_count(gs), 2)
+        self.assertEqual(self.walker.counter.get_count(node), 1)
+
+
 class LoopCounting(unittest.TestCase):
 
     def setUp(self):
@@ -846,3 +901,117 @@ class Bug837i(unittest.TestCase):
         del self.errh
         del self.map
         del self.walker
+
+
+class CompiledWalk(unittest.TestCase):
+
+    def setUp(self):
+        self.param = pyx12.params.params('pyx12.conf.xml')
+
+    def _walk(self, compiled, seg_strs):
+        walker = walk_tree(compiled=compiled)
+        errh = pyx12.error_handler.errh_list()
+        map = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', self.param)
+        node = map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/HEADER/BHT')
+        res = []
+        for seg_str in seg_strs:
+            seg_data = pyx12.segment.Segment(seg_str, '~', '*', ':')
+            errh.reset()
+            (seg_node, pop, push) = walker.walk(node, seg_data, errh, 5, 4, None)
+            res.append((seg_node.get_path() if seg_node else None,
+                        get_id_list(pop), get_id_list(push),
+                        errh.err_seg))
+            if seg_node is not None:
+                node = seg_node
+        return res
+
+    def test_same_as_search(self):
+        seg_strs = [
+            'REF*87*004010X098A1', 'NM1*41*2*Sender*****46*99999',
+            'NM1*40*2*Receiver*****46*8888888', 'HL*1**20*1',
+            'NM1*85*2*Provider*****24*999999999', 'N4*Kalamazoo*MI*49001',
+            'REF*1D*333402169', 'ZZZ*1', 'HL*2*1*22*0', 'SBR*P*18*******MC',
+            'NM1*IL*1*DOE*JOHN****MI*123', 'NM1*PR*2*PAYER*****PI*8888888',
+            'CLM*C1*21***12::1*Y*A*Y*A*B', 'HI*BK:317', 'LX*1',
+            'SV1*HC:H2015:TT*21*UN*12***1', 'DTP*472*D8*20040407', 'LX*2',
+            'SV1*HC:H2015:TT*21*UN*12***1', 'HL*3*1*22*0', 'CLM*C2*21***12::1',
+            'LX*1', 'SE*25*0001',
+        ]
+        self.assertEqual(self._walk(True, seg_strs), self._walk(False, seg_strs))
+
+    def test_qualifier_transition(self):
+        map = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', self.param)
+        node = map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2300/CLM')
+        machine = pyx12.map_walker.get_machine(node)
+        self.assertTrue(machine is map.walk_machine)
+        seg_data = pyx12.segment.Segment('DTP*435*DT*200401011200', '~', '*', ':')
+        plan = machine.get_plan(node, seg_data)
+        self.assertEqual(plan[1].get_path(), node.parent.get_path() + '/DTP[435]')
+        (ele_idx, subele_idx, plans, default) = machine.states[node.node_id]['DTP']
+        self.assertEqual((ele_idx, subele_idx), (0, None))
+        self.assertTrue('435' in plans)
+        self.assertEqual(default, None)
+        seg_data = pyx12.segment.Segment('DTP*472*D8*20040101', '~', '*', ':')
+        self.assertEqual(machine.get_plan(node, seg_data), None)
+        seg_data = pyx12.segment.Segment('LX*1', '~', '*', ':')
+        plan = machine.get_plan(node, seg_data)
+        self.assertEqual(plan[0], pyx12.map_walker.FOUND_LOOP)
+        self.assertEqual(get_id_list(plan[3]), ['2400'])
+
+    def test_no_transition(self):
+        map = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', self.param)
+        node = map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2300/CLM')
+        machine = pyx12.map_walker.get_machine(node)
+        seg_data = pyx12.segment.Segment('ZZZ*1', '~', '*', ':')
+        self.assertEqual(machine.get_plan(node, seg_data), None)
+        self.assertFalse('ZZZ' in machine.states.get(node.node_id, {}))
+
+    def test_memo(self):
+        map = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', self.param)
+        node = map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2300/CLM')
+        machine = pyx12.map_walker.WalkMachine(max_memo=2)
+        seg_data = pyx12.segment.Segment('ZZZ*1', '~', '*', ':')
+        plan = machine.find(node, seg_data)
+        self.assertEqual(plan[0], pyx12.map_walker.NOT_FOUND)
+        self.assertTrue(machine.find(node, seg_data) is plan)
+        seg_data = pyx12.segment.Segment('DTP*472*D8*20040101', '~', '*', ':')
+        self.assertEqual(machine.find(node, seg_data)[0], pyx12.map_walker.NOT_FOUND)
+        # Values outside the codes of the nodes tested share a result
+        seg_data = pyx12.segment.Segment('DTP*999*D8*20040101', '~', '*', ':')
+        machine.find(node, seg_data)
+        seg_data = pyx12.segment.Segment('LX*1', '~', '*', ':')
+        machine.find(node, seg_data)
+        stats = machine.get_stats()
+        self.assertEqual((stats['compiled_hits'], stats['memo_hits'], stats['misses']), (1, 2, 2))
+        self.assertEqual(stats['memo_size'], 2)
+        self.assertEqual(stats['hit_rate'], 3.0 / 5)
+        # The least recently used result is dropped
+        seg_data = pyx12.segment.Segment('YYY*1', '~', '*', ':')
+        machine.find(node, seg_data)
+        seg_data = pyx12.segment.Segment('ZZZ*1', '~', '*', ':')
+        machine.find(node, seg_data)
+        self.assertEqual(machine.get_stats()['misses'], 4)
+        self.assertEqual(machine.get_stats()['memo_size'], 2)
+
+    def test_memo_unknown_segments(self):
+        map = pyx12.map_if.load_map_file('837.4010.X098.A1.xml', self.param)
+        node = map.getnodebypath('/ISA_LOOP/GS_LOOP/ST_LOOP/DETAIL/2000A/2000B/2300/CLM')
+        machine = pyx12.map_walker.WalkMachine(max_memo=10)
+        seg_data = pyx12.segment.Segment('LX*1', '~', '*', ':')
+        machine.find(node, seg_data)
+        states = dict((k, dict(v)) for (k, v) in machine.states.items())
+        memo_quals = dict(machine.memo_quals)
+        for i in range(100):
+            seg_data = pyx12.segment.Segment('Z%02i*1' % i, '~', '*', ':')
+            self.assertEqual(machine.find(node, seg_data)[0], pyx12.map_walker.NOT_FOUND)
+        self.assertEqual(machine.states, states)
+        self.assertEqual(machine.memo_quals, memo_quals)
+        self.assertEqual(len(machine.memo), 10)
+
+    def test_memo_errors(self):
+        seg_strs = [
+            'REF*87*004010X098A1', 'ZZZ*1', 'NM1*41*2*Sender*****46*99999',
+            'ZZZ*1', 'NM1*40*2*Receiver*****46*8888888', 'ZZZ*2',
+            'HL*1**20*1', 'ZZZ*1', 'HL*2*1*22*0', 'ZZZ*1', 'HL*3*1*22*0', 'ZZZ*1',
+        ]
+        self.assertEqual(self._walk(True, seg_strs), self._walk(False, seg_strs))
@@ -101,6 +101,21 @@ class Alter(unittest.TestCase):
         seg.set('TST05-4', '')
         self.assertEqual(seg.format(), 'TST*AA:1:1*BB:5*ZZ~')
 
+    def test_set_by_idx(self):
+        seg_str = 'TST*AA:1:1*BB:5*ZZ~'
+        seg = pyx12.segment.Segment(seg_str, '~', '*', ':')
+        seg.set_by_idx(2, None, 'YY')
+        seg.set_by_idx(4, 1, 'T')
+        self.assertEqual(seg.format(), 'TST*AA:1:1*BB:5*YY**:T~')
+
+    def test_get_value_by_idx(self):
+        seg_str = 'TST*AA:1:1*BB:5*ZZ~'
+        seg = pyx12.segment.Segment(seg_str, '~', '*', ':')
+        for ref_des in ('01', '01-1', '01-3', '01-4', '03', '03-1', '04', '04-1'):
+            (ele_idx, comp_idx) = seg._parse_refdes(ref_des)
+            self.assertEqual(seg.get_value_by_idx(ele_idx, comp_idx),
+                             seg.get_value(ref_des), ref_des)
+
 
 class Composite(unittest.TestCase):
 
@@ -340,6 +355,21 @@ class Copy(unittest.TestCase):
         self.assertFalse(seg1 is seg2)
         self.assertEqual(seg1, seg2)
 
+    def test_copy_independent(self):
+        seg1 = pyx12.segment.Segment('TST*AA*1*Y*BB:5*ZZ', '~', '*', ':')
+        seg2 = seg1.copy()
+        seg2.set('TST04-2', '6')
+        seg2.set('TST01', 'CC')
+        self.assertEqual(seg1.format(), 'TST*AA*1*Y*BB:5*ZZ~')
+        self.assertEqual(seg2.format(), 'TST*CC*1*Y*BB:6*ZZ~')
+
+    def test_copy_terminators(self):
+        seg1 = pyx12.segment.Segment('TST*AA*1*Y*BB:5*ZZ', '~', '*', ':')
+        seg1.set_subele_term('!')
+        seg2 = seg1.copy()
+        self.assertEqual(seg2.format(), 'TST*AA*1*Y*BB!5*ZZ~')
+        self.assertEqual(seg2.subele_term_orig, ':')
+
 
 class IsaTerminators(unittest.TestCase):
 
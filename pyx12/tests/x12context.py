@@ -593,3 +593,205 @@ class TreeCopy(X12fileTestCase):
                     self.assertNotEqual(svc.get_value('SVC01'),
                                         new_svc.get_value('SVC01'))
                     break
+
+    def test_copy_parent(self):
+        fd = self._makeFd(datafiles['simple_837p']['source'])
+        errh = pyx12.error_handler.errh_null()
+        src = pyx12.x12context.X12ContextReader(self.param, errh, fd)
+        for datatree in src.iter_segments('2300'):
+            if datatree.id == '2300':
+                new_tree = datatree.copy()
+                self.assertTrue(new_tree.parent is datatree.parent)
+                for child in new_tree.children:
+                    self.assertTrue(child.parent is new_tree)
+                for (seg1, seg2) in zip(datatree.iterate_segments(), new_tree.iterate_segments()):
+                    self.assertFalse(seg1['segment'] is seg2['segment'])
+                    self.assertEqual(seg1['segment'], seg2['segment'])
+                break
+
+    def test_copy_on_write(self):
+        fd = self._makeFd(datafiles['simple_837p']['source'])
+        errh = pyx12.error_handler.errh_null()
+        src = pyx12.x12context.X12ContextReader(self.param, errh, fd)
+        for datatree in src.iter_segments('2300'):
+            if datatree.id == '2300':
+                new_tree = datatree.copy(cow=True)
+                for (seg1, seg2) in zip(datatree.iterate_segments(), new_tree.iterate_segments()):
+                    self.assertTrue(seg1['segment'] is seg2['segment'])
+                new_tree.set_value('CLM01', '999')
+                new_tree.set_value('2400/SV102', '40')
+                self.assertEqual(datatree.get_value('CLM01'), '3215338')
+                self.assertEqual(datatree.get_value('2400/SV102'), '21')
+                self.assertEqual(new_tree.get_value('CLM01'), '999')
+                self.assertEqual(new_tree.get_value('2400/SV102'), '40')
+                datatree.first('2400/DTP').set_value('DTP03', '20040101')
+                self.assertEqual(new_tree.get_value('2400/DTP03'), '20040407')
+                self.assertEqual(datatree.get_value('2400/DTP03'), '20040101')
+                self.assertTrue(datatree.first('2400/LX').seg_data
+                                is new_tree.first('2400/LX').seg_data)
+                break
+
+
+class ChildIndex(X12fileTestCase):
+
+    def setUp(self):
+        self.param = pyx12.params.params('pyx12.conf.xml')
+        fd = self._makeFd(datafiles['simple_837p']['source'])
+        errh = pyx12.error_handler.errh_null()
+        src = pyx12.x12context.X12ContextReader(self.param, errh, fd)
+        for datatree in src.iter_segments('2300'):
+            if datatree.id == '2300':
+                self.loop2300 = datatree
+                break
+
+    def test_add_after_select(self):
+        self.assertEqual(self.loop2300.count('2400'), 2)
+        self.loop2300.add_node(self.loop2300.first('2400').copy())
+        self.assertEqual(self.loop2300.count('2400'), 3)
+        self.loop2300.add_segment('REF*D9*77~')
+        self.assertEqual(self.loop2300.get_value('REF[D9]02'), '77')
+
+    def test_delete_compacts(self):
+        ct = len(self.loop2300.children)
+        self.assertEqual(self.loop2300.count('2400'), 2)
+        self.assertTrue(self.loop2300.delete_node('2400'))
+        self.assertEqual(self.loop2300.count('2400'), 1)
+        self.assertEqual(self.loop2300.get_value('2400/LX01'), '2')
+        for i in range(10):
+            self.loop2300.add_segment('REF*D9*%i~' % (i))
+        self.assertEqual(self.loop2300.count('REF'), 10)
+        for i in range(10):
+            self.assertTrue(self.loop2300.delete_node('REF'))
+            self.assertEqual(self.loop2300.count('REF'), 9 - i)
+            deleted_ct = len([x for x in self.loop2300.children if x.type is None])
+            self.assertTrue(deleted_ct * 2 < len(self.loop2300.children))
+        self.assertEqual(self.loop2300.count('2400'), 1)
+        self.assertTrue(len(self.loop2300.children) < ct + 10)
+
+    def test_delete_then_add_same_length(self):
+        self.loop2300.add_segment('REF*D9*77~')
+        self.assertEqual(self.loop2300.count('REF'), 1)
+        self.assertTrue(self.loop2300.delete_segment('REF*D9*77~'))
+        self.loop2300.add_segment('NTE*ADD*NOTE~')
+        self.assertEqual(self.loop2300.count('REF'), 0)
+        self.assertEqual(self.loop2300.get_value('NTE02'), 'NOTE')
+
+    def test_replace_same_length(self):
+        self.assertEqual(self.loop2300.get_value('2400/LX01'), '1')
+        first = self.loop2300.first('2400')
+        new_loop = first.copy()
+        new_loop.set_value('LX01', '9')
+        self.loop2300.children[self.loop2300.children.index(first)] = new_loop
+        self.assertEqual(self.loop2300.get_value('2400/LX01'), '9')
+        self.assertEqual(self.loop2300.count('2400'), 2)
+
+    def test_remove_then_append(self):
+        self.assertEqual(self.loop2300.count('2400'), 2)
+        first = self.loop2300.first('2400')
+        self.loop2300.children.remove(first)
+        self.loop2300.children.append(first.copy())
+        self.assertEqual(self.loop2300.get_value('2400/LX01'), '2')
+        self.assertEqual(self.loop2300.count('2400'), 2)
+
+    def test_delete_then_add_node(self):
+        self.assertEqual(self.loop2300.count('2400'), 2)
+        first = self.loop2300.first('2400')
+        new_loop = first.copy()
+        new_loop.set_value('LX01', '9')
+        self.assertTrue(self.loop2300.delete_node('2400'))
+        self.loop2300.add_node(new_loop)
+        self.assertEqual([x.get_value('LX01') for x in self.loop2300.select('2400')],
+                         ['2', '9'])
+
+
+class StreamTree(X12fileTestCase):
+
+    def setUp(self):
+        self.param = pyx12.params.params('pyx12.conf.xml')
+
+    def _get_src(self, datakey):
+        fd = self._makeFd(datafiles[datakey]['source'])
+        errh = pyx12.error_handler.errh_null()
+        return pyx12.x12context.X12ContextReader(self.param, errh, fd)
+
+    def test_same_trees(self):
+        trees = [node for node in self._get_src('simple_837p').iter_segments('2300')
+                 if node.id == '2300']
+        stream_trees = [node for node in self._get_src('simple_837p').iter_segments('2300', stream=True)
+                        if node.id == '2300']
+        self.assertEqual(len(trees), 2)
+        self.assertEqual(len(stream_trees), 2)
+        for (tree, stream_tree) in zip(trees, stream_trees):
+            self.assertEqual([x['segment'].format() for x in tree.iterate_segments()],
+                             [x['segment'].format() for x in stream_tree.iterate_segments()])
+
+    def test_ancestor_values(self):
+        for datatree in self._get_src('simple_837p').iter_segments('2300', stream=True):
+            if datatree.id == '2300':
+                self.assertEqual(datatree.parent.id, '2000B')
+                self.assertEqual(datatree.get_value('../SBR01'), 'P')
+                self.assertEqual(datatree.get_value('../2010BA/NM109'), '1212121')
+                self.assertEqual(datatree.get_value('../../2010AA/NM109'), '999999999')
+                self.assertEqual(datatree.get_value('../../../../HEADER/BHT03'), 'AAAA1179')
+
+    def test_trees_released(self):
+        for datatree in self._get_src('simple_837p').iter_segments('2300', stream=True):
+            if datatree.id == '2300':
+                self.assertFalse(datatree.parent.exists('2300'))
+                self.assertEqual(datatree.parent.parent.count('2000B'), 1)
+
+    def test_segments_outside_tree(self):
+        seg_ids = [node.id for node in self._get_src('simple_837p').iter_segments('2000A', stream=True)
+                   if node.type == 'seg']
+        self.assertEqual(seg_ids, ['ISA', 'GS', 'ST', 'BHT', 'REF', 'NM1', 'PER', 'NM1',
+                                   'SE', 'GE', 'IEA'])
+
+    def test_context_read_only(self):
+        for datatree in self._get_src('simple_837p').iter_segments('2300', stream=True):
+            if datatree.id == '2300':
+                self.assertRaises(EngineError, datatree.parent.add_segment, 'REF*SY*5555~')
+                self.assertRaises(EngineError, datatree.parent.set_value, 'SBR01', 'S')
+                self.assertRaises(EngineError, datatree.parent.delete)
+                datatree.set_value('CLM01', '9999')
+                self.assertEqual(datatree.get_value('CLM01'), '9999')
+
+    def test_stream_requires_loop_id(self):
+        src = self._get_src('simple_837p')
+        self.assertRaises(EngineError, list, src.iter_segments(stream=True))
+
+
+def _get_claim_summary(loop2300):
+    return (loop2300.get_value('CLM01'), loop2300.count('2400'))
+
+
+class PipelineTree(X12fileTestCase):
+
+    def setUp(self):
+        self.param = pyx12.params.params('pyx12.conf.xml')
+
+    def _get_src(self, datakey):
+        fd = self._makeFd(datafiles[datakey]['source'])
+        errh = pyx12.error_handler.errh_null()
+        return pyx12.x12context.X12ContextReader(self.param, errh, fd)
+
+    def test_serialize_round_trip(self):
+        for datatree in self._get_src('simple_837p').iter_segments('2300'):
+            if datatree.id == '2300':
+                tree_data = pyx12.x12context.serialize_tree(datatree)
+                self.assertEqual(tree_data[0], '837.4010.X098.A1.xml')
+                new_tree = pyx12.x12context.deserialize_tree(tree_data, self.param)
+                self.assertEqual(new_tree.id, '2300')
+                self.assertTrue(new_tree.parent is None)
+                self.assertEqual([x['segment'].format() for x in datatree.iterate_segments()],
+                                 [x['segment'].format() for x in new_tree.iterate_segments()])
+                self.assertEqual(new_tree.get_value('2400/REF[6R]02'), '1057296')
+
+    def test_pipeline_in_order(self):
+        src = self._get_src('simple_837p')
+        res = list(src.iter_pipeline('2300', _get_claim_summary, processes=2, max_pending=1))
+        self.assertEqual(res, [('3215338', 2), ('5555', 3)])
+
+    def test_pipeline_835(self):
+        src = self._get_src('835id')
+        res = list(src.iter_pipeline('2100', _get_claim_summary, processes=2))
+        self.assertEqual(len(res), 3)
@@ -0,0 +1,106 @@
+import unittest
+import array
+try:
+    from StringIO import StringIO
+except:
+    from io import StringIO
+
+from pyx12.errors import X12PathError, EngineError
+import pyx12.params
+import pyx12.x12extract
+from pyx12.tests.x12testdata import datafiles
+
+
+class ExtractTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.param = pyx12.params.params()
+
+    def _get_src(self, datakey='simple_837p'):
+        return StringIO(datafiles[datakey]['source'])
+
+
+class Rows(ExtractTestCase):
+
+    def test_claim_rows(self):
+        extractor = pyx12.x12extract.Extractor('2300', [
+            ('claim_id', '2300/CLM01'),
+            ('charge', '2300/CLM02', 'float'),
+            ('member_id', '2010BA/NM109'),
+        ])
+        self.assertEqual(list(extractor.iter_rows(self.param, self._get_src())),
+                         [('3215338', 21.0, '1212121'), ('5555', 21.0, '1212121')])
+
+    def test_enclosing_loop(self):
+        extractor = pyx12.x12extract.Extractor('2400', [
+            ('claim_id', '2300/CLM01'),
+            ('line', 'LX01', 'int'),
+            ('proc', 'SV101-2'),
+        ])
+        rows = list(extractor.iter_rows(self.param, self._get_src()))
+        self.assertEqual(rows[0], ('3215338', 1, 'H2015'))
+        self.assertEqual(rows[-1], ('5555', 3, 'H2017'))
+        self.assertEqual(len(rows), 5)
+
+    def test_missing(self):
+        extractor = pyx12.x12extract.Extractor('2300', [
+            ('dtp', '2300/DTP03'),
+            ('ct', '2300/DTP03', 'int'),
+        ])
+        rows = list(extractor.iter_rows(self.param, self._get_src()))
+        self.assertEqual(rows[0], (None, None))
+
+    def test_invalid_path(self):
+        self.assertRaises(X12PathError, pyx12.x12extract.Column, 'clm', '2300/CLM')
+        self.assertRaises(EngineError, pyx12.x12extract.Column, 'clm', '2300/CLM01', 'date')
+
+
+class Output(ExtractTestCase):
+
+    def setUp(self):
+        ExtractTestCase.setUp(self)
+        self.extractor = pyx12.x12extract.Extractor('2300', [
+            ('claim_id', '2300/CLM01'),
+            ('charge', '2300/CLM02', 'float'),
+            ('pos', '2300/CLM05-1', 'int'),
+            ('dtp', '2300/DTP03'),
+            ('dtp_ct', '2300/DTP03', 'int'),
+            ('dtp_amt', '2300/DTP03', 'float'),
+        ])
+
+    def test_csv(self):
+        fd_out = StringIO()
+        ct = self.extractor.to_csv(self.param, self._get_src(), fd_out)
+        self.assertEqual(ct, 2)
+        self.assertEqual(fd_out.getvalue().splitlines(),
+                         ['claim_id,charge,pos,dtp,dtp_ct,dtp_amt',
+                          '3215338,21,12,,,', '5555,21,12,,,'])
+
+    def test_columns(self):
+        store = self.extractor.to_columns(self.param, self._get_src())
+        self.assertEqual(list(store.keys()),
+                         ['claim_id', 'charge', 'pos', 'dtp', 'dtp_ct', 'dtp_amt'])
+        self.assertEqual(store['claim_id'], ['3215338', '5555'])
+        self.assertEqual(store['charge'], array.array('d', [21.0, 21.0]))
+        self.assertEqual(store['pos'], array.array('l', [12, 12]))
+        self.assertEqual(store['dtp'], [None, None])
+        self.assertEqual(store['dtp_ct'], array.array('l', [0, 0]))
+        self.assertTrue(all([x != x for x in store['dtp_amt']]))
+
+
+class Spec(unittest.TestCase):
+
+    def test_read_spec(self):
+        fd = StringIO('# Claims\nloop 2300\n\nclaim_id 2300/CLM01\ncharge 2300/CLM02 float\n')
+        extractor = pyx12.x12extract.read_spec(fd)
+        self.assertEqual(extractor.loop_id, '2300')
+        self.assertEqual(extractor.get_names(), ['claim_id', 'charge'])
+        self.assertEqual(extractor.columns[1].col_type, 'float')
+
+    def test_no_loop(self):
+        fd = StringIO('claim_id 2300/CLM01\n')
+        self.assertRaises(EngineError, pyx12.x12extract.read_spec, fd)
+
+    def test_bad_line(self):
+        fd = StringIO('loop 2300\nclaim_id\n')
+        self.assertRaises(EngineError, pyx12.x12extract.read_spec, fd)
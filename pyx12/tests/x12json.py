@@ -0,0 +1,113 @@
+import unittest
+import json
+try:
+    from StringIO import StringIO
+except:
+    from io import StringIO
+
+import pyx12.error_handler
+import pyx12.params
+import pyx12.x12context
+import pyx12.x12json
+from pyx12.tests.x12testdata import datafiles
+
+
+class X12JsonTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.param = pyx12.params.params()
+
+    def _get_records(self, datakey, loop_id='ST_LOOP'):
+        fd_out = StringIO()
+        ct = pyx12.x12json.x12json(self.param, StringIO(datafiles[datakey]['source']),
+                                   fd_out, loop_id)
+        lines = fd_out.getvalue().splitlines()
+        self.assertEqual(ct, len(lines))
+        return [json.loads(line) for line in lines]
+
+
+class TransactionSets(X12JsonTestCase):
+
+    def test_one_per_line(self):
+        records = self._get_records('simple_837p')
+        self.assertEqual(len(records), 1)
+        rec = records[0]
+        self.assertEqual(rec['type'], 'loop')
+        self.assertEqual(rec['id'], 'ST_LOOP')
+        self.assertEqual(rec['path'], '/ISA_LOOP/GS_LOOP/ST_LOOP')
+        self.assertEqual(rec['children'][0]['id'], 'ST')
+        self.assertEqual(rec['children'][-1]['id'], 'SE')
+
+    def test_envelope(self):
+        rec = self._get_records('835id')[0]
+        self.assertEqual(rec['envelope']['ISA13'], '000003447')
+        self.assertEqual(rec['envelope']['GS06'], '3444')
+        self.assertEqual(rec['envelope']['ST01'], '835')
+        self.assertEqual(rec['envelope']['ST02'], '40731')
+
+    def test_element_names(self):
+        rec = self._get_records('835id')[0]
+        st = rec['children'][0]
+        self.assertEqual(st['name'], 'Transaction Set Header')
+        self.assertEqual(st['elements'][1],
+                         {'id': 'ST02', 'name': 'Transaction Set Control Number',
+                          'value': '40731'})
+
+
+class SelectedLoops(X12JsonTestCase):
+
+    def test_loop_count(self):
+        records = self._get_records('simple_837p', '2300')
+        self.assertEqual(len(records), 2)
+        for rec in records:
+            self.assertEqual(rec['id'], '2300')
+            self.assertEqual(rec['children'][0]['id'], 'CLM')
+            self.assertEqual(rec['envelope']['ST01'], '837')
+
+    def test_same_as_tree(self):
+        errh = pyx12.error_handler.errh_null()
+        src = pyx12.x12context.X12ContextReader(self.param, errh,
+                                                StringIO(datafiles['simple_837p']['source']))
+        claim_ids = [x.get_value('CLM01') for x in src.iter_segments('2300')
+                     if x.id == '2300']
+        records = self._get_records('simple_837p', '2300')
+        self.assertEqual([rec['children'][0]['elements'][0]['value'] for rec in records],
+                         claim_ids)
+
+    def test_composite(self):
+        rec = self._get_records('simple_837p', '2300')[0]
+        clm05 = [x for x in rec['children'][0]['elements'] if x['id'] == 'CLM05'][0]
+        self.assertEqual(clm05['subelements'][0]['id'], 'CLM05-01')
+        self.assertEqual(clm05['subelements'][0]['value'], '12')
+        self.assertTrue('value' not in clm05)
+
+    def test_no_match(self):
+        self.assertEqual(self._get_records('835id', '2300'), [])
+
+
+class NotInMap(X12JsonTestCase):
+
+    def test_extra_elements(self):
+        records = self._get_records('bad_header_looping')
+        self.assertEqual(len(records), 1)
+        extra = []
+        stack = [records[0]]
+        while stack:
+            node = stack.pop()
+            if node['type'] == 'loop':
+                stack.extend(node['children'])
+            else:
+                extra.extend([(node['id'], ele) for ele in node['elements']
+                              if ele['name'] is None])
+        self.assertTrue(('LQ', {'id': 'LQ04', 'name': None, 'value': '444313000'}) in extra)
+
+    def test_extra_subelements(self):
+        src = datafiles['simple_837p']['source'].replace(
+            'SV1*HC:H2015:TT', 'SV1*HC:H2015:TT:A:B:C:D:E:F:G', 1)
+        fd_out = StringIO()
+        pyx12.x12json.x12json(self.param, StringIO(src), fd_out, '2400')
+        rec = json.loads(fd_out.getvalue().splitlines()[0])
+        sv101 = rec['children'][1]['elements'][0]
+        self.assertEqual(len(sv101['subelements']), 10)
+        self.assertEqual(sv101['subelements'][-1],
+                         {'id': 'SV101-10', 'name': None, 'value': 'G'})
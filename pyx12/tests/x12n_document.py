@@ -5,8 +5,10 @@ except:
     from io import StringIO
 
 import pyx12.error_handler
+import pyx12.errors
 import pyx12.x12n_document
 import pyx12.params
+import pyx12.stats
 from pyx12.tests.x12testdata import datafiles
 
 
@@ -153,3 +155,73 @@ class Test5010(X12DocumentTestCase):
 
     def test_834_lui_id_5010(self):
         self._test_999('834_lui_id_5010')
+
+
+class MapCache(X12DocumentTestCase):
+    def _validate(self, datakey, map_cache):
+        fd_997 = StringIO()
+        ok = pyx12.x12n_document.x12n_document(
+            self.param, self._makeFd(datafiles[datakey]['source']), fd_997, None, None,
+            map_cache=map_cache)
+        fd_997.seek(0)
+        return (ok, fd_997)
+
+    def test_same_997(self):
+        map_cache = {}
+        for datakey in ('trailer_errors', 'mult_isa', '835id', 'trailer_errors', '837miss'):
+            (ok1, fd1) = self._validate(datakey, None)
+            (ok2, fd2) = self._validate(datakey, map_cache)
+            self.assertEqual(ok1, ok2, datakey)
+            self._isX12Diff(fd1, fd2)
+        self.assertTrue('x12.control.00401.xml' in map_cache)
+
+
+class StageTiming(X12DocumentTestCase):
+    def test_stats(self):
+        stats = pyx12.stats.StageStats()
+        fd_997 = StringIO()
+        pyx12.x12n_document.x12n_document(
+            self.param, self._makeFd(datafiles['simple_837p']['source']), fd_997, None, None,
+            stats=stats)
+        self.assertEqual(stats.seg_count, 67)
+        for stage in pyx12.stats.STAGES:
+            self.assertTrue(stats.seconds[stage] >= 0.0, stage)
+        self.assertTrue(stats.seconds['walk'] > 0.0)
+        self.assertTrue(stats.seconds['maps'] > 0.0)
+        self.assertAlmostEqual(stats.get_total(), sum(stats.seconds.values()))
+
+    def test_merge(self):
+        stats1 = pyx12.stats.StageStats()
+        stats1.add('walk', 1.0)
+        stats1.seg_count = 10
+        stats2 = pyx12.stats.StageStats()
+        stats2.add('walk', 0.5)
+        stats2.add('parse', 0.25)
+        stats2.seg_count = 5
+        stats1.merge(stats2)
+        self.assertEqual(stats1.seconds['walk'], 1.5)
+        self.assertEqual(stats1.seconds['parse'], 0.25)
+        self.assertEqual(stats1.seg_count, 15)
+        fd = StringIO()
+        stats1.write(fd)
+        self.assertTrue('15 segments' in fd.getvalue())
+
+
+class XmlOutput(X12DocumentTestCase):
+    def test_flushed_on_error(self):
+        # No map for the version
+        src = datafiles['simple_837p']['source'].replace('004010X098A1~', '004010X999A1~')
+        fd_source = self._makeFd(src)
+        fd_xml = StringIO()
+        self.assertRaises(pyx12.errors.EngineError, pyx12.x12n_document.x12n_document,
+                          self.param, fd_source, None, None, fd_xml)
+        self.assertTrue(fd_xml.getvalue().startswith('<?xml'))
+        self.assertTrue("<seg id='ISA'>" in fd_xml.getvalue())
+
+    def test_subelements_not_in_map(self):
+        src = datafiles['simple_837p']['source'].replace(
+            'SV1*HC:H2015:TT', 'SV1*HC:H2015:TT:A:B:C:D:E:F:G', 1)
+        fd_xml = StringIO()
+        pyx12.x12n_document.x12n_document(self.param, self._makeFd(src),
+                                          None, None, fd_xml)
+        self.assertTrue(fd_xml.getvalue().rstrip().endswith('</x12simple>'))
@@ -0,0 +1,99 @@
+import unittest
+import os
+import os.path
+import shutil
+import tempfile
+try:
+    from StringIO import StringIO
+except:
+    from io import StringIO
+
+import pyx12.errors
+import pyx12.x12file
+import pyx12.x12norm
+from pyx12.tests.x12testdata import datafiles
+
+
+class Normalize(unittest.TestCase):
+
+    def test_eol(self):
+        src = datafiles['simple_837p']['source']
+        fd_out = StringIO()
+        pyx12.x12norm.normalize(StringIO(src), fd_out, eol='\n')
+        lines = fd_out.getvalue().splitlines()
+        self.assertEqual(len(lines), len(list(pyx12.x12file.X12Reader(StringIO(src)))))
+        self.assertEqual(lines[0][:4], 'ISA*')
+        self.assertEqual(lines[-1], 'IEA*1*000001168~')
+
+    def test_no_eol(self):
+        fd_out = StringIO()
+        pyx12.x12norm.normalize(StringIO(datafiles['simple_837p']['source']), fd_out)
+        self.assertEqual(len(fd_out.getvalue().splitlines()), 1)
+
+    def test_blocks(self):
+        src = datafiles['loop_counting']['source']
+        fd_out = StringIO()
+        pyx12.x12norm.normalize(StringIO(src), fd_out, eol='\n')
+        self.assertEqual(len(fd_out.getvalue().splitlines()), 417)
+
+    def test_fix_counting(self):
+        src = datafiles['simple_837p']['source'].replace('SE*63*1179~', 'SE*60*1179~')
+        fd_out = StringIO()
+        ct = pyx12.x12norm.normalize(StringIO(src), fd_out, eol='\n', fix_counting=True)
+        self.assertEqual(ct, 1)
+        self.assertTrue('SE*63*1179~' in fd_out.getvalue().splitlines())
+
+    def test_no_fix(self):
+        src = datafiles['simple_837p']['source'].replace('SE*63*1179~', 'SE*60*1179~')
+        fd_out = StringIO()
+        ct = pyx12.x12norm.normalize(StringIO(src), fd_out, eol='\n')
+        self.assertEqual(ct, 0)
+        self.assertTrue('SE*60*1179~' in fd_out.getvalue().splitlines())
+
+
+class InPlace(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'test.txt')
+        with open(self.filename, 'w') as fd:
+            fd.write(datafiles['simple_837p']['source'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_in_place(self):
+        res = list(pyx12.x12norm.normalize_files([self.filename], eol='\n'))
+        self.assertEqual(res, [(self.filename, None)])
+        with open(self.filename) as fd:
+            self.assertEqual(fd.readline()[:4], 'ISA*')
+        self.assertEqual(os.listdir(self.tmpdir), ['test.txt'])
+
+    def test_error_keeps_original(self):
+        with open(self.filename, 'w') as fd:
+            fd.write('GS*HC~')
+        res = list(pyx12.x12norm.normalize_files([self.filename]))
+        self.assertTrue(res[0][1] is not None)
+        with open(self.filename) as fd:
+            self.assertEqual(fd.read(), 'GS*HC~')
+        self.assertEqual(os.listdir(self.tmpdir), ['test.txt'])
+
+    def test_output_file(self):
+        file_out = os.path.join(self.tmpdir, 'out.txt')
+        pyx12.x12norm.normalize_file(self.filename, file_out, eol='\n')
+        with open(file_out) as fd:
+            self.assertEqual(len(fd.read().splitlines()), 67)
+
+    def test_replace_existing_on_windows(self):
+        src = os.path.join(self.tmpdir, 'new.txt')
+        with open(src, 'w') as fd:
+            fd.write('new')
+        os_name = os.name
+        os.name = 'nt'
+        try:
+            pyx12.x12norm._replace(src, self.filename)
+        finally:
+            os.name = os_name
+        with open(self.filename) as fd:
+            self.assertEqual(fd.read(), 'new')
+        self.assertEqual(os.listdir(self.tmpdir), ['test.txt'])
@@ -0,0 +1,126 @@
+import unittest
+try:
+    from StringIO import StringIO
+except:
+    from io import StringIO
+
+import pyx12.error_handler
+from pyx12.errors import X12PathError
+import pyx12.params
+import pyx12.x12context
+import pyx12.x12query
+from pyx12.tests.x12testdata import datafiles
+
+
+class QueryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        param = pyx12.params.params('pyx12.conf.xml')
+        errh = pyx12.error_handler.errh_null()
+        fd = StringIO(datafiles['simple_837p']['source'])
+        src = pyx12.x12context.X12ContextReader(param, errh, fd)
+        for datatree in src.iter_segments('2000A'):
+            if datatree.id == '2000A':
+                self.loop2000A = datatree
+                break
+
+
+class ChildSteps(QueryTestCase):
+
+    def test_same_as_select(self):
+        for path_str in ('2000B', '2000B/2300', '2000B/2300/2400/SV1', 'HL',
+                         '2000B/2300/2400/REF[6R]', '2000B/2300/2400/DTP[472]'):
+            query = pyx12.x12query.compile_path(path_str)
+            self.assertEqual([x for x in self.loop2000A.select(path_str)],
+                             list(query.select(self.loop2000A)), path_str)
+
+    def test_values(self):
+        query = pyx12.x12query.compile_path('2000B/2300/2400/REF[6R]02')
+        self.assertEqual(list(query.values(self.loop2000A)),
+                         ['1057296', '1057297', '1057296', '1057297', '105797'])
+        self.assertEqual(query.get_value(self.loop2000A), '1057296')
+
+    def test_subelement(self):
+        query = pyx12.x12query.compile_path('2000B/2300/2400/SV101-2')
+        self.assertEqual(query.get_value(self.loop2000A), 'H2015')
+
+    def test_parent(self):
+        loop2300 = self.loop2000A.first('2000B/2300')
+        query = pyx12.x12query.compile_path('../SBR01')
+        self.assertEqual(query.get_value(loop2300), 'P')
+        query = pyx12.x12query.compile_path('../../../SBR01')
+        self.assertRaises(X12PathError, query.get_value, loop2300)
+
+    def test_reuse(self):
+        query = pyx12.x12query.compile_path('2400/LX01')
+        self.assertEqual([list(query.values(x)) for x in self.loop2000A.select('2000B/2300')],
+                         [['1', '2'], ['1', '2', '3']])
+
+
+class Descendant(QueryTestCase):
+
+    def test_descendant(self):
+        query = pyx12.x12query.compile_path('//2400/SV1')
+        self.assertEqual(query.count(self.loop2000A), 5)
+        query = pyx12.x12query.compile_path('//SV1')
+        self.assertEqual(query.count(self.loop2000A), 5)
+        query = pyx12.x12query.compile_path('//2300//SV102')
+        self.assertEqual(list(query.values(self.loop2000A)), ['21', '21', '21', '21', '1'])
+
+    def test_order(self):
+        query = pyx12.x12query.compile_path('//CLM01')
+        self.assertEqual(list(query.values(self.loop2000A)), ['3215338', '5555'])
+
+    def test_no_match(self):
+        query = pyx12.x12query.compile_path('//2000C')
+        self.assertFalse(query.exists(self.loop2000A))
+        self.assertEqual(query.first(self.loop2000A), None)
+
+
+class Predicates(QueryTestCase):
+
+    def test_loop_element(self):
+        query = pyx12.x12query.compile_path('//2300[CLM05-1=12]')
+        self.assertEqual(query.count(self.loop2000A), 2)
+        query = pyx12.x12query.compile_path('//2300[CLM05-1=11]')
+        self.assertEqual(query.count(self.loop2000A), 0)
+        query = pyx12.x12query.compile_path('//2300[CLM01=5555]/2400/LX01')
+        self.assertEqual(list(query.values(self.loop2000A)), ['1', '2', '3'])
+
+    def test_loop_sub_path(self):
+        query = pyx12.x12query.compile_path('//2300[2400/REF[6R]02=105797]/CLM01')
+        self.assertEqual(list(query.values(self.loop2000A)), ['5555'])
+
+    def test_segment_element(self):
+        query = pyx12.x12query.compile_path('//2400/DTP[DTP03=20040407]')
+        self.assertEqual(query.count(self.loop2000A), 2)
+        query = pyx12.x12query.compile_path('//DTP[472][DTP03=20040414]')
+        self.assertEqual(query.count(self.loop2000A), 2)
+
+    def test_nested(self):
+        query = pyx12.x12query.compile_path('//2400[SV1[SV101-2=H2015]]/LX01')
+        self.assertEqual(list(query.values(self.loop2000A)), ['1', '2', '1', '2'])
+
+    def test_exists(self):
+        query = pyx12.x12query.compile_path('//2300[2400/2430]/CLM01')
+        self.assertEqual(list(query.values(self.loop2000A)), ['3215338'])
+        query = pyx12.x12query.compile_path('2000B[2300]/SBR01')
+        self.assertEqual(query.get_value(self.loop2000A), 'P')
+
+    def test_deleted(self):
+        query = pyx12.x12query.compile_path('//2400')
+        self.assertEqual(query.count(self.loop2000A), 5)
+        self.loop2000A.first('2000B/2300/2400').delete()
+        self.assertEqual(query.count(self.loop2000A), 4)
+
+
+class BadPaths(unittest.TestCase):
+
+    def test_bad_paths(self):
+        for path_str in ('', '../', '/2000A/2300', '2300[CLM01=1', '2300]',
+                         '2300//', '2300[2400=1]', '2300[CLM01=1]]'):
+            self.assertRaises(X12PathError, pyx12.x12query.compile_path, path_str)
+
+    def test_no_element(self):
+        query = pyx12.x12query.compile_path('//2400/SV1')
+        self.assertRaises(X12PathError, list, query.values(None))
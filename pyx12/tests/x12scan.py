@@ -0,0 +1,73 @@
+import unittest
+try:
+    from StringIO import StringIO
+except:
+    from io import StringIO
+
+import pyx12.errors
+import pyx12.x12file
+import pyx12.x12scan
+from pyx12.tests.x12testdata import datafiles
+
+
+class ScanFile(unittest.TestCase):
+
+    def _get_st_list(self, summary):
+        return [(st['type'], st['control_number'])
+                for isa in summary['interchanges']
+                for gs in isa['groups']
+                for st in gs['transactions']]
+
+    def test_same_as_reader(self):
+        for datakey in ('simple_837p', '835id', 'mult_isa', 'trailing_terms', 'fail_no_IEA'):
+            src = datafiles[datakey]['source']
+            segs = list(pyx12.x12file.X12Reader(StringIO(src)))
+            summary = pyx12.x12scan.scan_file(StringIO(src))
+            self.assertEqual(summary['segment_count'], len(segs), datakey)
+            self.assertEqual(self._get_st_list(summary),
+                             [(x.get_value('ST01'), x.get_value('ST02'))
+                              for x in segs if x.get_seg_id() == 'ST'], datakey)
+
+    def test_block_boundaries(self):
+        src = datafiles['mult_isa']['source']
+        summary = pyx12.x12scan.scan_file(StringIO(src))
+        for bufsize in (1, 5, 64):
+            self.assertEqual(pyx12.x12scan.scan_file(StringIO(src), bufsize), summary)
+
+    def test_envelope_values(self):
+        summary = pyx12.x12scan.scan_file(StringIO(datafiles['simple_837p']['source']))
+        isa = summary['interchanges'][0]
+        self.assertEqual(isa['sender'], 'AAAAAAAA       ')
+        self.assertEqual(isa['control_number'], '000001168')
+        self.assertEqual(isa['iea_count'], 1)
+        gs = isa['groups'][0]
+        self.assertEqual(gs['version'], '004010X098A1')
+        self.assertEqual(gs['ge_count'], 1)
+        st = gs['transactions'][0]
+        self.assertEqual(st['segment_count'], 63)
+        self.assertEqual(st['se_count'], 63)
+
+    def test_counts(self):
+        summary = pyx12.x12scan.scan_file(StringIO(datafiles['simple_837p']['source']))
+        self.assertEqual(summary['transaction_counts'], {'837': 1})
+        self.assertEqual(summary['partner_counts'][0]['sender'], 'AAAAAAAA       ')
+        self.assertEqual(summary['partner_counts'][0]['counts'], {'837': 1})
+
+    def test_strip_padding(self):
+        summary = pyx12.x12scan.scan_file(StringIO(datafiles['simple_837p']['source']))
+        summary = pyx12.x12scan.strip_padding(summary)
+        self.assertEqual(summary['interchanges'][0]['sender'], 'AAAAAAAA')
+        self.assertEqual(summary['interchanges'][0]['receiver'], 'BBBBBBBBB')
+        self.assertEqual(summary['partner_counts'][0]['sender'], 'AAAAAAAA')
+
+    def test_no_isa(self):
+        self.assertRaises(pyx12.errors.X12Error, pyx12.x12scan.scan_file,
+                          StringIO('GS*HC~'))
+
+
+class ScanFiles(unittest.TestCase):
+
+    def test_error_entry(self):
+        summaries = list(pyx12.x12scan.scan_files(['/nonexistent/file.txt']))
+        self.assertEqual(summaries[0]['filename'], '/nonexistent/file.txt')
+        self.assertTrue('error' in summaries[0])
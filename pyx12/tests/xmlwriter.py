@@ -51,3 +51,33 @@ class TestWriter(unittest.TestCase):
             os.remove(filename)
         except:
             pass
+
+    def test_escape(self):
+        fd = StringIO()
+        writer = XMLWriter(fd)
+        writer.push(u"x12err", {'id': "a'b"})
+        writer.elem(u"desc", u"A & <B>", {'code': '1'})
+        writer.elem(u"desc", u"plain")
+        writer.empty(u"ele", {'id': '<'})
+        writer.pop()
+        self.assertEqual(fd.getvalue(), '<?xml version="1.0" encoding="utf-8"?>\n'
+                         "<x12err id='a&apos;b'>\n"
+                         "  <desc code='1'>A &amp; &lt;B&gt;</desc>\n"
+                         "  <desc>plain</desc>\n"
+                         "  <ele id='&lt;'/>\n"
+                         "</x12err>\n")
+
+    def test_buffered(self):
+        fd = StringIO()
+        writer = XMLWriter(fd, bufsize=200)
+        writer.push(u"x12err")
+        writer.elem(u"desc", u"a")
+        self.assertEqual(fd.getvalue(), '')
+        writer.flush()
+        self.assertEqual(fd.getvalue(), '<?xml version="1.0" encoding="utf-8"?>\n'
+                         '<x12err>\n  <desc>a</desc>\n')
+        for i in range(20):
+            writer.elem(u"desc", u"%i" % (i))
+        self.assertTrue(len(fd.getvalue()) > 200)
+        writer.pop()
+        self.assertTrue(fd.getvalue().endswith('  <desc>19</desc>\n</x12err>\n'))
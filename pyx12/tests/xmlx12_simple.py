@@ -87,6 +87,40 @@ class Test835(XmlTransformTestCase):
         self._test_x12xml_simple('835id')
 
 
+class Streaming(XmlTransformTestCase):
+    def test_segments(self):
+        fd_xml = self._makeFd("""<?xml version="1.0" encoding="utf-8"?>
+<x12simple>
+  <loop id="2300">
+    <seg id="CLM">
+      <ele id="CLM01">3215338</ele>
+      <ele id="CLM02">21</ele>
+      <comp id="CLM">
+        <subele id="CLM05-1">12</subele>
+        <subele id="CLM05-3">1</subele>
+      </comp>
+      <ele id="CLM06"></ele>
+      <ele id="CLM07">A</ele>
+    </seg>
+    <loop id="2400">
+      <seg id="LX">
+        <ele id="LX01">1</ele>
+      </seg>
+    </loop>
+  </loop>
+  <loop id="2300">
+    <seg id="CLM">
+      <ele id="CLM01">5555</ele>
+    </seg>
+  </loop>
+</x12simple>
+""")
+        fd_result = StringIO()
+        self.assertTrue(pyx12.xmlx12_simple.convert(fd_xml, fd_result))
+        self.assertEqual(fd_result.getvalue(),
+                         'CLM*3215338*21***12::1**A~\nLX*1~\nCLM*5555~\n')
+
+
 #class ExplicitMissing(XmlTransformTestCase):
 #    def test_837miss(self):
 #        self._test_x12xml_simple('837miss')
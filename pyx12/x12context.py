@@ -22,8 +22,13 @@ Interface to read and alter segments
 #import os
 #import os.path
 
+import collections
+import multiprocessing
+
 # Intrapackage imports
 import pyx12
+import pyx12.params
+import pyx12.segment
 import error_handler
 import errors
 import map_index
@@ -48,18 +53,25 @@ class X12DataNode(object):
         self.parent = None
         self.children = []
         self.errors = []
+        self._child_index = None
+        # Copy of the children list the index was built from
+        self._child_snapshot = None
+        self._deleted_ct = 0
 
     #{ Public Methods
     def delete(self):
         """
         Delete this node.  Mark type as deleted.
         """
+        if self.parent is not None:
+            self.parent._deleted_ct += 1
         self.x12_map_node = None
         self.type = None
         self.seg_data = None
         self.parent = None
         self.children = []
         self.errors = []
+        self._child_index = None
 
     def iterate_segments(self):
         """
@@ -136,10 +148,9 @@ class X12DataNode(object):
         @return: The matching sub-node, relative to the instance.
         @rtype: L{node<x12context.X12DataNode>}
         """
-        if not self.exists(x12_path_str):
-            return None
         for node in self.select(x12_path_str):
             return node
+        return None
 
     def count(self, x12_path_str):
         """
@@ -162,20 +173,54 @@ class X12DataNode(object):
         Remove deleted nodes
         """
         self.children = [x for x in self.children if x.type is not None]
+        self._reset_child_index()
+        self._deleted_ct = 0
+
+    def _get_child_index(self):
+        """
+        Get the child nodes keyed by node id, in order
+
+        The index is rebuilt when the children list is not the same nodes, in
+        the same order, as when it was built, or when half the children have
+        been deleted.  The check is a list comparison, so any change of
+        self.children is seen.  Deleted
+        nodes are compacted out then.  Nodes deleted after that remain in the
+        index until the next rebuild, so callers must skip nodes with a type
+        of None.
+
+        @return: {id: [child nodes]}
+        @rtype: dict
+        """
+        if self._child_index is None or self._child_snapshot != self.children \
+                or self._deleted_ct * 2 >= len(self.children) > 0:
+            live = [x for x in self.children if x.type is not None]
+            if len(live) != len(self.children):
+                self.children = live
+            self._deleted_ct = 0
+            index = {}
+            for child in live:
+                index.setdefault(child.x12_map_node.id, []).append(child)
+            self._child_index = index
+            self._child_snapshot = list(self.children)
+        return self._child_index
+
+    def _reset_child_index(self):
+        """
+        Discard the child index
+        """
+        self._child_index = None
+        self._child_snapshot = None
 
     def _get_insert_idx(self, x12_node):
         """
         Find the index of self.children before which the x12_node belongs
         Nodes will be inserted after the last node with matching ordinals
         """
-        self._cleanup()
         map_idx = x12_node.pos
-        idx = None
-        for i in range(len(self.children)):
-            if self.children[i].x12_map_node.pos <= map_idx:
-                idx = i
-        if idx is not None:
-            return idx + 1
+        for i in range(len(self.children) - 1, -1, -1):
+            child = self.children[i]
+            if child.type is not None and child.x12_map_node.pos <= map_idx:
+                return i + 1
         return len(self.children)
 
     def _get_first_matching_segment(self, x12_path_str):
@@ -214,18 +259,17 @@ class X12DataNode(object):
             # Only segment left
             cur_node_id = x12path.seg_id
             qual = x12path.id_val
-            for child in [x for x in self.children if x.type is not None]:
+            for child in self._get_child_index().get(cur_node_id, []):
                 if child.type == 'seg':
                     if child.x12_map_node.is_match_qual(child.seg_data, cur_node_id, qual):
                         yield child
-                else:
-                    if child.id == cur_node_id:
-                        yield child
+                elif child.type is not None:
+                    yield child
         else:
             cur_node_id = x12path.loop_list[0]
             cur_loop_list = x12path.loop_list[1:]
-            for child in [x for x in self.children if x.type is not None]:
-                if child.id == cur_node_id:
+            for child in self._get_child_index().get(cur_node_id, []):
+                if child.type is not None:
                     if len(cur_loop_list) == 0 and x12path.seg_id is None:
                         yield child
                     else:
@@ -279,6 +323,10 @@ class X12LoopDataNode(X12DataNode):
         self.children = []
         self.errors = []
         self.end_loops = end_loops  # we might need to close a preceeding loop
+        self._child_index = None
+        # Copy of the children list the index was built from
+        self._child_snapshot = None
+        self._deleted_ct = 0
 
     #{ Public Methods
     def delete(self):
@@ -319,14 +367,14 @@ class X12LoopDataNode(X12DataNode):
         @type val: string
         """
         (curr, new_path) = self._get_start_node(x12_path_str)
-        seg_data = curr._get_first_matching_segment(new_path)
-        if seg_data is None:
+        seg_node = curr._get_first_matching_seg_node(new_path)
+        if seg_node is None:
             raise errors.X12PathError('X12 Path is invalid or was not found: %s' % (x12_path_str))
         xpath = path.X12Path(new_path)
         xpath.loop_list = []
         xpath.id_val = None
         seg_part = xpath.format()
-        seg_data.set(seg_part, val)
+        seg_node._get_writable_segment().set(seg_part, val)
 
     def iterate_segments(self):
         """
@@ -366,8 +414,7 @@ class X12LoopDataNode(X12DataNode):
             raise errors.X12PathError('The segment %s is not a member of loop %s' %
                                       (seg_data.__repr__(), self.id))
         new_data_node = X12SegmentDataNode(x12_seg_node, seg_data, self)
-        child_idx = self._get_insert_idx(x12_seg_node)
-        self.children.insert(child_idx, new_data_node)
+        self._insert_child(new_data_node)
         return new_data_node
 
     def add_loop(self, seg_data):
@@ -404,8 +451,7 @@ class X12LoopDataNode(X12DataNode):
             raise errors.X12PathError('The loop_data_node "%s" is not a child of "%s"' %
                                       (data_node.x12_map_node.id, self.x12_map_node.id))
         data_node.parent = self
-        child_idx = self._get_insert_idx(data_node.x12_map_node)
-        self.children.insert(child_idx, data_node)
+        self._insert_child(data_node)
 
     def delete_segment(self, seg_data):
         """
@@ -427,10 +473,16 @@ class X12LoopDataNode(X12DataNode):
             #raise errors.X12PathError, 'The segment %s is not a member of loop %s' % \
             #    (seg_data.__repr__(), self.id)
         # Iterate over data nodes, except first
-        self._cleanup()
-        for i in range(1, len(self.children)):
-            if self.children[i].type == 'seg' and self.children[i].seg_data == seg_data:
+        first = True
+        for i in range(len(self.children)):
+            child = self.children[i]
+            if child.type is None:
+                continue
+            if first:
+                first = False
+            elif child.type == 'seg' and child.seg_data == seg_data:
                 del self.children[i]
+                self._reset_child_index()
                 return True
         return False
 
@@ -461,11 +513,33 @@ class X12LoopDataNode(X12DataNode):
         @rtype: L{node<x12context.X12LoopDataNode>}
         """
         new_node = X12LoopDataNode(x12_loop_node, parent=self)
-        # Iterate over data nodes
-        child_idx = self._get_insert_idx(x12_loop_node)
-        self.children.insert(child_idx, new_node)
+        self._insert_child(new_node)
         return new_node
 
+    def _insert_child(self, data_node):
+        """
+        Insert a child node in map order.  A current child index is updated
+        rather than rebuilt.  The id list is replaced, not changed in place, as
+        a running select may be iterating over it.
+        @param data_node: New child node
+        @type data_node : L{node<x12context.X12DataNode>}
+        """
+        index_ok = self._child_index is not None and self._child_snapshot == self.children
+        map_idx = data_node.x12_map_node.pos
+        insert_idx = self._get_insert_idx(data_node.x12_map_node)
+        self.children.insert(insert_idx, data_node)
+        if index_ok:
+            self._child_snapshot.insert(insert_idx, data_node)
+            id_nodes = self._child_index.get(data_node.x12_map_node.id, [])
+            i = len(id_nodes)
+            while i > 0 and (id_nodes[i - 1].type is None
+                             or id_nodes[i - 1].x12_map_node.pos > map_idx):
+                i -= 1
+            self._child_index[data_node.x12_map_node.id] = \
+                id_nodes[:i] + [data_node] + id_nodes[i:]
+        else:
+            self._reset_child_index()
+
     def _get_first_matching_segment(self, x12_path_str):
         """
         Get first found Segment at the given relative path.  If the path is not a
@@ -478,6 +552,21 @@ class X12LoopDataNode(X12DataNode):
         @rtype: L{node<segment.Segment>}
         @raise X12PathError: On blank or invalid path
         """
+        seg_node = self._get_first_matching_seg_node(x12_path_str)
+        if seg_node is None:
+            return None
+        return seg_node.seg_data
+
+    def _get_first_matching_seg_node(self, x12_path_str):
+        """
+        Get first found segment node at the given relative path.
+
+        @param x12_path_str: Relative X12 Path
+        @type x12_path_str: string
+        @return: First matching segment node
+        @rtype: L{node<x12context.X12SegmentDataNode>}
+        @raise X12PathError: On blank or invalid path
+        """
         if len(x12_path_str) == 0:
             raise errors.X12PathError('Blank X12 Path')
         (curr, new_path) = self._get_start_node(x12_path_str)
@@ -488,9 +577,9 @@ class X12LoopDataNode(X12DataNode):
             seg_id = xpath.seg_id
             qual = xpath.id_val
             try:
-                for seg in [seg for seg in curr.children if seg.type == 'seg']:
-                    if seg.x12_map_node.is_match_qual(seg.seg_data, seg_id, qual):
-                        return seg.seg_data
+                for seg in curr._get_child_index().get(seg_id, []):
+                    if seg.type == 'seg' and seg.x12_map_node.is_match_qual(seg.seg_data, seg_id, qual):
+                        return seg
                 return None
             except errors.EngineError as e:
                 raise errors.X12PathError('X12 Path is invalid or was not found: %s' % (x12_path_str))
@@ -498,9 +587,9 @@ class X12LoopDataNode(X12DataNode):
             next_id = xpath.loop_list[0]
             del xpath.loop_list[0]
             try:
-                for loop in [loop for loop in curr.children if loop.type == 'loop']:
-                    if loop.id == next_id:
-                        return loop._get_first_matching_segment(xpath.format())
+                for loop in curr._get_child_index().get(next_id, []):
+                    if loop.type == 'loop':
+                        return loop._get_first_matching_seg_node(xpath.format())
                 return None
             except errors.EngineError as e:
                 raise errors.X12PathError('X12 Path is invalid or was not found: %s' % (x12_path_str))
@@ -528,19 +617,60 @@ class X12LoopDataNode(X12DataNode):
                 return (child.seg_data.seg_term, child.seg_data.ele_term, child.seg_data.subele_term)
         return self.parent._get_terminators()
 
-    def copy(self):
-        return self.__copy__()
+    def copy(self, cow=False):
+        """
+        Returns a copy of this node and its sub-nodes.  The copied sub-nodes
+        have the new loop node as their parent.
+
+        @param cow: If True, the copied segment nodes share Segment data with
+            this tree until changed with set_value.  Changes made directly to
+            the seg_data of either tree are seen by both.
+        @type cow: boolean
+        @rtype: L{node<x12context.X12LoopDataNode>}
+        """
+        ret = X12LoopDataNode(self.x12_map_node, list(self.end_loops), self.parent)
+        for child in self.children:
+            if child.type is None:
+                continue
+            new_child = child.copy(cow)
+            new_child.parent = ret
+            ret.children.append(new_child)
+        return ret
 
     def __copy__(self):
         """
         Returns a copy of this node
         """
-        ret = X12LoopDataNode(self.x12_map_node)
-        ret.end_loops = list(self.end_loops)
-        ret.parent = self.parent
-        for child in self.children:
-            ret.children.append(child.copy())
-        return ret
+        return self.copy()
+
+
+class X12LoopContextNode(X12LoopDataNode):
+    """
+    Read-only ancestor loop of a streamed loop tree
+    Holds the loop segments and the completed sibling loops
+    """
+
+    #{ Public Methods
+    def delete(self):
+        raise errors.EngineError('Context loop %s is read-only' % (self.id))
+
+    def set_value(self, x12_path_str, val):
+        raise errors.EngineError('Context loop %s is read-only' % (self.id))
+
+    def add_segment(self, seg_data):
+        raise errors.EngineError('Context loop %s is read-only' % (self.id))
+
+    def add_loop(self, seg_data):
+        raise errors.EngineError('Context loop %s is read-only' % (self.id))
+
+    def add_node(self, data_node):
+        raise errors.EngineError('Context loop %s is read-only' % (self.id))
+
+    def delete_segment(self, seg_data):
+        raise errors.EngineError('Context loop %s is read-only' % (self.id))
+
+    def delete_node(self, x12_path_str):
+        raise errors.EngineError('Context loop %s is read-only' % (self.id))
 
 
 class X12SegmentDataNode(X12DataNode):
@@ -557,6 +687,7 @@ class X12SegmentDataNode(X12DataNode):
         self.parent = parent
         self.start_loops = start_loops
         self.end_loops = end_loops
+        self._seg_shared = False
         self.errors = []
         self.err_isa = []
         self.err_gs = []
@@ -609,6 +740,8 @@ class X12SegmentDataNode(X12DataNode):
         seg_data = self._get_first_matching_segment(x12_path_str)
         if seg_data is None:
             raise errors.X12PathError('X12 Path is invalid or was not found: %s' % (x12_path_str))
+        if seg_data is self.seg_data:
+            seg_data = self._get_writable_segment()
         #ele_idx = self.get_ele_idx(x12_path_str)
         #seg_data.set(ele_idx, val)
         seg_data.set(x12_path_str, val)
@@ -684,18 +817,41 @@ class X12SegmentDataNode(X12DataNode):
         yield {'type': 'seg', 'id': self.id, 'segment': self.seg_data,
                'start_loops': self.start_loops, 'end_loops': self.end_loops}
 
-    def copy(self):
-        return self.__copy__()
+    def copy(self, cow=False):
+        """
+        Returns a copy of this node
+
+        @param cow: If True, share the Segment data with this node until either
+            is changed with set_value.  Changes made directly to seg_data are
+            seen by both nodes.
+        @type cow: boolean
+        @rtype: L{node<x12context.X12SegmentDataNode>}
+        """
+        if cow:
+            seg_data = self.seg_data
+            self._seg_shared = True
+        else:
+            seg_data = self.seg_data.copy()
+        ret = X12SegmentDataNode(self.x12_map_node, seg_data, self.parent,
+                                 list(self.start_loops), list(self.end_loops))
+        ret._seg_shared = cow
+        return ret
 
     def __copy__(self):
         """
         Returns a copy of this node
         """
-        seg_data = self.seg_data.copy()
-        ret = X12SegmentDataNode(self.x12_map_node, seg_data, self.parent)
-        ret.start_loops = list(self.start_loops)
-        ret.end_loops = list(self.end_loops)
-        return ret
+        return self.copy()
+
+    def _get_writable_segment(self):
+        """
+        Get the Segment data for modification.  Shared data is copied first.
+        @rtype: L{node<segment.Segment>}
+        """
+        if self._seg_shared:
+            self.seg_data = self.seg_data.copy()
+            self._seg_shared = False
+        return self.seg_data
 
     def select(self, x12_path_str):
         """
@@ -725,6 +881,66 @@ class X12SegmentDataNode(X12DataNode):
         return len(self.err_isa) + len(self.err_gs) + len(self.err_st) + len(self.err_seg) + len(self.err_ele)
 
 
+def serialize_tree(loop_node):
+    """
+    Get a compact, picklable form of a loop tree
+
+    Loops are (map path, [children]) and segments are (map path, segment
+    string).  Deleted nodes are skipped.
+
+    @param loop_node: Loop tree
+    @type loop_node: L{node<x12context.X12LoopDataNode>}
+    @return: (map_file, (seg_term, ele_term, subele_term), tree)
+    @rtype: tuple
+    """
+    (seg_term, ele_term, subele_term) = loop_node._get_terminators()
+
+    def _dump(node):
+        if node.type == 'seg':
+            return (node.x12_map_node.get_path(),
+                    node.seg_data.format(seg_term, ele_term, subele_term))
+        return (node.x12_map_node.get_path(),
+                [_dump(x) for x in node.children if x.type is not None])
+    map_file = loop_node.x12_map_node.root.map_file
+    return (map_file, (seg_term, ele_term, subele_term), _dump(loop_node))
+
+
+def deserialize_tree(tree_data, param, maps=None):
+    """
+    Rebuild a loop tree from the form created by L{serialize_tree}
+
+    @param tree_data: Serialized tree
+    @type tree_data: tuple
+    @param param: pyx12.param instance
+    @param maps: Optional cache of {map_file: (map, {path: map node})}
+    @type maps: dict
+    @return: Loop tree, with no parent
+    @rtype: L{node<x12context.X12LoopDataNode>}
+    """
+    (map_file, (seg_term, ele_term, subele_term), tree) = tree_data
+    if maps is None:
+        maps = {}
+    if map_file not in maps:
+        maps[map_file] = (map_if.load_map_file(map_file, param), {})
+    (cur_map, x12_nodes) = maps[map_file]
+
+    def _get_node(x12_path):
+        if x12_path not in x12_nodes:
+            x12_nodes[x12_path] = cur_map.getnodebypath(x12_path)
+        return x12_nodes[x12_path]
+
+    def _load(node_data, parent):
+        (x12_path, contents) = node_data
+        if isinstance(contents, list):
+            loop_node = X12LoopDataNode(_get_node(x12_path), parent=parent)
+            for child_data in contents:
+                loop_node.children.append(_load(child_data, loop_node))
+            return loop_node
+        seg_data = pyx12.segment.Segment(contents, seg_term, ele_term, subele_term)
+        return X12SegmentDataNode(_get_node(x12_path), seg_data, parent)
+    return _load(tree, None)
+
+
 class X12ContextReader(object):
     """
     Read an X12 input stream
@@ -755,16 +971,165 @@ class X12ContextReader(object):
         self.map_index_if = map_index.map_index()
         self.x12_map_node = self.control_map.getnodebypath('/ISA_LOOP/ISA')
         self.walker = walk_tree()
+        self._child_loop_cache = {}
 
     #{ Public Methods
-    def iter_segments(self, loop_id=None):
+    def iter_segments(self, loop_id=None, stream=False):
         """
         Simple segment or tree iterator
+
+        In stream mode, each requested loop is yielded as soon as it is
+        complete.  Its parent is a read-only context of the enclosing loops,
+        holding only their own segments and completed sibling loops.  Yielded
+        trees are not retained by the reader, so memory is bounded by the
+        size of one requested loop rather than its enclosing loops.
+
+        @param loop_id: Loop identifier of the trees to yield - 2300
+        @type loop_id: string
+        @param stream: Yield requested loops with a read-only ancestor context
+        @type stream: boolean
         @return: X12 Data Node - simple segment or tree
         @rtype: L{node<x12context.X12DataNode>}
         """
+        if stream:
+            if loop_id is None:
+                raise errors.EngineError('Stream mode requires a loop_id')
+            for node in self._iter_segments_stream(loop_id):
+                yield node
+            return
         cur_tree = None
         cur_data_node = None
+        for (seg, errh, pop_loops, push_loops) in self._iter_walk():
+            node_x12path = self.x12_map_node.x12path
+            # If we are in the requested tree, wait until we have the whole thing
+            if loop_id is not None and loop_id in node_x12path.loop_list:
+                #pdb.set_trace()
+                # Are we at the start of the requested tree?
+                if node_x12path.loop_list[-1] == loop_id and \
+                        self.x12_map_node.is_first_seg_in_loop():
+                    if cur_tree is not None:
+                        # Found root loop repeat. Yield existing, create new tree
+                        yield cur_tree
+                    # Make new tree on parent loop
+                    #pop_loops = get_pop_loops(cur_data_node.x12_map_node, self.x12_map_node)
+                    #pop_loops = [x12_node for x12_node in pop_loops if x12_node.get_path().find(loop_id) == -1]
+                    cur_tree = X12LoopDataNode(x12_node=self.x12_map_node.parent, end_loops=pop_loops)  # parent=cur_data_node)
+                    cur_data_node = self._add_segment(cur_tree, self.x12_map_node, seg, pop_loops, push_loops)
+                else:
+                    if cur_data_node is None or self.x12_map_node is None:
+                        raise errors.EngineError('Either cur_data_node or self.x12_map_node is None')
+                    cur_data_node = self._add_segment(cur_data_node, self.x12_map_node, seg, pop_loops, push_loops)
+            else:
+                if cur_tree is not None:
+                    # We have completed a tree
+                    yield cur_tree
+                    cur_tree = None
+                if cur_data_node is not None:
+                    #push_loops = get_push_loops(cur_data_node.x12_map_node, self.x12_map_node)
+                    #pop_loops = get_pop_loops(cur_data_node.x12_map_node, self.x12_map_node)
+                    if loop_id:
+                        pop_loops = [x12_node for x12_node in pop_loops if x12_node.get_path().find(loop_id) == -1]
+                    assert loop_id not in [x12.id for x12 in push_loops], 'Loop ID %s should not be in push loops' % (loop_id)
+                    assert loop_id not in [x12.id for x12 in pop_loops], 'Loop ID %s should not be in pop loops' % (loop_id)
+                    cur_data_node = X12SegmentDataNode(self.x12_map_node,
+                                                       seg, push_loops, pop_loops)
+                else:
+                    cur_data_node = X12SegmentDataNode(self.x12_map_node, seg)
+                # Get errors caught by x12Reader
+                errh.handle_errors(self.src.pop_errors())
+                # Handle errors captured in errh_list
+                cur_data_node.handle_errh_errors(errh)
+                if cur_data_node.id != 'ISA' and cur_data_node is not None:
+                    assert cur_data_node.parent is not None, 'Node "%s" has no parent' % (cur_data_node.id)
+                yield cur_data_node
+
+    def iter_pipeline(self, loop_id, func, processes=None, max_pending=None):
+        """
+        Parse and walk the source in this process.  Run func on each
+        requested loop tree in a pool of worker processes.
+
+        Each tree yielded by iter_segments(loop_id) having the requested
+        loop_id is serialized and rebuilt in a worker without a parent.
+        At most max_pending trees are in flight, so parsing does not run
+        ahead of slow workers.
+
+        @param loop_id: Loop identifier of the trees to process - 2300
+        @type loop_id: string
+        @param func: Picklable function taking an X12LoopDataNode
+        @param processes: Number of worker processes.  Defaults to cpu count
+        @type processes: int
+        @param max_pending: Most trees queued or in progress.  Defaults to
+            four per worker
+        @type max_pending: int
+        @return: Iterator of func results, in input order
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        if max_pending is None:
+            max_pending = processes * 4
+        pool = multiprocessing.Pool(processes, _pipeline_init,
+                                    (dict(self.param.params),))
+        pending = collections.deque()
+        try:
+            for node in self.iter_segments(loop_id, stream=True):
+                if node.type != 'loop' or node.id != loop_id:
+                    continue
+                tree_data = serialize_tree(node)
+                if len(pending) >= max_pending:
+                    yield pending.popleft().get()
+                pending.append(pool.apply_async(_pipeline_run,
+                                                (func, tree_data)))
+            while pending:
+                yield pending.popleft().get()
+        except:
+            pool.terminate()
+            pool.join()
+            raise
+        pool.close()
+        pool.join()
+
+    def register_error_callback(self, callback, err_type):
+        """
+        Future:  Callbacks for X12 validation errors
+        """
+        pass
+
+    #{ Property Accessors
+    @property
+    def seg_term(self):
+        """
+        @return: Current X12 segment terminator
+        @rtype: string
+        """
+        return self.src.seg_term
+
+    @property
+    def ele_term(self):
+        """
+        @return: Current X12 element terminator
+        @rtype: string
+        """
+        return self.src.ele_term
+
+    @property
+    def subele_term(self):
+        """
+        @return: Current X12 sub-element terminator
+        @rtype: string
+        """
+        return self.src.subele_term
+
+    #{ Private Methods
+    def _iter_walk(self):
+        """
+        Walk the source segments, tracking the current map node and
+        loading the transaction map as the envelope changes
+
+        @return: Iterator of (segment, segment errors, popped loops, pushed loops)
+        @rtype: (L{node<segment.Segment>}, L{error_handler.errh_list},
+            [L{node<map_if.loop_if>}], [L{node<map_if.loop_if>}])
+        """
+        icvn = fic = vriic = tspc = None
         for seg in self.src:
             #find node
             orig_node = self.x12_map_node
@@ -837,81 +1202,99 @@ class X12ContextReader(object):
                             tpath = '/ISA_LOOP/GS_LOOP/ST_LOOP/HEADER/BHT'
                             self.x12_map_node = cur_map.getnodebypath(tpath)
 
-            node_x12path = self.x12_map_node.x12path
-            # If we are in the requested tree, wait until we have the whole thing
-            if loop_id is not None and loop_id in node_x12path.loop_list:
-                #pdb.set_trace()
-                # Are we at the start of the requested tree?
-                if node_x12path.loop_list[-1] == loop_id and \
-                        self.x12_map_node.is_first_seg_in_loop():
-                    if cur_tree is not None:
-                        # Found root loop repeat. Yield existing, create new tree
-                        yield cur_tree
-                    # Make new tree on parent loop
-                    #pop_loops = get_pop_loops(cur_data_node.x12_map_node, self.x12_map_node)
-                    #pop_loops = [x12_node for x12_node in pop_loops if x12_node.get_path().find(loop_id) == -1]
-                    cur_tree = X12LoopDataNode(x12_node=self.x12_map_node.parent, end_loops=pop_loops)  # parent=cur_data_node)
-                    cur_data_node = self._add_segment(cur_tree, self.x12_map_node, seg, pop_loops, push_loops)
-                else:
-                    if cur_data_node is None or self.x12_map_node is None:
-                        raise errors.EngineError('Either cur_data_node or self.x12_map_node is None')
-                    cur_data_node = self._add_segment(cur_data_node, self.x12_map_node, seg, pop_loops, push_loops)
-            else:
-                if cur_tree is not None:
-                    # We have completed a tree
-                    yield cur_tree
-                    cur_tree = None
-                if cur_data_node is not None:
-                    #push_loops = get_push_loops(cur_data_node.x12_map_node, self.x12_map_node)
-                    #pop_loops = get_pop_loops(cur_data_node.x12_map_node, self.x12_map_node)
-                    if loop_id:
-                        pop_loops = [x12_node for x12_node in pop_loops if x12_node.get_path().find(loop_id) == -1]
-                    assert loop_id not in [x12.id for x12 in push_loops], 'Loop ID %s should not be in push loops' % (loop_id)
-                    assert loop_id not in [x12.id for x12 in pop_loops], 'Loop ID %s should not be in pop loops' % (loop_id)
-                    cur_data_node = X12SegmentDataNode(self.x12_map_node,
-                                                       seg, push_loops, pop_loops)
-                else:
-                    cur_data_node = X12SegmentDataNode(self.x12_map_node, seg)
-                # Get errors caught by x12Reader
-                errh.handle_errors(self.src.pop_errors())
-                # Handle errors captured in errh_list
-                cur_data_node.handle_errh_errors(errh)
-                if cur_data_node.id != 'ISA' and cur_data_node is not None:
-                    assert cur_data_node.parent is not None, 'Node "%s" has no parent' % (cur_data_node.id)
-                yield cur_data_node
-
-    def register_error_callback(self, callback, err_type):
-        """
-        Future:  Callbacks for X12 validation errors
-        """
-        pass
-
-    #{ Property Accessors
-    @property
-    def seg_term(self):
-        """
-        @return: Current X12 segment terminator
-        @rtype: string
-        """
-        return self.src.seg_term
+            yield (seg, errh, pop_loops, push_loops)
 
-    @property
-    def ele_term(self):
-        """
-        @return: Current X12 element terminator
-        @rtype: string
+    def _iter_segments_stream(self, loop_id):
         """
-        return self.src.ele_term
+        Stream mode segment or tree iterator.  See L{iter_segments}
 
-    @property
-    def subele_term(self):
-        """
-        @return: Current X12 sub-element terminator
-        @rtype: string
+        @param loop_id: Loop identifier of the trees to yield
+        @type loop_id: string
+        @return: X12 Data Node - simple segment or tree
+        @rtype: L{node<x12context.X12DataNode>}
         """
-        return self.src.subele_term
+        loop_stack = []  # Open loop data nodes, outermost first
+        cur_tree = None
+        for (seg, errh, pop_loops, push_loops) in self._iter_walk():
+            seg_x12_node = self.x12_map_node
+            x12_loops = self._get_parent_loops(seg_x12_node)
+            # Find the deepest open loop still enclosing this segment
+            idx = 0
+            while idx < len(loop_stack) and idx < len(x12_loops) \
+                    and loop_stack[idx].id == x12_loops[idx].id:
+                idx += 1
+            if idx > 0 and idx == len(x12_loops) and seg_x12_node.is_first_seg_in_loop():
+                idx -= 1  # Repeat of the innermost loop
+            end_loops = []
+            while len(loop_stack) > idx:
+                data_node = loop_stack.pop()
+                end_loops.append(data_node.x12_map_node)
+                if data_node is cur_tree:
+                    # Requested tree is complete. It was never attached to the context.
+                    yield cur_tree
+                    cur_tree = None
+                elif cur_tree is None and data_node.parent is not None \
+                        and self._has_child_loop(data_node.x12_map_node, loop_id):
+                    # Release closed context loops that held requested trees
+                    data_node.parent.children.remove(data_node)
+                    data_node.parent._reset_child_index()
+            start_loops = []
+            for x12_loop in x12_loops[idx:]:
+                parent = loop_stack[-1] if loop_stack else None
+                if cur_tree is None and x12_loop.id == loop_id:
+                    data_node = X12LoopDataNode(x12_loop, parent=parent)
+                    cur_tree = data_node
+                elif cur_tree is None:
+                    data_node = X12LoopContextNode(x12_loop, parent=parent)
+                    start_loops.append(x12_loop)
+                else:
+                    data_node = X12LoopDataNode(x12_loop, parent=parent)
+                if parent is not None and data_node is not cur_tree:
+                    parent.children.append(data_node)
+                loop_stack.append(data_node)
+            parent = loop_stack[-1] if loop_stack else None
+            if cur_tree is None:
+                seg_data_node = X12SegmentDataNode(seg_x12_node, seg, parent,
+                                                   start_loops, end_loops)
+            else:
+                seg_data_node = X12SegmentDataNode(seg_x12_node, seg, parent)
+            if parent is not None:
+                parent.children.append(seg_data_node)
+            # Get errors caught by x12Reader
+            errh.handle_errors(self.src.pop_errors())
+            seg_data_node.handle_errh_errors(errh)
+            if cur_tree is None:
+                yield seg_data_node
+        if cur_tree is not None:
+            yield cur_tree
+
+    def _get_parent_loops(self, x12_node):
+        """
+        @return: The enclosing loop map nodes, outermost first
+        @rtype: [L{node<map_if.loop_if>}]
+        """
+        x12_loops = []
+        x12_loop = pop_to_parent_loop(x12_node)
+        while not x12_loop.is_map_root():
+            x12_loops.insert(0, x12_loop)
+            x12_loop = pop_to_parent_loop(x12_loop)
+        return x12_loops
+
+    def _has_child_loop(self, x12_loop, loop_id):
+        """
+        Can the map loop contain a descendant loop with the given id?
+        """
+        key = (x12_loop.get_path(), loop_id)
+        if key not in self._child_loop_cache:
+            found = False
+            for x12_node in x12_loop.loop_segment_iterator():
+                if x12_node is not x12_loop and x12_node.is_loop() \
+                        and x12_node.id == loop_id:
+                    found = True
+                    break
+            self._child_loop_cache[key] = found
+        return self._child_loop_cache[key]
 
-    #{ Private Methods
     def _add_segment(self, cur_data_node, segment_x12_node, seg_data, pop_loops, push_loops):
         """
         From the last position in the X12 Data Node Tree, find the correct
@@ -994,3 +1377,24 @@ class X12ContextReader(object):
         cur_map.getnodebypath('/ISA_LOOP/GS_LOOP').reset_cur_count()
         cur_map.getnodebypath('/ISA_LOOP/GS_LOOP').set_cur_count(1)
         cur_map.getnodebypath('/ISA_LOOP/GS_LOOP/GS').set_cur_count(1)
+
+
+_pipeline_param = None
+_pipeline_maps = {}
+
+
+def _pipeline_init(param_dict):
+    """
+    Pipeline worker process initializer
+    """
+    global _pipeline_param
+    _pipeline_param = pyx12.params.ParamsBase()
+    _pipeline_param.params = param_dict
+
+
+def _pipeline_run(func, tree_data):
+    """
+    Rebuild the tree in a pipeline worker and apply func.  Maps are kept
+    for the life of the worker.
+    """
+    return func(deserialize_tree(tree_data, _pipeline_param, _pipeline_maps))
@@ -0,0 +1,269 @@
+######################################################################
+# Copyright (c) Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Extract flat rows of element values from an X12 document
+
+An extract spec names a row loop and a list of columns.  One row is created
+for each instance of the row loop.  Each column is a query path, see
+L{x12query}, ending with an element.
+
+A column path is found in the row loop, or failing that in the nearest
+enclosing loop where it matches.  With a 2300 row loop, 2300/CLM01 is the
+claim id and 2010BA/NM109 is the subscriber id from the enclosing 2000B loop.
+
+A missing or invalid value is None in a row and an empty field in CSV
+output.  The arrays of int and float columns in a column store can not hold
+None, so there a missing value is 0 or nan.
+
+Spec files have one entry per line.  Blank lines and lines starting with #
+are ignored::
+
+    loop 2300
+    claim_id 2300/CLM01
+    charge 2300/CLM02 float
+    member_id 2010BA/NM109
+"""
+
+import array
+import collections
+import csv
+import logging
+
+# Intrapackage imports
+import pyx12.error_handler
+import pyx12.x12context
+import pyx12.x12query
+from pyx12.errors import X12PathError, EngineError
+
+logger = logging.getLogger('pyx12.x12extract')
+
+# Column type: (array typecode or None for a list, conversion, missing value
+# in a column store).  A missing int is 0, so is not told apart from a zero.
+COLUMN_TYPES = {
+    'str': (None, str, None),
+    'int': ('l', int, 0),
+    'float': ('d', float, float('nan')),
+}
+
+
+class Column(object):
+    """
+    A named element value of the row loop
+    """
+
+    def __init__(self, name, path_str, col_type='str'):
+        """
+        @param name: Column name
+        @type name: string
+        @param path_str: Query path ending with an element - 2300/CLM01
+        @type path_str: string
+        @param col_type: str, int or float
+        @type col_type: string
+        @raise X12PathError: On an invalid path, or one without an element
+        @raise EngineError: On an unknown column type
+        """
+        if col_type not in COLUMN_TYPES:
+            raise EngineError('Unknown type "%s" for column %s' % (col_type, name))
+        self.name = name
+        self.path_str = path_str
+        self.col_type = col_type
+        (self.typecode, self.convert, self.missing) = COLUMN_TYPES[col_type]
+        self.query = pyx12.x12query.compile_path(path_str)
+        if self.query.ele_idx is None:
+            raise X12PathError('Column %s path "%s" does not end with an element'
+                               % (name, path_str))
+        # The path relative to a loop named by its first step
+        self.first_id = None
+        self.rest_query = None
+        if self.query.parent_ct == 0 and len(self.query.steps) > 1 \
+                and not self.query.steps[0].descendant \
+                and not self.query.steps[0].preds:
+            self.first_id = self.query.steps[0].node_id
+            self.rest_query = pyx12.x12query.compile_path(
+                path_str[len(self.query.steps[0].step_str) + 1:])
+
+    def get_value(self, loop_node):
+        """
+        Find the value in the row loop or the nearest enclosing loop
+
+        @param loop_node: Row loop
+        @type loop_node: L{node<x12context.X12LoopDataNode>}
+        @return: The converted value, or None if missing or invalid
+        """
+        val = self.get_text(loop_node)
+        if val is None:
+            return None
+        return self.convert(val)
+
+    def get_text(self, loop_node):
+        """
+        Find the source text of the value in the row loop or the nearest
+        enclosing loop
+
+        @param loop_node: Row loop
+        @type loop_node: L{node<x12context.X12LoopDataNode>}
+        @return: The element value, or None if missing or not valid for the
+            column type
+        @rtype: string
+        """
+        val = None
+        node = loop_node
+        while node is not None:
+            if node.id == self.first_id:
+                # The loop named by the path, do not look further out
+                val = self.rest_query.get_value(node)
+                break
+            val = self.query.get_value(node)
+            if val is not None:
+                break
+            node = node.parent
+        if val is None or val == '':
+            return None
+        try:
+            self.convert(val)
+        except ValueError:
+            logger.warning('Column %s value "%s" is not a valid %s'
+                           % (self.name, val, self.col_type))
+            return None
+        return val
+
+    def __repr__(self):
+        """
+        @rtype: string
+        """
+        return '%s %s %s' % (self.name, self.path_str, self.col_type)
+
+
+class Extractor(object):
+    """
+    Stream rows of column values from X12 documents
+    """
+
+    def __init__(self, loop_id, columns):
+        """
+        @param loop_id: Row loop id - ST_LOOP, 2300, 2400
+        @type loop_id: string
+        @param columns: Column instances or (name, path) or (name, path, type)
+            tuples
+        @type columns: list
+        """
+        self.loop_id = loop_id
+        self.columns = []
+        for col in columns:
+            if not isinstance(col, Column):
+                col = Column(*col)
+            self.columns.append(col)
+        if len(self.columns) == 0:
+            raise EngineError('Extract has no columns')
+
+    #{ Public Methods
+    def get_names(self):
+        """
+        @return: Column names
+        @rtype: list[string]
+        """
+        return [col.name for col in self.columns]
+
+    def iter_rows(self, param, src_file, errh=None, text=False):
+        """
+        Iterate over the rows of a source document
+
+        @param param: pyx12.param instance
+        @param src_file: Source document
+        @type src_file: string or file object
+        @param errh: Error handler.  Defaults to ignoring errors
+        @param text: Yield the source text of the values, not converted
+        @type text: boolean
+        @return: Iterator of row tuples, None for a missing value
+        @rtype: tuple
+        """
+        if errh is None:
+            errh = pyx12.error_handler.errh_null()
+        src = pyx12.x12context.X12ContextReader(param, errh, src_file)
+        if text:
+            getters = [col.get_text for col in self.columns]
+        else:
+            getters = [col.get_value for col in self.columns]
+        for node in src.iter_segments(self.loop_id, stream=True):
+            if node.type != 'loop' or node.id != self.loop_id:
+                continue
+            yield tuple([get(node) for get in getters])
+
+    def to_csv(self, param, src_file, fd_out, errh=None, header=True):
+        """
+        Write the rows as CSV.  Values are written as in the source, a
+        missing or invalid value is an empty field.
+
+        @param fd_out: Output file
+        @type fd_out: file descriptor
+        @param header: Write a row of column names first
+        @type header: boolean
+        @return: Count of rows written, not counting the header
+        @rtype: int
+        """
+        writer = csv.writer(fd_out)
+        if header:
+            writer.writerow(self.get_names())
+        ct = 0
+        for row in self.iter_rows(param, src_file, errh, text=True):
+            writer.writerow(['' if val is None else val for val in row])
+            ct += 1
+        return ct
+
+    def to_columns(self, param, src_file, errh=None):
+        """
+        Collect the rows into a column store.  int and float columns are
+        arrays, with 0 or nan for missing values.  str columns are lists,
+        with None for missing values.
+
+        @return: {column name: values}
+        @rtype: collections.OrderedDict
+        """
+        store = collections.OrderedDict()
+        appends = []
+        for col in self.columns:
+            if col.typecode is None:
+                store[col.name] = []
+            else:
+                store[col.name] = array.array(col.typecode)
+            appends.append((store[col.name].append, col.missing))
+        for row in self.iter_rows(param, src_file, errh):
+            for ((append, missing), val) in zip(appends, row):
+                append(missing if val is None else val)
+        return store
+
+
+def read_spec(fd):
+    """
+    Create an Extractor from a spec file
+
+    @param fd: Spec file
+    @type fd: file descriptor
+    @rtype: L{Extractor}
+    @raise EngineError: On a missing loop line or invalid column line
+    """
+    loop_id = None
+    columns = []
+    for line in fd:
+        parts = line.split()
+        if len(parts) == 0 or parts[0][0] == '#':
+            continue
+        if parts[0] == 'loop':
+            if len(parts) != 2:
+                raise EngineError('Invalid spec line: %s' % (line.strip()))
+            loop_id = parts[1]
+        elif len(parts) in (2, 3):
+            columns.append(Column(*parts))
+        else:
+            raise EngineError('Invalid spec line: %s' % (line.strip()))
+    if loop_id is None:
+        raise EngineError('Extract spec has no loop line')
+    return Extractor(loop_id, columns)
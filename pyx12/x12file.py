@@ -21,6 +21,7 @@ Interface to an X12 data stream.
 import codecs
 import sys
 import logging
+import time
 
 # Intrapackage imports
 import pyx12.errors
@@ -331,6 +332,8 @@ class X12Reader(X12Base):
         self.subele_term = subele_term
         self.repetition_term = repetition_term
         self.icvn = self.raw.icvn
+        # Optional pyx12.stats.StageStats
+        self.stats = None
 
     def __del__(self):
         try:
@@ -396,19 +399,55 @@ class X12Reader(X12Base):
         """
         Iterate over input segments
         """
+        if self.stats is not None:
+            for seg_data in self._iter_timed():
+                yield seg_data
+            return
         self.err_list = []
         for line in self.raw:
-            # We have not yet incremented cur_line
-            if line[-1] == self.ele_term:
-                err_str = 'Segment contains trailing element terminators'
-                self._seg_error('SEG1', err_str, None,
-                                src_line=self.cur_line + 1)
-            seg_data = pyx12.segment.Segment(line,
-                                             self.seg_term, self.ele_term, self.subele_term)
-            self._parse_segment(seg_data)
-            yield(seg_data)
+            yield self._read_segment(line)
         #yield(None)
 
+    def _iter_timed(self):
+        """
+        Iterate over input segments, adding the tokenize and parse times to
+        self.stats
+        """
+        stats = self.stats
+        self.err_list = []
+        raw_iter = iter(self.raw)
+        while True:
+            start = time.time()
+            try:
+                line = next(raw_iter)
+            except StopIteration:
+                stats.add('tokenize', time.time() - start)
+                break
+            tokenized = time.time()
+            stats.add('tokenize', tokenized - start)
+            seg_data = self._read_segment(line)
+            stats.add('parse', time.time() - tokenized)
+            stats.seg_count += 1
+            yield(seg_data)
+
+    def _read_segment(self, line):
+        """
+        Create and check the Segment of an input segment string
+
+        @param line: Segment string
+        @type line: string
+        @rtype: L{segment<segment.Segment>}
+        """
+        # We have not yet incremented cur_line
+        if line[-1] == self.ele_term:
+            err_str = 'Segment contains trailing element terminators'
+            self._seg_error('SEG1', err_str, None,
+                            src_line=self.cur_line + 1)
+        seg_data = pyx12.segment.Segment(line,
+                                         self.seg_term, self.ele_term, self.subele_term)
+        self._parse_segment(seg_data)
+        return seg_data
+
     def get_errors(self):
         """
         Get Errors
@@ -0,0 +1,176 @@
+######################################################################
+# Copyright Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Create a newline delimited JSON rendering of the X12 document
+
+One JSON object is written per line for each transaction set, or for each
+instance of a selected loop, such as each 2300 claim.  The loop trees are
+read with the stream mode of X12ContextReader, so memory use is bounded by
+the size of one loop.
+"""
+
+import collections
+import json
+import logging
+
+# Intrapackage imports
+import pyx12.error_handler
+import pyx12.x12context
+
+logger = logging.getLogger('pyx12.x12json')
+
+# Envelope values added to each object - (loop id, element)
+ENVELOPE_ELEMENTS = (
+    ('ISA_LOOP', 'ISA06'),
+    ('ISA_LOOP', 'ISA08'),
+    ('ISA_LOOP', 'ISA13'),
+    ('GS_LOOP', 'GS01'),
+    ('GS_LOOP', 'GS06'),
+    ('GS_LOOP', 'GS08'),
+    ('ST_LOOP', 'ST01'),
+    ('ST_LOOP', 'ST02'),
+)
+
+
+def x12json(param, src_file, fd_out, loop_id='ST_LOOP', errh=None):
+    """
+    Write one JSON object per line for each instance of a loop
+
+    @param param: pyx12.param instance
+    @param src_file: Source document
+    @type src_file: string or file object
+    @param fd_out: Output file
+    @type fd_out: file descriptor
+    @param loop_id: Loop identifier of the objects - ST_LOOP, 2300
+    @type loop_id: string
+    @param errh: Error handler.  Defaults to ignoring errors
+    @return: Count of objects written
+    @rtype: int
+    """
+    if errh is None:
+        errh = pyx12.error_handler.errh_null()
+    src = pyx12.x12context.X12ContextReader(param, errh, src_file)
+    ct = 0
+    for node in src.iter_segments(loop_id, stream=True):
+        if node.type != 'loop' or node.id != loop_id:
+            continue
+        fd_out.write(json.dumps(loop_to_dict(node, envelope=True),
+                                separators=(',', ':')))
+        fd_out.write('\n')
+        ct += 1
+    logger.debug('Wrote %i %s objects' % (ct, loop_id))
+    return ct
+
+
+def loop_to_dict(loop_node, envelope=False):
+    """
+    Build a JSON compatible dict of a loop tree
+
+    @param loop_node: Loop tree
+    @type loop_node: L{node<x12context.X12LoopDataNode>}
+    @param envelope: Add the ISA, GS and ST control values
+    @type envelope: boolean
+    @rtype: collections.OrderedDict
+    """
+    x12_node = loop_node.x12_map_node
+    ret = collections.OrderedDict()
+    ret['type'] = 'loop'
+    ret['id'] = x12_node.id
+    ret['name'] = x12_node.name
+    if envelope:
+        ret['path'] = x12_node.get_path()
+        ret['envelope'] = get_envelope(loop_node)
+    children = []
+    for child in loop_node.children:
+        if child.type == 'loop':
+            children.append(loop_to_dict(child))
+        elif child.type == 'seg':
+            children.append(segment_to_dict(child))
+    ret['children'] = children
+    return ret
+
+
+def segment_to_dict(seg_node):
+    """
+    Build a JSON compatible dict of a segment.  Empty elements and elements
+    not used by the map are left out.  Elements and sub-elements not in the
+    map are given an id from their position, and a name of None.
+
+    @param seg_node: Segment node
+    @type seg_node: L{node<x12context.X12SegmentDataNode>}
+    @rtype: collections.OrderedDict
+    """
+    x12_node = seg_node.x12_map_node
+    seg_data = seg_node.seg_data
+    ret = collections.OrderedDict()
+    ret['type'] = 'seg'
+    ret['id'] = x12_node.id
+    ret['name'] = x12_node.name
+    elements = []
+    for i in range(len(seg_data.elements)):
+        comp_data = seg_data.elements[i]
+        child_node = x12_node.get_child_node_by_idx(i)
+        if comp_data.is_empty() or (child_node is not None and child_node.usage == 'N'):
+            continue
+        ele = collections.OrderedDict()
+        # Some composites have no xid in the map.  Elements past the end of
+        # the map have no node, and no name.
+        if child_node is not None and child_node.id:
+            ele['id'] = child_node.id
+        else:
+            ele['id'] = '%s%02i' % (x12_node.id, i + 1)
+        ele['name'] = child_node.name if child_node is not None else None
+        if child_node is not None and child_node.is_composite() \
+                or child_node is None and len(comp_data) > 1:
+            subelements = []
+            for j in range(len(comp_data)):
+                if comp_data[j].is_empty():
+                    continue
+                subele_node = child_node.get_child_node_by_idx(j) \
+                    if child_node is not None else None
+                subele = collections.OrderedDict()
+                if subele_node is not None:
+                    subele['id'] = subele_node.id
+                    subele['name'] = subele_node.name
+                else:
+                    subele['id'] = '%s-%02i' % (ele['id'], j + 1)
+                    subele['name'] = None
+                subele['value'] = comp_data[j].get_value()
+                subelements.append(subele)
+            ele['subelements'] = subelements
+        else:
+            ele['value'] = comp_data.format()
+        elements.append(ele)
+    ret['elements'] = elements
+    return ret
+
+
+def get_envelope(loop_node):
+    """
+    Get the interchange, functional group and transaction set control values
+    enclosing a loop node
+
+    @param loop_node: Loop node
+    @type loop_node: L{node<x12context.X12LoopDataNode>}
+    @return: {element id: value}
+    @rtype: collections.OrderedDict
+    """
+    loops = {}
+    node = loop_node
+    while node is not None:
+        if node.type == 'loop':
+            loops[node.id] = node
+        node = node.parent
+    ret = collections.OrderedDict()
+    for (loop_id, ele_id) in ENVELOPE_ELEMENTS:
+        if loop_id in loops:
+            ret[ele_id] = loops[loop_id].get_value(ele_id)
+    return ret
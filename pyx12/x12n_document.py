@@ -16,19 +16,17 @@ Create XML, HTML, and 997/999 documents based on the data file.
 #import os
 #import os.path
 import logging
+import time
 
 # Intrapackage imports
+# The 997, 999, HTML and XML writers are imported when used
 import pyx12.error_handler
-import pyx12.error_997
-import pyx12.error_999
 #import pyx12.error_debug
-import pyx12.error_html
 import pyx12.errors
 import pyx12.map_index
 import pyx12.map_if
 import pyx12.x12file
 from pyx12.map_walker import walk_tree
-import pyx12.x12xml_simple
 
 
 def apply_loop_count(orig_node, new_map):
@@ -59,7 +57,7 @@ def reset_gs_counts(cur_map):
 
 def x12n_document(param, src_file, fd_997, fd_html,
                   fd_xmldoc=None,
-                  xslt_files=None):
+                  xslt_files=None, map_cache=None, stats=None):
     """
     Primary X12 validation function
     @param param: pyx12.param instance
@@ -71,22 +69,54 @@ def x12n_document(param, src_file, fd_997, fd_html,
     @type fd_html: file descriptor
     @param fd_xmldoc: XML output document
     @type fd_xmldoc: file descriptor
+    @param map_cache: Optional cache of {map_file: map}, kept between
+        documents
+    @type map_cache: dict
+    @param stats: If given, the time spent in each stage is added to it
+    @type stats: L{pyx12.stats.StageStats}
     @rtype: boolean
     """
+    xmldoc = None
+    if fd_xmldoc:
+        from pyx12.x12xml_simple import x12xml_simple
+        xmldoc = x12xml_simple(fd_xmldoc, param.get('simple_dtd'))
+    try:
+        return _x12n_document(param, src_file, fd_997, fd_html, xmldoc,
+                              map_cache, stats)
+    finally:
+        # Write the XML output of the segments read, also after an error
+        if xmldoc is not None:
+            xmldoc.flush()
+
+
+def _x12n_document(param, src_file, fd_997, fd_html, xmldoc, map_cache,
+                   stats):
+    """
+    Validate the document, writing the segments to xmldoc if not None
+    """
     logger = logging.getLogger('pyx12')
     errh = pyx12.error_handler.err_handler()
 
+    def get_map(map_file):
+        if stats is None:
+            return pyx12.map_if.get_cached_map(map_file, param, map_cache)
+        start = time.time()
+        imap = pyx12.map_if.get_cached_map(map_file, param, map_cache)
+        stats.add('maps', time.time() - start)
+        return imap
+
     # Get X12 DATA file
     try:
         src = pyx12.x12file.X12Reader(src_file)
     except pyx12.errors.X12Error:
         logger.error('"%s" does not look like an X12 data file' % (src_file))
         return False
+    src.stats = stats
 
     #Get Map of Control Segments
     map_file = 'x12.control.00501.xml' if src.icvn == '00501' else 'x12.control.00401.xml'
     logger.debug('X12 control file: %s' % (map_file))
-    control_map = pyx12.map_if.load_map_file(map_file, param)
+    control_map = get_map(map_file)
     map_index_if = pyx12.map_index.map_index()
     node = control_map.getnodebypath('/ISA_LOOP/ISA')
     walker = walk_tree()
@@ -94,18 +124,18 @@ def x12n_document(param, src_file, fd_997, fd_html,
     #XXX Generate TA1 if needed.
 
     if fd_html:
-        html = pyx12.error_html.error_html(errh, fd_html, src.get_term())
+        from pyx12.error_html import error_html
+        html = error_html(errh, fd_html, src.get_term())
         html.header()
         err_iter = pyx12.error_handler.err_iter(errh)
-    if fd_xmldoc:
-        xmldoc = pyx12.x12xml_simple.x12xml_simple(
-            fd_xmldoc, param.get('simple_dtd'))
 
     #basedir = os.path.dirname(src_file)
     #erx = errh_xml.err_handler(basedir=basedir)
 
     valid = True
     for seg in src:
+        if stats is not None:
+            start = time.time()
         #find node
         orig_node = node
 
@@ -120,6 +150,10 @@ def x12n_document(param, src_file, fd_997, fd_html,
             except pyx12.errors.EngineError:
                 logger.error('Source file line %i' % (src.get_cur_line()))
                 raise
+        if stats is not None:
+            mark = time.time()
+            stats.add('walk', mark - start)
+            maps_secs = stats.seconds['maps']
         if node is None:
             node = orig_node
         else:
@@ -141,7 +175,7 @@ def x12n_document(param, src_file, fd_997, fd_html,
                     if map_file is None:
                         raise pyx12.errors.EngineError("Map not found.  icvn=%s, fic=%s, vriic=%s" %
                                                        (icvn, fic, vriic))
-                    cur_map = pyx12.map_if.load_map_file(map_file, param)
+                    cur_map = get_map(map_file)
                     if cur_map.id == '837':
                         src.check_837_lx = True
                     else:
@@ -166,7 +200,7 @@ def x12n_document(param, src_file, fd_997, fd_html,
                         if map_file is None:
                             raise pyx12.errors.EngineError("Map not found.  icvn=%s, fic=%s, vriic=%s, tspc=%s" %
                                                            (icvn, fic, vriic, tspc))
-                        cur_map = pyx12.map_if.load_map_file(map_file, param)
+                        cur_map = get_map(map_file)
                         src.check_837_lx = True if cur_map.id == '837' else False
                         logger.debug('Map file: %s' % (map_file))
                         apply_loop_count(node, cur_map)
@@ -189,7 +223,13 @@ def x12n_document(param, src_file, fd_997, fd_html,
                 errh.handle_errors(src.pop_errors())
 
             #errh.set_cur_line(src.get_cur_line())
+            if stats is not None:
+                handled = time.time()
+                stats.add('errors', handled - mark - (stats.seconds['maps'] - maps_secs))
             valid &= node.is_valid(seg, errh)
+            if stats is not None:
+                mark = time.time()
+                stats.add('validate', mark - handled)
             #erx.handleErrors(src.pop_errors())
             #erx.handleErrors(errh.get_errors())
             #errh.reset()
@@ -207,14 +247,21 @@ def x12n_document(param, src_file, fd_997, fd_html,
                     break
             html.gen_seg(seg, src, err_node_list)
 
-        if fd_xmldoc:
+        if xmldoc is not None:
             xmldoc.seg(node, seg)
+        if stats is not None:
+            stats.add('output', time.time() - mark)
 
         #erx.Write(src.cur_line)
 
     #erx.handleErrors(src.pop_errors())
+    if stats is not None:
+        start = time.time()
     src.cleanup()  # Catch any skipped loop trailers
     errh.handle_errors(src.pop_errors())
+    if stats is not None:
+        mark = time.time()
+        stats.add('errors', mark - start)
     #erx.handleErrors(src.pop_errors())
     #erx.handleErrors(errh.get_errors())
 
@@ -222,9 +269,6 @@ def x12n_document(param, src_file, fd_997, fd_html,
         html.footer()
         del html
 
-    if fd_xmldoc:
-        del xmldoc
-
     #visit_debug = pyx12.error_debug.error_debug_visitor(sys.stdout)
     #errh.accept(visit_debug)
 
@@ -232,13 +276,17 @@ def x12n_document(param, src_file, fd_997, fd_html,
     #import ipdb; ipdb.set_trace()
     if fd_997 and fic != 'FA':
         if vriic and vriic[:6] == '004010':
-            visit_997 = pyx12.error_997.error_997_visitor(fd_997, src.get_term())
+            from pyx12.error_997 import error_997_visitor
+            visit_997 = error_997_visitor(fd_997, src.get_term())
             errh.accept(visit_997)
             del visit_997
         if vriic and vriic[:6] == '005010':
-            visit_999 = pyx12.error_999.error_999_visitor(fd_997, src.get_term())
+            from pyx12.error_999 import error_999_visitor
+            visit_999 = error_999_visitor(fd_997, src.get_term())
             errh.accept(visit_999)
             del visit_999
+    if stats is not None:
+        stats.add('output', time.time() - mark)
     del node
     del src
     del control_map
@@ -0,0 +1,206 @@
+######################################################################
+# Copyright (c) Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Format X12 documents, optionally fixing the trailer and HL counts
+
+Segments are written as they are read, in blocks, so memory use does not
+depend on the size of the document.  File output is written to a temporary
+file in the target directory and renamed over the target when complete.
+"""
+
+import logging
+import multiprocessing
+import os
+import os.path
+import shutil
+import tempfile
+
+# Intrapackage imports
+import pyx12.errors
+import pyx12.x12file
+
+logger = logging.getLogger('pyx12.x12norm')
+
+# Segments written per block
+BLOCK_SEGMENTS = 1000
+
+# Count fixes: seg_id: (error code, zero based element index)
+COUNT_FIXES = {
+    'IEA': ('021', 0),
+    'GE': ('5', 0),
+    'SE': ('4', 0),
+    'HL': ('HL1', 0),
+}
+
+
+def normalize(src_file, fd_out, eol='', fix_counting=False):
+    """
+    Write the formatted segments of an X12 document
+
+    @param src_file: absolute path of source file or an open, readable file
+        object
+    @type src_file: string or open file object
+    @param fd_out: Output file
+    @type fd_out: file descriptor
+    @param eol: Line ending after each segment.  If blank, one line ending
+        is written at the end
+    @type eol: string
+    @param fix_counting: Correct IEA01, GE01, SE01 and HL01 counts
+    @type fix_counting: boolean
+    @return: Count of corrected values
+    @rtype: int
+    """
+    src = pyx12.x12file.X12Reader(src_file)
+    fix_ct = 0
+    buf = []
+    for seg_data in src:
+        # Always pop, so the error list does not grow with the file
+        errors = src.pop_errors()
+        if fix_counting and errors:
+            seg_id = seg_data.get_seg_id()
+            if seg_id in COUNT_FIXES:
+                (err_cde, ele_idx) = COUNT_FIXES[seg_id]
+                if err_cde in [x[1] for x in errors]:
+                    seg_data.set_by_idx(ele_idx, None, '%i' % (_get_count(src, seg_id)))
+                    fix_ct += 1
+        buf.append(seg_data.format())
+        if len(buf) >= BLOCK_SEGMENTS:
+            fd_out.write(eol.join(buf) + eol)
+            buf = []
+    if buf:
+        fd_out.write(eol.join(buf) + eol)
+    if eol == '':
+        fd_out.write('\n')
+    if fix_ct:
+        logger.info('Corrected %i counts' % (fix_ct))
+    return fix_ct
+
+
+def normalize_file(file_in, file_out, eol='', fix_counting=False):
+    """
+    Normalize a file to an atomically replaced output file.  file_out may
+    be the same as file_in.  On an error, file_out is not changed.
+
+    @param file_in: Source filename
+    @type file_in: string
+    @param file_out: Target filename
+    @type file_out: string
+    @return: Count of corrected values
+    @rtype: int
+    """
+    with AtomicFile(file_out, mode_from=file_in) as fd_out:
+        return normalize(file_in, fd_out, eol, fix_counting)
+
+
+def normalize_files(filenames, eol='', fix_counting=False, jobs=1):
+    """
+    Normalize files in place, in parallel if jobs > 1
+
+    @param filenames: Source filenames
+    @type filenames: list[string]
+    @param jobs: Number of worker processes
+    @type jobs: int
+    @return: Iterator of (filename, error string or None), in the order of
+        filenames
+    @rtype: tuple(string, string)
+    """
+    args = [(filename, eol, fix_counting) for filename in filenames]
+    if jobs > 1 and len(filenames) > 1:
+        pool = multiprocessing.Pool(min(jobs, len(filenames)))
+        try:
+            for res in pool.imap(_normalize_in_place, args):
+                yield res
+        except:
+            pool.terminate()
+            pool.join()
+            raise
+        pool.close()
+        pool.join()
+    else:
+        for arg in args:
+            yield _normalize_in_place(arg)
+
+
+def _normalize_in_place(args):
+    """
+    Worker function for normalize_files
+    """
+    (filename, eol, fix_counting) = args
+    try:
+        normalize_file(filename, filename, eol, fix_counting)
+        return (filename, None)
+    except (pyx12.errors.X12Error, IOError, OSError) as e:
+        return (filename, str(e))
+
+
+def _get_count(src, seg_id):
+    """
+    The correct count for a trailer or HL segment
+    """
+    if seg_id == 'IEA':
+        return src.gs_count
+    elif seg_id == 'GE':
+        return src.st_count
+    elif seg_id == 'SE':
+        return src.seg_count + 1
+    else:
+        return src.hl_count
+
+
+class AtomicFile(object):
+    """
+    A file written to a temporary file in the same directory, and renamed
+    to the target filename on close.  If the with block raises, the
+    temporary file is removed and the target is not changed.  The rename is
+    atomic except on Windows.
+    """
+
+    def __init__(self, filename, mode_from=None):
+        """
+        @param filename: Target filename
+        @type filename: string
+        @param mode_from: Copy the permissions of this file if it exists
+        @type mode_from: string
+        """
+        self.filename = filename
+        self.mode_from = mode_from
+        self.fd = None
+
+    def __enter__(self):
+        (dirname, basename) = os.path.split(os.path.abspath(self.filename))
+        self.fd = tempfile.NamedTemporaryFile(mode='w', dir=dirname,
+                                              prefix='.%s.' % (basename), delete=False)
+        return self.fd
+
+    def __exit__(self, exc_type, exc_value, tb):
+        tmp_name = self.fd.name
+        if exc_type is not None:
+            self.fd.close()
+            os.remove(tmp_name)
+            return False
+        self.fd.flush()
+        os.fsync(self.fd.fileno())
+        self.fd.close()
+        if self.mode_from is not None and os.path.isfile(self.mode_from):
+            shutil.copymode(self.mode_from, tmp_name)
+        _replace(tmp_name, self.filename)
+        return False
+
+
+def _replace(src, dst):
+    """
+    Rename src to dst, replacing dst if it exists.  On Windows os.rename
+    fails if dst exists, so dst is removed first, and is not replaced
+    atomically.
+    """
+    if os.name == 'nt' and os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
@@ -0,0 +1,389 @@
+######################################################################
+# Copyright (c) Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Compiled queries over X12DataNode trees
+
+A query path is parsed once by compile_path and can then be run against
+any number of loop trees.  It extends the relative x12 path with:
+
+2400/SV1                    Child steps
+//2400/SV1                  Descendant search, at any depth
+2300[CLM05-1=11]            Element value predicate on a loop
+REF[6R]02                   Qualifier filter, as in an x12 path
+2400[SV1[SV101-2=H2015]]    Predicates nest
+2300[2400/SVD]              Existence test
+../2010BA/NM109             Parent steps
+
+A predicate on a loop is true if any value found by its relative path
+equals the value.  A predicate on a segment tests that segment's element.
+"""
+
+import re
+
+# Intrapackage imports
+from errors import X12PathError
+
+
+def compile_path(path_str):
+    """
+    Parse a query path
+
+    @param path_str: Query path - //2400/SV1, 2300[CLM05-1=11]
+    @type path_str: string
+    @return: Reusable query
+    @rtype: L{X12Query}
+    @raise X12PathError: On blank or invalid path
+    """
+    return X12Query(path_str)
+
+
+class X12Query(object):
+    """
+    A parsed query path
+    """
+
+    re_seg_step = re.compile(r'^(?P<seg_id>[A-Z][A-Z0-9]{1,2})(?P<preds>(\[.*\])?)' +
+                             r'(?P<ele_idx>[0-9]{2})?(-(?P<subele_idx>[0-9]+))?$', re.S)
+    re_loop_step = re.compile(r'^(?P<id>[A-Za-z0-9_]+)(?P<preds>(\[.*\])?)$', re.S)
+    re_refdes = re.compile(r'^(?P<seg_id>[A-Z][A-Z0-9]{1,2})?' +
+                           r'(?P<ele_idx>[0-9]{2})(-(?P<subele_idx>[0-9]+))?$', re.S)
+
+    def __init__(self, path_str):
+        """
+        @param path_str: Query path
+        @type path_str: string
+        @raise X12PathError: On blank or invalid path
+        """
+        self.path_str = path_str
+        self.parent_ct = 0
+        self.steps = []
+        # Zero based indexes of the last step's element, see
+        # Segment.get_value_by_idx
+        self.ele_idx = None
+        self.subele_idx = None
+        rest = path_str
+        while rest[:3] == '../':
+            self.parent_ct += 1
+            rest = rest[3:]
+        if rest == '':
+            raise X12PathError('Blank query path: "%s"' % (path_str))
+        if rest[0] == '/' and rest[:2] != '//':
+            raise X12PathError('Query path "%s" must be relative' % (path_str))
+        for (descendant, step_str) in self._split_steps(rest):
+            if step_str == '':
+                raise X12PathError('Query path "%s" has an empty step' % (path_str))
+            self.steps.append(_QueryStep(descendant, step_str))
+        last = self.steps[-1]
+        m = X12Query.re_seg_step.match(last.step_str)
+        if m is not None and m.group('ele_idx') is not None:
+            self.ele_idx = int(m.group('ele_idx')) - 1
+            if m.group('subele_idx') is not None:
+                self.subele_idx = int(m.group('subele_idx')) - 1
+        for step in self.steps:
+            step.parse(step is last)
+
+    #{ Public Methods
+    def select(self, node):
+        """
+        Find the matching nodes below the given node
+        @param node: Starting node
+        @type node: L{node<x12context.X12DataNode>}
+        @return: Iterator of matching nodes, in tree order
+        @rtype: L{node<x12context.X12DataNode>}
+        """
+        for i in range(self.parent_ct):
+            if node.parent is None:
+                raise X12PathError('Current node %s does not have a parent: %s'
+                                   % (node.id, self.path_str))
+            node = node.parent
+        nodes = [node]
+        for step in self.steps:
+            nodes = step.apply(nodes)
+        return iter(nodes)
+
+    def first(self, node):
+        """
+        @return: The first matching node or None
+        @rtype: L{node<x12context.X12DataNode>}
+        """
+        for n in self.select(node):
+            return n
+        return None
+
+    def exists(self, node):
+        """
+        @return: True if at least one node matches
+        @rtype: boolean
+        """
+        return self.first(node) is not None
+
+    def count(self, node):
+        """
+        @return: Count of matching nodes
+        @rtype: int
+        """
+        return len(list(self.select(node)))
+
+    def values(self, node):
+        """
+        Get the element values of the matching segments
+        @param node: Starting node
+        @type node: L{node<x12context.X12DataNode>}
+        @return: Iterator of element values, skipping missing elements
+        @rtype: string
+        @raise X12PathError: If the path does not end with an element
+        """
+        if self.ele_idx is None:
+            raise X12PathError('Query path "%s" does not end with an element' % (self.path_str))
+        for n in self.select(node):
+            val = n.seg_data.get_value_by_idx(self.ele_idx, self.subele_idx)
+            if val is not None:
+                yield val
+
+    def get_value(self, node):
+        """
+        @return: The first element value or None
+        @rtype: string
+        """
+        for val in self.values(node):
+            return val
+        return None
+
+    #{ Private Methods
+    @staticmethod
+    def _split_steps(path_str):
+        """
+        Split on slashes outside of brackets
+        @return: [(is descendant step, step string)]
+        @rtype: list
+        """
+        steps = []
+        depth = 0
+        descendant = False
+        start = 0
+        i = 0
+        if path_str[:2] == '//':
+            descendant = True
+            start = i = 2
+        while i < len(path_str):
+            c = path_str[i]
+            if c == '[':
+                depth += 1
+            elif c == ']':
+                depth -= 1
+                if depth < 0:
+                    raise X12PathError('Unbalanced "]" in query path "%s"' % (path_str))
+            elif c == '/' and depth == 0:
+                steps.append((descendant, path_str[start:i]))
+                if path_str[i + 1:i + 2] == '/':
+                    descendant = True
+                    i += 1
+                else:
+                    descendant = False
+                start = i + 1
+            i += 1
+        if depth != 0:
+            raise X12PathError('Unbalanced "[" in query path "%s"' % (path_str))
+        steps.append((descendant, path_str[start:]))
+        return steps
+
+    def __repr__(self):
+        """
+        @rtype: string
+        """
+        return self.path_str
+
+
+class _QueryStep(object):
+    """
+    One step of a query: an id with qualifier and predicate filters
+    """
+
+    def __init__(self, descendant, step_str):
+        self.descendant = descendant
+        self.step_str = step_str
+        self.node_id = None
+        self.qual = None
+        self.preds = []
+
+    def parse(self, is_last):
+        """
+        @param is_last: Is this the last step, which may end in an element
+        @type is_last: boolean
+        @raise X12PathError: On an invalid step
+        """
+        m = X12Query.re_seg_step.match(self.step_str)
+        is_seg = m is not None and (is_last or m.group('ele_idx') is None)
+        if is_seg:
+            self.node_id = m.group('seg_id')
+        else:
+            m = X12Query.re_loop_step.match(self.step_str)
+            if m is None:
+                raise X12PathError('Invalid query step "%s"' % (self.step_str))
+            self.node_id = m.group('id')
+        for pred_str in self._split_preds(m.group('preds')):
+            eq_idx = self._find_top_level(pred_str, '=')
+            if eq_idx == -1 and is_seg and '[' not in pred_str and '/' not in pred_str:
+                if self.qual is not None:
+                    raise X12PathError('Query step "%s" has more than one qualifier' % (self.step_str))
+                self.qual = pred_str
+                continue
+            if eq_idx == -1:
+                # Existence test
+                self.preds.append(_QueryPredicate(None, X12Query(pred_str)))
+                continue
+            (ref, val) = (pred_str[:eq_idx], pred_str[eq_idx + 1:])
+            if '/' not in ref and '[' not in ref:
+                ref_m = X12Query.re_refdes.match(ref)
+                if ref_m is None:
+                    raise X12PathError('Invalid predicate "%s"' % (pred_str))
+                seg_id = ref_m.group('seg_id')
+                ele_idx = int(ref_m.group('ele_idx')) - 1
+                subele_idx = int(ref_m.group('subele_idx')) - 1 if ref_m.group('subele_idx') else None
+                query = X12Query(ref) if seg_id is not None else None
+                self.preds.append(_QueryPredicate(val, query, seg_id, ele_idx, subele_idx))
+            else:
+                query = X12Query(ref)
+                if query.ele_idx is None:
+                    raise X12PathError('Predicate "%s" does not end with an element' % (pred_str))
+                self.preds.append(_QueryPredicate(val, query))
+
+    def apply(self, nodes):
+        """
+        @param nodes: Context nodes
+        @type nodes: list
+        @return: Matching nodes, in tree order
+        @rtype: list
+        """
+        ret = []
+        if self.descendant:
+            seen = set()
+            for node in nodes:
+                for child in _iter_descendants(node):
+                    if id(child) not in seen and self.is_match(child):
+                        seen.add(id(child))
+                        ret.append(child)
+        else:
+            for node in nodes:
+                if node.type != 'loop':
+                    continue
+                for child in node._get_child_index().get(self.node_id, []):
+                    if self.is_match(child):
+                        ret.append(child)
+        return ret
+
+    def is_match(self, node):
+        """
+        @rtype: boolean
+        """
+        if node.type is None or node.x12_map_node.id != self.node_id:
+            return False
+        if self.qual is not None and (node.type != 'seg' or not
+                node.x12_map_node.is_match_qual(node.seg_data, self.node_id, self.qual)):
+            return False
+        for pred in self.preds:
+            if not pred.is_match(node):
+                return False
+        return True
+
+    @staticmethod
+    def _find_top_level(pred_str, char):
+        """
+        @return: Index of char outside of brackets, or -1
+        @rtype: int
+        """
+        depth = 0
+        for i in range(len(pred_str)):
+            if pred_str[i] == '[':
+                depth += 1
+            elif pred_str[i] == ']':
+                depth -= 1
+            elif pred_str[i] == char and depth == 0:
+                return i
+        return -1
+
+    @staticmethod
+    def _split_preds(preds_str):
+        """
+        Split [a][b[c]] into ['a', 'b[c]']
+        """
+        ret = []
+        depth = 0
+        start = 0
+        for i in range(len(preds_str)):
+            if preds_str[i] == '[':
+                if depth == 0:
+                    start = i + 1
+                depth += 1
+            elif preds_str[i] == ']':
+                depth -= 1
+                if depth == 0:
+                    ret.append(preds_str[start:i])
+        return ret
+
+
+class _QueryPredicate(object):
+    """
+    An element value or existence test
+    """
+
+    def __init__(self, value, query, seg_id=None, ele_idx=None, subele_idx=None):
+        """
+        @param value: Value to compare, None to test that the query matches
+        @param query: Relative query for a loop node, None for a bare element
+        @param seg_id: Segment id of a simple reference designator
+        @param ele_idx: Zero based element index of a simple reference
+            designator
+        @param subele_idx: Zero based sub-element index
+        """
+        self.value = value
+        self.query = query
+        self.seg_id = seg_id
+        self.ele_idx = ele_idx
+        self.subele_idx = subele_idx
+
+    def is_match(self, node):
+        """
+        @rtype: boolean
+        """
+        if node.type == 'seg':
+            if self.ele_idx is None \
+                    or (self.seg_id is not None and self.seg_id != node.seg_data.seg_id):
+                return False
+            return node.seg_data.get_value_by_idx(self.ele_idx,
+                                                  self.subele_idx) == self.value
+        if self.query is None:
+            return False
+        if self.value is None:
+            return self.query.exists(node)
+        for val in self.query.values(node):
+            if val == self.value:
+                return True
+        return False
+
+
+def _iter_descendants(node):
+    """
+    Iterate over the live nodes below node, in tree order
+    """
+    if node.type != 'loop':
+        return
+    stack = [iter(node.children)]
+    while stack:
+        for child in stack[-1]:
+            if child.type is None:
+                continue
+            yield child
+            if child.type == 'loop':
+                stack.append(iter(child.children))
+                break
+        else:
+            stack.pop()
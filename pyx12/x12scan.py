@@ -0,0 +1,299 @@
+######################################################################
+# Copyright (c) Kalamazoo Community Mental Health Services,
+#   John Holland <jholland@kazoocmh.org> <john@zoner.org>
+# All rights reserved.
+#
+# This software is licensed as described in the file LICENSE.txt, which
+# you should have received as part of this distribution.
+#
+######################################################################
+
+"""
+Fast summary of the envelopes of an X12 file
+
+Only the ISA, GS, ST, SE, GE and IEA segments are split into elements.  All
+other segments are counted by their segment terminators, without creating
+Segment objects.  The file is not validated.
+"""
+
+import collections
+import multiprocessing
+import re
+import sys
+
+# Intrapackage imports
+import pyx12.errors
+from pyx12.rawx12file import ISA_LEN
+
+DEFAULT_BUFSIZE = 1024 * 1024
+ENVELOPE_SEG_IDS = ('ISA', 'IEA', 'GS', 'GE', 'ST', 'SE')
+
+
+def scan_file(src_file, bufsize=DEFAULT_BUFSIZE):
+    """
+    Summarize the interchanges, functional groups and transaction sets of
+    an X12 file
+
+    @param src_file: absolute path of source file or an open, readable file
+        object
+    @type src_file: string or open file object
+    @param bufsize: Size of the blocks read
+    @type bufsize: int
+    @return: Summary, see L{X12Scanner.get_summary}
+    @rtype: collections.OrderedDict
+    @raise X12Error: If the file does not start with a valid ISA segment
+    """
+    try:
+        src_file.closed
+        fd_in = src_file
+        filename = getattr(src_file, 'name', None)
+    except AttributeError:
+        filename = src_file
+        if src_file == '-':
+            fd_in = sys.stdin
+        else:
+            fd_in = open(src_file, 'U')
+    try:
+        scanner = X12Scanner(filename)
+        scanner.scan(fd_in, bufsize)
+    finally:
+        if fd_in is not src_file and fd_in is not sys.stdin:
+            fd_in.close()
+    return scanner.get_summary()
+
+
+def scan_files(filenames, jobs=1):
+    """
+    Summarize a list of files, in parallel if jobs > 1
+
+    @param filenames: Source filenames
+    @type filenames: list[string]
+    @param jobs: Number of worker processes
+    @type jobs: int
+    @return: Iterator of summaries, in the order of filenames.  A file that
+        could not be scanned has an error entry.
+    @rtype: collections.OrderedDict
+    """
+    if jobs > 1 and len(filenames) > 1:
+        pool = multiprocessing.Pool(min(jobs, len(filenames)))
+        try:
+            for summary in pool.imap(_scan_file_safe, filenames):
+                yield summary
+        except:
+            pool.terminate()
+            pool.join()
+            raise
+        pool.close()
+        pool.join()
+    else:
+        for filename in filenames:
+            yield _scan_file_safe(filename)
+
+
+def _scan_file_safe(filename):
+    """
+    Worker function for scan_files
+    """
+    try:
+        return scan_file(filename)
+    except (pyx12.errors.X12Error, IOError) as e:
+        ret = collections.OrderedDict()
+        ret['filename'] = filename
+        ret['error'] = str(e)
+        return ret
+
+
+class X12Scanner(object):
+    """
+    Collect the envelope values of an X12 data stream
+    """
+
+    def __init__(self, filename=None):
+        """
+        @param filename: Name to include in the summary
+        @type filename: string
+        """
+        self.filename = filename
+        self.seg_count = 0
+        self.interchanges = []
+        self.seg_term = None
+        self.ele_term = None
+        self.re_envelope = None
+        self.isa = None
+        self.gs = None
+        self.st = None
+        self.st_start = None
+
+    #{ Public Methods
+    def scan(self, fd_in, bufsize=DEFAULT_BUFSIZE):
+        """
+        Read an X12 data stream
+
+        @param fd_in: an open, readable file object
+        @type fd_in: open file object
+        @raise X12Error: If the stream does not start with a valid ISA segment
+        """
+        buf = fd_in.read(ISA_LEN)
+        self._set_terminators(buf)
+        seg_term = self.seg_term
+        while True:
+            data = fd_in.read(bufsize)
+            if not data:
+                if buf.strip('\r\n'):
+                    self._scan_block(buf)
+                break
+            buf += data
+            end = buf.rfind(seg_term) + 1
+            if end > 0:
+                self._scan_block(buf[:end])
+                buf = buf[end:]
+
+    def get_summary(self):
+        """
+        @return: {filename, segment_count, transaction_counts,
+            partner_counts, interchanges: [{.., groups: [{..,
+            transactions: [{..}]}]}]}
+        @rtype: collections.OrderedDict
+        """
+        type_counts = collections.OrderedDict()
+        partner_counts = collections.OrderedDict()
+        for isa in self.interchanges:
+            partner = (isa['sender'], isa['receiver'])
+            for gs in isa['groups']:
+                for st in gs['transactions']:
+                    type_counts[st['type']] = type_counts.get(st['type'], 0) + 1
+                    counts = partner_counts.setdefault(partner, collections.OrderedDict())
+                    counts[st['type']] = counts.get(st['type'], 0) + 1
+        ret = collections.OrderedDict()
+        ret['filename'] = self.filename
+        ret['segment_count'] = self.seg_count
+        ret['transaction_counts'] = type_counts
+        ret['partner_counts'] = []
+        for ((sender, receiver), counts) in partner_counts.items():
+            ret['partner_counts'].append(collections.OrderedDict(
+                [('sender', sender), ('receiver', receiver), ('counts', counts)]))
+        ret['interchanges'] = self.interchanges
+        return ret
+
+    #{ Private Methods
+    def _set_terminators(self, isa_str):
+        """
+        Get the terminators from the fixed length ISA segment
+        """
+        if isa_str[:3] != 'ISA':
+            raise pyx12.errors.X12Error("First line does not begin with 'ISA': %s" % isa_str[:3])
+        if len(isa_str) != ISA_LEN:
+            raise pyx12.errors.X12Error('ISA line is only %i characters' % len(isa_str))
+        self.seg_term = isa_str[-1]
+        self.ele_term = isa_str[3]
+        # An envelope segment at the start of the block or after a segment
+        # terminator, with any line endings between segments
+        self.re_envelope = re.compile(r'(?:^|(?<=%s))[\r\n]*(%s)%s([^%s]*)' % (
+            re.escape(self.seg_term), '|'.join(ENVELOPE_SEG_IDS),
+            re.escape(self.ele_term), re.escape(self.seg_term)))
+
+    def _scan_block(self, block):
+        """
+        Count the segments of a block ending with a segment terminator, and
+        handle the envelope segments
+        """
+        seg_term = self.seg_term
+        ele_term = self.ele_term
+        pos = 0
+        for m in self.re_envelope.finditer(block):
+            self.seg_count += block.count(seg_term, pos, m.start())
+            pos = m.start()
+            self._envelope_segment(m.group(1), m.group(2).rstrip('\r\n').split(ele_term))
+        self.seg_count += block.count(seg_term, pos)
+        # An unterminated last segment
+        if block.strip('\r\n')[-1:] not in (seg_term, ''):
+            self.seg_count += 1
+
+    def _envelope_segment(self, seg_id, elements):
+        """
+        @param elements: The element values, starting with element 01
+        @type elements: list[string]
+        """
+        # Segment index of this segment, one based
+        seg_idx = self.seg_count + 1
+        if seg_id == 'ISA':
+            self.isa = collections.OrderedDict()
+            self.isa['sender'] = _get(elements, 6)
+            self.isa['receiver'] = _get(elements, 8)
+            self.isa['date'] = _get(elements, 9)
+            self.isa['control_number'] = _get(elements, 13)
+            self.isa['usage'] = _get(elements, 15)
+            self.isa['groups'] = []
+            self.isa['iea_count'] = None
+            self.interchanges.append(self.isa)
+            self.gs = None
+            self.st = None
+        elif seg_id == 'GS':
+            self.gs = collections.OrderedDict()
+            self.gs['functional_id'] = _get(elements, 1)
+            self.gs['sender'] = _get(elements, 2)
+            self.gs['receiver'] = _get(elements, 3)
+            self.gs['control_number'] = _get(elements, 6)
+            self.gs['version'] = _get(elements, 8)
+            self.gs['transactions'] = []
+            self.gs['ge_count'] = None
+            if self.isa is not None:
+                self.isa['groups'].append(self.gs)
+            self.st = None
+        elif seg_id == 'ST':
+            self.st = collections.OrderedDict()
+            self.st['type'] = _get(elements, 1)
+            self.st['control_number'] = _get(elements, 2)
+            self.st['segment_count'] = None
+            self.st['se_count'] = None
+            self.st_start = seg_idx
+            if self.gs is not None:
+                self.gs['transactions'].append(self.st)
+        elif seg_id == 'SE':
+            if self.st is not None:
+                self.st['segment_count'] = seg_idx - self.st_start + 1
+                self.st['se_count'] = _int(_get(elements, 1))
+                self.st = None
+        elif seg_id == 'GE':
+            if self.gs is not None:
+                self.gs['ge_count'] = _int(_get(elements, 1))
+                self.gs = None
+        elif seg_id == 'IEA':
+            if self.isa is not None:
+                self.isa['iea_count'] = _int(_get(elements, 1))
+                self.isa = None
+
+
+def strip_padding(summary):
+    """
+    Remove the fixed width padding of the ISA sender and receiver ids of a
+    summary, in place
+
+    @param summary: File summary, see L{X12Scanner.get_summary}
+    @type summary: dict
+    @return: The summary
+    @rtype: dict
+    """
+    for isa in summary.get('interchanges', []):
+        isa['sender'] = isa['sender'].strip()
+        isa['receiver'] = isa['receiver'].strip()
+    for partner in summary.get('partner_counts', []):
+        partner['sender'] = partner['sender'].strip()
+        partner['receiver'] = partner['receiver'].strip()
+    return summary
+
+
+def _get(elements, ele_idx):
+    """
+    @param ele_idx: One based element index
+    @return: The element value, or '' if not present
+    @rtype: string
+    """
+    return elements[ele_idx - 1] if ele_idx <= len(elements) else ''
+
+
+def _int(val):
+    try:
+        return int(val)
+    except ValueError:
+        return None
@@ -12,7 +12,6 @@
 Create an XML rendering of the X12 document
 """
 
-import os.path
 
 # Intrapackage imports
 from errors import EngineError
@@ -28,10 +27,16 @@ class x12xml(object):
                 type, "-//J Holland//DTD XML X12 Document Conversion1.0//EN//XML",
                 "%s" % (dtd_urn))
         self.writer.push(type)
-        self.last_path = None
+        self.last_path = ()
 
     def __del__(self):
-        pass
+        self.flush()
+
+    def flush(self):
+        """
+        Write the buffered output of the segments so far
+        """
+        self.writer.flush()
 
     def seg(self, seg_node, seg_data):
         """
@@ -46,13 +51,12 @@ class x12xml(object):
             raise EngineError('Node must be a segment')
         parent = pop_to_parent_loop(seg_node)  # Get enclosing loop
         # check path for new loops to be added
-        cur_path = self._path_list(parent.get_path())
+        cur_path = parent.get_path_tuple()
         if self.last_path != cur_path:
             last_path = self.last_path
             match_idx = self._get_path_match_idx(last_path, cur_path)
-            root_path = self._path_list(os.path.commonprefix(
-                ['/'.join(cur_path), '/'.join(last_path)]))
-            if seg_node.is_first_seg_in_loop() and root_path == cur_path:
+            if seg_node.is_first_seg_in_loop() and match_idx == len(cur_path):
+                # Repeat of an enclosing loop
                 match_idx -= 1
             for i in range(len(last_path) - 1, match_idx - 1, -1):
                 self.writer.pop()
@@ -60,32 +64,7 @@ class x12xml(object):
                 (xname, attrib) = self._get_loop_info(cur_path[i])
                 self.writer.push(xname, attrib)
         seg_node_id = self._get_node_id(seg_node, parent, seg_data)
-        (xname, attrib) = self._get_seg_info(seg_node_id)
-        self.writer.push(xname, attrib)
-        for i in range(len(seg_data)):
-            child_node = seg_node.get_child_node_by_idx(i)
-            if child_node.usage == 'N' or seg_data.get('%02i' % (i + 1)).is_empty():
-                pass  # Do not try to ouput for invalid or empty elements
-            elif child_node.is_composite():
-                (xname, attrib) = self._get_comp_info(seg_node_id)
-                self.writer.push(xname, attrib)
-                comp_data = seg_data.get('%02i' % (i + 1))
-                for j in range(len(comp_data)):
-                    subele_node = child_node.get_child_node_by_idx(j)
-                    (xname, attrib) = self._get_subele_info(subele_node.id)
-                    self.writer.elem(xname, comp_data[j].get_value(), attrib)
-                self.writer.pop()  # end composite
-            elif child_node.is_element():
-                if seg_data.get_value('%02i' % (i + 1)) == '':
-                    pass
-                    #self.writer.empty(u"ele", attrs={u'id': child_node.id})
-                else:
-                    (xname, attrib) = self._get_ele_info(child_node.id)
-                    self.writer.elem(xname, seg_data.get_value(
-                        '%02i' % (i + 1)), attrib)
-            else:
-                raise EngineError('Node must be a either an element or a composite')
-        self.writer.pop()  # end segment
+        self._write_segment(seg_node, seg_node_id, seg_data)
         self.last_path = cur_path
 
     def seg_context(self, seg_node, seg_data, pop_loops, push_loops):
@@ -104,32 +83,46 @@ class x12xml(object):
         for loop in push_loops:
             (xname, attrib) = self._get_loop_info(loop.id)
             self.writer.push(xname, attrib)
-        (xname, attrib) = self._get_seg_info(seg_node.id)
-        self.writer.push(xname, attrib)
-        for i in range(len(seg_data)):
+        self._write_segment(seg_node, seg_node.id, seg_data)
+
+    def _write_segment(self, seg_node, seg_node_id, seg_data):
+        """
+        Generate XML for the segment and its elements in one pass over the
+        segment data
+
+        @param seg_node: Map Node
+        @type seg_node: L{node<map_if.segment_if>}
+        @param seg_node_id: Segment id used for the segment and composite names
+        @type seg_node_id: string
+        @param seg_data: Segment object
+        @type seg_data: L{segment<segment.Segment>}
+        """
+        writer = self.writer
+        (xname, attrib) = self._get_seg_info(seg_node_id)
+        writer.push(xname, attrib)
+        for i in range(len(seg_data.elements)):
+            comp_data = seg_data.elements[i]
             child_node = seg_node.get_child_node_by_idx(i)
-            if child_node.usage == 'N' or seg_data.get('%02i' % (i + 1)).is_empty():
+            if child_node is None or child_node.usage == 'N' or comp_data.is_empty():
                 pass  # Do not try to ouput for invalid or empty elements
             elif child_node.is_composite():
-                (xname, attrib) = self._get_comp_info(seg_node.id)
-                self.writer.push(xname, attrib)
-                comp_data = seg_data.get('%02i' % (i + 1))
+                (xname, attrib) = self._get_comp_info(seg_node_id)
+                writer.push(xname, attrib)
                 for j in range(len(comp_data)):
                     subele_node = child_node.get_child_node_by_idx(j)
+                    if subele_node is None:
+                        continue  # Not in the map
                     (xname, attrib) = self._get_subele_info(subele_node.id)
-                    self.writer.elem(xname, comp_data[j].get_value(), attrib)
-                self.writer.pop()  # end composite
+                    writer.elem(xname, comp_data[j].get_value(), attrib)
+                writer.pop()  # end composite
             elif child_node.is_element():
-                if seg_data.get_value('%02i' % (i + 1)) == '':
-                    pass
-                    #self.writer.empty(u"ele", attrs={u'id': child_node.id})
-                else:
+                value = comp_data.format()
+                if value != '':
                     (xname, attrib) = self._get_ele_info(child_node.id)
-                    self.writer.elem(xname, seg_data.get_value(
-                        '%02i' % (i + 1)), attrib)
+                    writer.elem(xname, value, attrib)
             else:
                 raise EngineError('Node must be a either an element or a composite')
-        self.writer.pop()  # end segment
+        writer.pop()  # end segment
 
     def _path_list(self, path_str):
         """
@@ -6,9 +6,13 @@
 # *  switch from deprecated string module to string methods
 # *  use PEP 8 style
 
+import re
 import sys
 #import codecs
 
+_re_cont_special = re.compile('[&<>]')
+_re_attr_special = re.compile("[&'<>]")
+
 
 class XMLWriter(object):
     """
@@ -51,11 +55,13 @@ class XMLWriter(object):
     flush
     """
 
-    def __init__(self, out=sys.stdout, encoding="utf-8", indent=" "):
+    def __init__(self, out=sys.stdout, encoding="utf-8", indent=" ",
+                 bufsize=65536):
         """
         out      - a stream for the output
         encoding - an encoding used to wrap the output for unicode
         indent   - white space used for indentation
+        bufsize  - output is written in blocks of about this many characters
         """
         #wrapper = codecs.lookup(encoding).streamwriter
         #self.out = wrapper(out)
@@ -63,6 +69,10 @@ class XMLWriter(object):
         self.out = out
         self.stack = []
         self.indent = indent
+        self.bufsize = bufsize
+        self._buf = []
+        self._buf_len = 0
+        self._indents = ['']
         self._write('<?xml version="1.0" encoding="%s"?>\n' % encoding)
 
     def doctype(self, root, pubid, sysid):
@@ -81,61 +91,83 @@ class XMLWriter(object):
         """
         Create an element which will have child elements
         """
-        self._indent()
-        self._write("<" + elem)
-        for (a, v) in list(attrs.items()):
-            self._write(" %s='%s'" % (a, self._escape_attr(v)))
-        self._write(">\n")
+        self._write("%s<%s%s>\n" % (self._get_indent(), elem,
+                                    self._format_attrs(attrs)))
         self.stack.append(elem)
 
     def elem(self, elem, content, attrs={}):
         """
         Create an element with text content only
         """
-        self._indent()
-        self._write("<" + elem)
-        for (a, v) in list(attrs.items()):
-            self._write(" %s='%s'" % (a, self._escape_attr(v)))
-        self._write(">%s</%s>\n" % (self._escape_cont(content), elem))
+        self._write("%s<%s%s>%s</%s>\n" % (self._get_indent(), elem,
+                                           self._format_attrs(attrs),
+                                           self._escape_cont(content), elem))
 
     def empty(self, elem, attrs={}):
         """
         Create an empty element
         """
-        self._indent()
-        self._write("<" + elem)
-        for a in list(attrs.items()):
-            self._write(" %s='%s'" % a)
-        self.out.write("/>\n")
+        self._write("%s<%s%s/>\n" % (self._get_indent(), elem,
+                                     self._format_attrs(attrs)))
 
     def pop(self):
         """
         Close an element started with the push() method
+        The output is flushed when the last element is closed
         """
         if len(self.stack) > 0:
-            elem = self.stack[-1]
-            del self.stack[-1]
-            self._indent()
-            self._write("</%s>\n" % elem)
+            elem = self.stack.pop()
+            self._write("%s</%s>\n" % (self._get_indent(), elem))
+            if len(self.stack) == 0:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the buffered output
+        """
+        if self._buf:
+            try:
+                block = ''.join(self._buf)
+            except UnicodeDecodeError:
+                # Encoded str mixed with unicode
+                block = u''.join([x.decode(self.encoding) if isinstance(x, str)
+                                  else x for x in self._buf])
+            if isinstance(block, str):
+                block = block.decode(self.encoding)
+            self.out.write(block)
+            self._buf = []
+            self._buf_len = 0
 
     def __len__(self):
         return len(self.stack)
 
-    def _indent(self):
-        self._write(self.indent * (len(self.stack) * 2))
+    def _get_indent(self):
+        depth = len(self.stack)
+        while len(self._indents) <= depth:
+            self._indents.append(self.indent * (len(self._indents) * 2))
+        return self._indents[depth]
+
+    def _format_attrs(self, attrs):
+        if not attrs:
+            return ''
+        return ''.join([" %s='%s'" % (a, self._escape_attr(v))
+                        for (a, v) in attrs.items()])
 
     def _escape_cont(self, text):
-        if text is None:
-            return None
+        if text is None or _re_cont_special.search(text) is None:
+            return text
         return text.replace("&", "&amp;")\
             .replace("<", "&lt;").replace(">", "&gt;")
 
     def _escape_attr(self, text):
-        if text is None:
-            return None
+        if text is None or _re_attr_special.search(text) is None:
+            return text
         return text.replace("&", "&amp;") \
             .replace("'", "&apos;").replace("<", "&lt;")\
             .replace(">", "&gt;")
 
     def _write(self, strval):
-        self.out.write(strval.decode(self.encoding))
+        self._buf.append(strval)
+        self._buf_len += len(strval)
+        if self._buf_len >= self.bufsize:
+            self.flush()
@@ -16,6 +16,7 @@ import xml.etree.cElementTree as et
 import logging
 
 # Intrapackage imports
+import pyx12.path
 import pyx12.segment
 import pyx12.x12file
 
@@ -23,17 +24,28 @@ import pyx12.x12file
 def convert(filename, fd_out):
     """
     Convert a XML file in simple X12 form to an X12 file
-    @param filename:  libxml2 requires a file name.  '-' gives stdin
+
+    The XML is parsed incrementally.  Each segment is written when its
+    element closes, and closed segment and loop elements are dropped, so
+    memory use does not grow with the document size.
+
+    @param filename:  File name or file object
     @type filename: string
     @param fd_out: Output file
     @type fd_out: file descripter
     """
     logger = logging.getLogger('pyx12')
     wr = pyx12.x12file.X12Writer(fd_out, '~', '*', ':', '\n', '^')
-    doc = et.parse(filename)
-    for node in doc.iter():
+    open_nodes = []
+    for (event, node) in et.iterparse(filename, events=('start', 'end')):
+        if event == 'start':
+            open_nodes.append(node)
+            continue
+        open_nodes.pop()
         if node.tag == 'seg':
             wr.Write(get_segment(node))
+        if node.tag in ('seg', 'loop') and open_nodes:
+            open_nodes[-1].remove(node)
     return True
 
 
@@ -44,14 +56,36 @@ def get_segment(cSegment):
     seg_id = cSegment.get('id')
     #seg_id = cSeg.findtext('data_ele')
     seg_data = pyx12.segment.Segment(seg_id, '~', '*', ':')
-    for node in cSegment.iter():
+    for node in cSegment:
         if node.tag == 'ele':
-            ele_id = node.get('id')
-            if node.text != '':
-                seg_data.set(ele_id, node.text)
+            if node.text is not None and node.text != '':
+                (ele_idx, comp_idx) = _get_refdes_idx(node.get('id'))
+                seg_data.set_by_idx(ele_idx, comp_idx, node.text)
         elif node.tag == 'comp':
             for subele in node.findall('subele'):
-                subele_id = subele.get('id')
                 if subele.text is not None and subele.text != '':
-                    seg_data.set(subele_id, subele.text)
+                    (ele_idx, comp_idx) = _get_refdes_idx(subele.get('id'))
+                    seg_data.set_by_idx(ele_idx, comp_idx, subele.text)
     return seg_data
+
+
+_refdes_idx = {}
+
+
+def _get_refdes_idx(ref_des):
+    """
+    Get the zero based indexes of an element or sub-element id.  The few
+    distinct ids are parsed once.
+
+    @param ref_des: X12 Reference Designator - NM109, CLM05-1
+    @type ref_des: string
+    @rtype: tuple(ele_idx, subele_idx)
+    """
+    try:
+        return _refdes_idx[ref_des]
+    except KeyError:
+        xp = pyx12.path.X12Path(ref_des)
+        ele_idx = xp.ele_idx - 1 if xp.ele_idx is not None else None
+        comp_idx = xp.subele_idx - 1 if xp.subele_idx is not None else None
+        _refdes_idx[ref_des] = (ele_idx, comp_idx)
+        return (ele_idx, comp_idx)
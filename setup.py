@@ -1,4 +1,6 @@
+import os.path
 from setuptools import setup
+from setuptools.command.build_py import build_py
 
 
 __version__ = ""
@@ -8,6 +10,20 @@ validates it against a representation of the Implementation Guidelines for a HIP
 creates a 997 response for 4010 and a 999 response for 5010. It can create an html representation of the X12
 document or can translate to and from an XML representation of the data file."""
 
+
+class build_py_mapc(build_py):
+    """
+    Build, then compile the map bundle into the built package
+    """
+    def run(self):
+        build_py.run(self)
+        if not self.dry_run:
+            import pyx12.map_bundle
+            target = os.path.join(self.build_lib, 'pyx12', 'map',
+                                  pyx12.map_bundle.BUNDLE_FILE)
+            pyx12.map_bundle.compile_bundle(target)
+
+
 setup(
     name="pyx12",
     version=__version__,
@@ -20,6 +36,8 @@ setup(
     url="http://github.com/azoner/pyx12#pyx12",
     platforms='All',
     packages=['pyx12', 'pyx12.scripts'],
+    cmdclass={'build_py': build_py_mapc},
+    zip_safe=False,
     package_data={
         '': ['*.xml', '*.md'],
         'pyx12': ['map/*.xml', 'map/*.xsd'],
@@ -31,6 +49,9 @@ setup(
             'x12valid = pyx12.scripts.x12valid:main',
             'x12info = pyx12.scripts.x12info:main',
             'x12norm = pyx12.scripts.x12norm:main',
+            'x12extract = pyx12.scripts.x12extract:main',
+            'x12json = pyx12.scripts.x12json:main',
+            'x12mapc = pyx12.scripts.x12mapc:main',
             'x12xml = pyx12.scripts.x12xml:main',
             'xmlx12 = pyx12.scripts.xmlx12:main',
         ]
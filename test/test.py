@@ -7,6 +7,7 @@ def suite():
     modules_to_test = (
         'test_codes',
         'test_dataele',
+        'test_map_bundle',
         'test_map_if',
         'test_map_index',
         'test_map_unique',
@@ -18,8 +19,13 @@ def suite():
         'test_syntax',
         'test_validation',
         'test_x12context',
+        'test_x12extract',
         'test_x12file',
+        'test_x12json',
         'test_x12n_document',
+        'test_x12norm',
+        'test_x12query',
+        'test_x12scan',
         'test_xmlwriter',
         'test_x12n_document',
         'test_xmlx12_simple',
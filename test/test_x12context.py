@@ -10,5 +10,7 @@ from helper import get_testcases, print_testcases, get_suite
 ns = pyx12.tests.x12context
 if len(sys.argv) > 1 and sys.argv[1] == '-h':
     print_testcases(ns)
-else:
+elif __name__ == '__main__':
+    # test.py runs this module's tests itself.  Run here, while test.py
+    # holds the import lock, the iter_pipeline tests would deadlock.
     unittest.TextTestRunner(verbosity=2).run(get_suite(ns, sys.argv[1:]))